@@ -1,15 +1,73 @@
-"""Simple module for creating deep learning tools, with its own linear algebra and matrices utilities."""
-from .functionality import Matrix, ActivationFunctionsRegistry
-from .miscellaneous import extend_to_matrices, LinearAlgebraUtils
-from .models import MultiLayerPerceptron
+"""Simple module for creating deep learning tools, with its own linear algebra and matrices utilities.
+
+The public names below are loaded on first access, so that importing the package is cheap: the native extension is
+only loaded with the first matrix, and matplotlib with the first plot."""
+from typing import TYPE_CHECKING
+import importlib
+
+if TYPE_CHECKING:
+    from .functionality import Matrix, SparseMatrix, LazyMatrix, QuantizedMatrix, ActivationFunctionsRegistry
+    from .miscellaneous import extend_to_matrices, vectorize_with, LinearAlgebraUtils
+    from .models import MultiLayerPerceptron, DenseLayer, DataParallel, Checkpoint, Workspace, QuantizedMultiLayerPerceptron
+    from .optimizers import Optimizer, SGD, Momentum, Adam
+    from .data import Dataset, CSVDataset, BinaryDataset, DataLoader
+    from .telemetry import Profiler, Callback, MemoryRecorder, JSONLinesSink, ConsoleSink, TrainingInfoWriter
+    from .serving import InferenceServer, ModelStatistics
 
 __version__ = "0.1.0"
 __author__ = "Diaa Eddine ZAINI <zainidiaaeddine@gmail.com>"
 
+_SUBPACKAGES = {
+    '.functionality': ['Matrix', 'SparseMatrix', 'LazyMatrix', 'QuantizedMatrix', 'ActivationFunctionsRegistry'],
+    '.miscellaneous': ['extend_to_matrices', 'vectorize_with', 'LinearAlgebraUtils'],
+    '.models': ['MultiLayerPerceptron', 'DenseLayer', 'DataParallel', 'Checkpoint', 'Workspace', 'QuantizedMultiLayerPerceptron'],
+    '.optimizers': ['Optimizer', 'SGD', 'Momentum', 'Adam'],
+    '.data': ['Dataset', 'CSVDataset', 'BinaryDataset', 'DataLoader'],
+    '.telemetry': ['Profiler', 'Callback', 'MemoryRecorder', 'JSONLinesSink', 'ConsoleSink', 'TrainingInfoWriter'],
+    '.serving': ['InferenceServer', 'ModelStatistics']
+} #The subpackage defining each public name.
+_LOCATIONS = {name: subpackage for subpackage, names in _SUBPACKAGES.items() for name in names}
+
 __all__ = [
     'Matrix',
+    'SparseMatrix',
+    'LazyMatrix',
+    'QuantizedMatrix',
     'ActivationFunctionsRegistry',
     'extend_to_matrices',
+    'vectorize_with',
     'LinearAlgebraUtils',
-    'MultiLayerPerceptron'
-]
\ No newline at end of file
+    'MultiLayerPerceptron',
+    'DenseLayer',
+    'DataParallel',
+    'Checkpoint',
+    'Workspace',
+    'QuantizedMultiLayerPerceptron',
+    'Optimizer',
+    'SGD',
+    'Momentum',
+    'Adam',
+    'Dataset',
+    'CSVDataset',
+    'BinaryDataset',
+    'DataLoader',
+    'Profiler',
+    'Callback',
+    'MemoryRecorder',
+    'JSONLinesSink',
+    'ConsoleSink',
+    'TrainingInfoWriter',
+    'InferenceServer',
+    'ModelStatistics'
+]
+
+def __getattr__(name: str):
+    """Imports the subpackage defining a public name on its first access, and caches the name in the package."""
+    if name not in _LOCATIONS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LOCATIONS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
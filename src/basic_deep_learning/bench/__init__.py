@@ -0,0 +1,8 @@
+"""Benchmark suite of the hot paths of the library, with regression tracking against a stored baseline.
+
+Run with "python -m basic_deep_learning.bench --help"."""
+
+from .benchmark import Benchmark
+from .suite import BenchmarkSuite
+
+__all__ = ['Benchmark', 'BenchmarkSuite']
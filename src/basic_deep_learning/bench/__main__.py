@@ -0,0 +1,78 @@
+"""Runs the benchmark suite: "python -m basic_deep_learning.bench [-k PATTERN ...] [--baseline FILE] [--threshold 0.2]".
+
+The results are written as JSON (to cache/benchmarks.json by default). If a baseline (the JSON results of a previous
+run) is given, every benchmark is compared against it and the exit status is 1 when at least one of them regressed by
+more than the threshold."""
+import argparse
+import sys
+from ..functionality.matrix import Matrix
+from .suite import BenchmarkSuite
+from .cases import default_suite
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds/scale:.3f} {unit}'
+    return f'{seconds/1e-9:.1f} ns'
+
+def main(argv: list[str]|None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m basic_deep_learning.bench', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', '--select', nargs='+', metavar='PATTERN',
+                        help='Only run the benchmarks whose names match one of these patterns (e.g. "matrix.mul[*").')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and exit.')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed repeats per benchmark (default: 5).')
+    parser.add_argument('--min-time', type=float, default=0.05, help='Minimum duration of a repeat, in seconds (default: 0.05).')
+    parser.add_argument('--threads', type=int, default=0, help='Threads of the product kernel (default: 0, one per core).')
+    parser.add_argument('--output', default='cache/benchmarks.json', help='JSON file the results are written to.')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against.')
+    parser.add_argument('--threshold', type=float, default=BenchmarkSuite.DEFAULT_THRESHOLD,
+                        help='Relative slowdown above which a benchmark counts as a regression (default: %(default)s).')
+    args = parser.parse_args(argv)
+    suite = default_suite()
+    benchmarks = suite.select(args.select)
+    if not benchmarks:
+        parser.error('No benchmark matches the given patterns.')
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return 0
+    baseline = BenchmarkSuite.load(args.baseline) if args.baseline else None
+    Matrix.set_num_threads(args.threads)
+    width = max(len(benchmark.name) for benchmark in benchmarks)
+    print(f'{"benchmark":<{width}} {"min":>12} {"median":>12} {"stdev":>12} {"loops":>7}')
+    def report(result: dict) -> None:
+        print(f'{result["name"]:<{width}} {format_time(result["min"]):>12} {format_time(result["median"]):>12} '
+              f'{format_time(result["stdev"]):>12} {result["loops"]:>7}')
+    results = suite.run(args.select, args.repeats, args.min_time, report)
+    BenchmarkSuite.save(results, args.output)
+    print(f'\nResults written to {args.output}.')
+    if baseline is None:
+        return 0
+    for key in ('machine', 'cpu_count', 'threads', 'python'):
+        if results['environment'].get(key) != baseline['environment'].get(key):
+            print(f'Warning: the baseline was measured with {key}={baseline["environment"].get(key)} '
+                  f'(now {results["environment"].get(key)}); the comparison may not be meaningful.')
+    if args.select: # Only the selected benchmarks are compared; the others of the baseline are not missing.
+        selected = {benchmark.name for benchmark in benchmarks}
+        baseline['results'] = {name: result for name, result in baseline['results'].items() if name in selected}
+    comparison = BenchmarkSuite.compare(results, baseline, args.threshold)
+    width = max(len(entry['name']) for entry in comparison)
+    print(f'\nComparison against {args.baseline} (threshold {args.threshold:.0%}):')
+    for entry in comparison:
+        if entry['status'] in ('new', 'missing'):
+            print(f'{entry["name"]:<{width}} {entry["status"]:>12}')
+            continue
+        print(f'{entry["name"]:<{width}} {format_time(entry["baseline"]):>12} {format_time(entry["current"]):>12} '
+              f'{entry["ratio"]:>7.2f}x {entry["status"]:>12}')
+    regressions = [entry for entry in comparison if entry['status'] == 'regression']
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) above {args.threshold:.0%}:')
+        for entry in regressions:
+            print(f'  {entry["name"]}: {entry["ratio"]:.2f}x slower')
+        return 1
+    print('\nNo regression.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
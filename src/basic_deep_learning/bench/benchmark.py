@@ -0,0 +1,64 @@
+"""Module containing the Benchmark class."""
+from typing import Callable
+import statistics
+import time
+
+class Benchmark:
+    def __init__(self,
+                 name: str,
+                 setup: Callable[[], Callable[[], object]|tuple[Callable[[], object], Callable[[], None]]],
+                 group: str,
+                 params: dict|None = None) -> None:
+        """A named measurement of one operation.
+
+        setup builds the inputs of the operation and returns a function without arguments performing it, so that only
+        the operation itself is timed. It can also return a (function, teardown) pair, teardown being called after the
+        measurement to release what setup acquired (threads, temporary files, ...). group gathers related benchmarks (matrix, activation, layer, ...) and params
+        describes the case (sizes, dtype, ...) in the results."""
+        self.name = name
+        self.setup = setup
+        self.group = group
+        self.params = params or {}
+
+    @staticmethod
+    def __time(f: Callable[[], object], loops: int) -> float: #Private method.
+        start = time.perf_counter()
+        for _ in range(loops):
+            f()
+        return time.perf_counter() - start
+
+    def run(self,
+            repeats: int = 5,
+            min_time: float = 0.05) -> dict:
+        """Times the operation and returns its statistics, in seconds per call.
+
+        After a warm-up call, the number of calls per repeat is doubled until a repeat lasts at least
+        min_time seconds, so that fast operations are not dominated by the resolution of the clock; then repeats repeats
+        are timed. The minimum is the most stable statistic, and the one compared against baselines."""
+        if repeats < 1:
+            raise ValueError("The number of repeats must be a positive integer.")
+        f, teardown = self.setup(), None
+        if isinstance(f, tuple):
+            f, teardown = f
+        try:
+            f()
+            loops = 1
+            elapsed = self.__time(f, loops)
+            while elapsed < min_time:
+                loops *= 2
+                elapsed = self.__time(f, loops)
+            times = [elapsed / loops] + [self.__time(f, loops) / loops for _ in range(repeats - 1)]
+        finally:
+            if teardown is not None:
+                teardown()
+        return {
+            'name': self.name,
+            'group': self.group,
+            'params': self.params,
+            'loops': loops,
+            'repeats': repeats,
+            'min': min(times),
+            'median': statistics.median(times),
+            'mean': statistics.fmean(times),
+            'stdev': statistics.stdev(times) if repeats > 1 else 0.0
+        }
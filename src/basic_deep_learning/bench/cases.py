@@ -0,0 +1,406 @@
+"""The benchmarks of the default suite: matrix operators, lazy expressions, sparse inputs, activations and their
+approximations, layers, training, quantized inference, checkpoints, serving and the startup of the package. The float32
+and approximate cases also record their error against the exact float64 computation in their params."""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import matrix_ops
+from ..functionality.matrix import Matrix
+from ..functionality.lazy_matrix import LazyMatrix
+from ..functionality.sparse_matrix import SparseMatrix
+from ..functionality.activations_registry import ActivationFunctionsRegistry
+from ..models import MultiLayerPerceptron, DenseLayer, DataParallel, Workspace
+from ..optimizers import SGD
+from ..data import DataLoader
+from ..serving import InferenceServer
+from .suite import BenchmarkSuite
+
+MATRIX_SIZES = [64, 256, 512]
+RECTANGULAR_PRODUCT = (4096, 256, 32)
+REFERENCE_SIZES = [64, 256]
+ACTIVATION_FORMAT = (512, 512)
+LAYER_SHAPES = [(784, 512), (512, 512), (512, 10)]
+MLP_STRUCTURE = [784, 512, 512, 10]
+DEEP_STRUCTURE = [256] + [512] * 12 + [10]
+EPOCH_STRUCTURE = [64, 128, 10]
+EPOCH_SAMPLES = 1024
+BATCH_SIZE = 256
+SPARSE_INPUTS = 20000
+SPARSE_NONZEROS = 20
+SERVING_REQUESTS = 512
+DRIFT_STEPS = 10
+
+@contextlib.contextmanager
+def _scratch(directory: str):
+    """Runs its block from a scratch directory with the standard output silenced, since training and saving a model
+    print their progress and write to cache/ in the working directory."""
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(previous)
+
+def _random_samples(count: int, n_inputs: int, n_outputs: int) -> list[tuple[Matrix, Matrix]]:
+    return [(Matrix.randomize(n_inputs, 1, -1, 1), Matrix.randomize(n_outputs, 1, 0, 1)) for _ in range(count)]
+
+def _max_difference(A: Matrix, B: Matrix) -> float:
+    """The largest absolute difference between the entries of A and B, computed in double precision."""
+    return max(map(abs, memoryview((A.astype('float64') - B.astype('float64'))._native).cast('B').cast('d')), default=0.0)
+
+def _training_drift(mlp: MultiLayerPerceptron,
+                    X: Matrix,
+                    Y: Matrix) -> dict:
+    """Trains a float64 and a float32 copy of mlp from the same parameters for DRIFT_STEPS steps on the batch (X, Y),
+    and returns how far apart they end up: the largest difference of their outputs and the relative difference of
+    their last losses."""
+    outputs, losses = {}, {}
+    for dtype in ('float64', 'float32'):
+        model = MultiLayerPerceptron(mlp.structure, mlp.hidden_activation_name, mlp.output_activation_name,
+                                     weights=[W.astype(dtype) for W in mlp.weights],
+                                     biases=[B.astype(dtype) for B in mlp.biases], dtype=dtype)
+        inputs, expected = X.astype(dtype), Y.astype(dtype)
+        optimizer = SGD(0.01)
+        for _ in range(DRIFT_STEPS):
+            losses[dtype] = model.backward_propagate(inputs, expected, optimizer=optimizer)
+        outputs[dtype] = model.predict_batch(inputs)
+    return {
+        'max_output_difference': _max_difference(outputs['float32'], outputs['float64']),
+        'relative_loss_difference': abs(losses['float32'] - losses['float64']) / losses['float64']
+    }
+
+def _add_matrix_benchmarks(suite: BenchmarkSuite) -> None:
+    binary_operators = {
+        'add': lambda A, B: A + B,
+        'sub': lambda A, B: A - B,
+        'cwise_prod': lambda A, B: A @ B,
+        'mul': lambda A, B: A * B,
+        'T_mul': lambda A, B: A.T_mul(B),
+        'mul_T': lambda A, B: A.mul_T(B),
+    }
+    unary_operators = {
+        'scale': lambda A: 2.5 * A,
+        'transpose': lambda A: A.T(),
+        'sum_columns': lambda A: A.sum_columns(),
+        'copy': lambda A: A.copy(),
+        'to_lists': lambda A: A.matrix,
+    }
+    for n in MATRIX_SIZES:
+        for dtype in ('float64', 'float32'):
+            suffix = f'[{n}x{n},{dtype}]' if dtype != 'float64' else f'[{n}x{n}]'
+            for label, operator in binary_operators.items():
+                if dtype != 'float64' and label not in ('mul', 'add'):
+                    continue
+                name = f'matrix.{label}{suffix}'
+                @suite.add(name, n=n, dtype=dtype)
+                def setup(n=n, dtype=dtype, operator=operator, name=name):
+                    A, B = Matrix.randomize(n, n, -1, 1, dtype), Matrix.randomize(n, n, -1, 1, dtype)
+                    if dtype != 'float64':
+                        #The drift from the same operation in double precision, recorded with the results next to the timings.
+                        suite.benchmarks[name].params['max_error'] = _max_difference(
+                            operator(A, B), operator(A.astype('float64'), B.astype('float64'))
+                        )
+                    return lambda: operator(A, B)
+        for label, operator in unary_operators.items():
+            @suite.add(f'matrix.{label}[{n}x{n}]', n=n)
+            def setup(n=n, operator=operator):
+                A = Matrix.randomize(n, n, -1, 1)
+                return lambda: operator(A)
+        @suite.add(f'matrix.from_lists[{n}x{n}]', n=n)
+        def setup(n=n):
+            rows = Matrix.randomize(n, n, -1, 1).matrix
+            return lambda: Matrix(rows)
+    n, m, p = RECTANGULAR_PRODUCT
+    for dtype in ('float64', 'float32'):
+        name = f'matrix.mul[{n}x{m},{m}x{p}' + (f',{dtype}]' if dtype != 'float64' else ']')
+        @suite.add(name, n=n, m=m, p=p, dtype=dtype)
+        def setup(n=n, m=m, p=p, dtype=dtype, name=name):
+            A, B = Matrix.randomize(n, m, -1, 1, dtype), Matrix.randomize(m, p, -1, 1, dtype)
+            if dtype != 'float64':
+                suite.benchmarks[name].params['max_error'] = _max_difference(A * B, A.astype('float64') * B.astype('float64'))
+            return lambda: A * B
+    for n in REFERENCE_SIZES:
+        @suite.add(f'matrix.reference_product[{n}x{n}]', n=n)
+        def setup(n=n):
+            A, B = Matrix.randomize(n, n, -1, 1), Matrix.randomize(n, n, -1, 1)
+            return lambda: matrix_ops.Matrix.reference_product(A._native, B._native)
+    @suite.add(f'matrix.hstack[784x1,{BATCH_SIZE}]', rows=784, count=BATCH_SIZE)
+    def setup():
+        columns = [Matrix.randomize(784, 1, -1, 1) for _ in range(BATCH_SIZE)]
+        return lambda: Matrix.hstack(columns)
+
+def _add_lazy_benchmarks(suite: BenchmarkSuite) -> None:
+    n, p = ACTIVATION_FORMAT
+    expressions = { #Each expression, written on Matrix instances or on LazyMatrix ones.
+        'output_error': lambda A, Y, Z: (A - Y) @ ActivationFunctionsRegistry.sigmoid_prime(Z) if isinstance(A, Matrix)
+                        else (A - Y) @ Z.activation_prime('sigmoid'),
+        'scaled_sum': lambda A, Y, Z: 0.1 * (0.5 * A + Y) - Z,
+        'scaled_product_T': lambda A, Y, Z: (0.5 * A.T()) * Y,
+    }
+    for label, expression in expressions.items():
+        @suite.add(f'lazy.{label}[{n}x{p},eager]', n=n, p=p, mode='eager')
+        def setup(expression=expression):
+            A, Y, Z = (Matrix.randomize(n, p, -1, 1) for _ in range(3))
+            return lambda: expression(A, Y, Z)
+        @suite.add(f'lazy.{label}[{n}x{p},lazy]', n=n, p=p, mode='lazy')
+        def setup(expression=expression):
+            A, Y, Z = (LazyMatrix(Matrix.randomize(n, p, -1, 1)) for _ in range(3))
+            return lambda: expression(A, Y, Z).evaluate()
+
+def _add_sparse_benchmarks(suite: BenchmarkSuite) -> None:
+    n_outputs = LAYER_SHAPES[0][1]
+    shape = f'{n_outputs}x{SPARSE_INPUTS},b{BATCH_SIZE},nnz={SPARSE_NONZEROS}'
+    def make_batch() -> SparseMatrix:
+        random.seed(0)
+        return SparseMatrix.hstack([SparseMatrix(SPARSE_INPUTS, 1, {(random.randint(1, SPARSE_INPUTS), 1): 1.0
+                                                                     for _ in range(SPARSE_NONZEROS)})
+                                    for _ in range(BATCH_SIZE)])
+    for mode in ('sparse', 'dense'):
+        @suite.add(f'sparse.layer_forward[{shape},{mode}]', outputs=n_outputs, inputs=SPARSE_INPUTS, batch_size=BATCH_SIZE,
+                   nonzeros=SPARSE_NONZEROS, mode=mode)
+        def setup(mode=mode):
+            X = make_batch()
+            X = X if mode == 'sparse' else X.to_dense()
+            layer = DenseLayer(Matrix.randomize(n_outputs, SPARSE_INPUTS, -1, 1), Matrix.randomize(n_outputs, 1, -1, 1), 'ReLU')
+            return lambda: layer.forward(X, keep_pre_activation=False)
+        @suite.add(f'sparse.layer_backward[{shape},{mode}]', outputs=n_outputs, inputs=SPARSE_INPUTS, batch_size=BATCH_SIZE,
+                   nonzeros=SPARSE_NONZEROS, mode=mode)
+        def setup(mode=mode):
+            X = make_batch()
+            X = X if mode == 'sparse' else X.to_dense()
+            layer = DenseLayer(Matrix.randomize(n_outputs, SPARSE_INPUTS, -1, 1), Matrix.randomize(n_outputs, 1, -1, 1), 'ReLU')
+            E = Matrix.randomize(n_outputs, BATCH_SIZE, -1, 1)
+            return lambda: layer.backward(E, X)
+    @suite.add(f'sparse.hstack[{SPARSE_INPUTS}x1,{BATCH_SIZE},nnz={SPARSE_NONZEROS}]', rows=SPARSE_INPUTS, count=BATCH_SIZE)
+    def setup():
+        columns = [make_batch().get_columns(j, j) for j in range(1, BATCH_SIZE + 1)]
+        return lambda: SparseMatrix.hstack(columns)
+
+def _add_activation_benchmarks(suite: BenchmarkSuite) -> None:
+    n, p = ACTIVATION_FORMAT
+    for label, (f, f_prime) in ActivationFunctionsRegistry.Activations.items():
+        f_prime_from_output = ActivationFunctionsRegistry.ActivationsFromOutput[label][1]
+        f_inplace = ActivationFunctionsRegistry.InPlaceActivations[label]
+        functions = {label: f, f'{label}_prime': f_prime, f'{label}_prime_from_output': f_prime_from_output,
+                     f'{label}_inplace': f_inplace}
+        for name, function in functions.items():
+            @suite.add(f'activation.{name}[{n}x{p}]', n=n, p=p)
+            def setup(function=function):
+                Z = Matrix.randomize(n, p, -2, 2)
+                return lambda: function(Z)
+    @suite.add(f'activation.softmax[{n}x{p}]', n=n, p=p)
+    def setup():
+        Z = Matrix.randomize(n, p, -2, 2)
+        return lambda: ActivationFunctionsRegistry.softmax(Z)
+
+def _add_approximation_benchmarks(suite: BenchmarkSuite) -> None:
+    n, p = ACTIVATION_FORMAT
+    n_inputs, n_outputs = LAYER_SHAPES[1]
+    for dtype in ('float64', 'float32'):
+        suffix = f',{dtype}]' if dtype != 'float64' else ']'
+        for exact in ('sigmoid', 'tanh'):
+            for label in (exact, f'{exact}_table', f'{exact}_rational'):
+                name = f'approximation.{label}[{n}x{p}{suffix}'
+                @suite.add(name, n=n, p=p, dtype=dtype, exact=exact)
+                def setup(name=name, label=label, exact=exact, dtype=dtype):
+                    f, f_prime = ActivationFunctionsRegistry.Activations[label]
+                    Z = Matrix.randomize(n, p, -8, 8, dtype)
+                    exact_f, exact_f_prime = ActivationFunctionsRegistry.Activations[exact]
+                    #The errors from the exact function in double precision, recorded with the results next to the timings.
+                    suite.benchmarks[name].params.update(
+                        max_error=_max_difference(f(Z), exact_f(Z.astype('float64'))),
+                        max_prime_error=_max_difference(f_prime(Z), exact_f_prime(Z.astype('float64')))
+                    )
+                    return lambda: f(Z)
+                @suite.add(f'approximation.layer_forward[{n_inputs}x{n_outputs},b{BATCH_SIZE},{label}{suffix}',
+                           inputs=n_inputs, outputs=n_outputs, batch_size=BATCH_SIZE, dtype=dtype)
+                def setup(label=label, dtype=dtype):
+                    random.seed(0)
+                    layer = DenseLayer(Matrix.randomize(n_outputs, n_inputs, -0.1, 0.1, dtype),
+                                       Matrix.randomize(n_outputs, 1, -0.1, 0.1, dtype), label)
+                    X = Matrix.randomize(n_inputs, BATCH_SIZE, -1, 1, dtype)
+                    A = Matrix.zero(n_outputs, BATCH_SIZE, dtype)
+                    return lambda: layer.forward(X, out=A)
+
+def _add_layer_benchmarks(suite: BenchmarkSuite) -> None:
+    for n_inputs, n_outputs in LAYER_SHAPES:
+        shape = f'{n_inputs}x{n_outputs},b{BATCH_SIZE}'
+        def make_layer(n_inputs=n_inputs, n_outputs=n_outputs) -> tuple[DenseLayer, Matrix]:
+            layer = DenseLayer(Matrix.randomize(n_outputs, n_inputs, -1, 1), Matrix.randomize(n_outputs, 1, -1, 1), 'ReLU')
+            return layer, Matrix.randomize(n_inputs, BATCH_SIZE, -1, 1)
+        @suite.add(f'layer.forward[{shape}]', inputs=n_inputs, outputs=n_outputs, batch_size=BATCH_SIZE)
+        def setup(make_layer=make_layer):
+            layer, X = make_layer()
+            return lambda: layer.forward(X, keep_pre_activation=False)
+        @suite.add(f'layer.backward[{shape}]', inputs=n_inputs, outputs=n_outputs, batch_size=BATCH_SIZE)
+        def setup(make_layer=make_layer, n_outputs=n_outputs):
+            layer, X = make_layer()
+            E = Matrix.randomize(n_outputs, BATCH_SIZE, -1, 1)
+            return lambda: layer.backward(E, X, layer)
+
+def _add_mlp_benchmarks(suite: BenchmarkSuite) -> None:
+    structure = '-'.join(map(str, MLP_STRUCTURE))
+    for dtype in ('float64', 'float32'):
+        suffix = f'[{structure},b{BATCH_SIZE}' + (f',{dtype}]' if dtype != 'float64' else ']')
+        def make_model(dtype=dtype) -> tuple[MultiLayerPerceptron, Matrix, Matrix]:
+            random.seed(0)
+            mlp = MultiLayerPerceptron(MLP_STRUCTURE, 'ReLU', 'sigmoid', dtype=dtype)
+            X = Matrix.randomize(MLP_STRUCTURE[0], BATCH_SIZE, -1, 1, dtype)
+            Y = Matrix.randomize(MLP_STRUCTURE[-1], BATCH_SIZE, 0, 1, dtype)
+            return mlp, X, Y
+        @suite.add(f'mlp.predict_batch{suffix}', structure=MLP_STRUCTURE, batch_size=BATCH_SIZE, dtype=dtype)
+        def setup(make_model=make_model):
+            mlp, X, _ = make_model()
+            return lambda: mlp.predict_batch(X)
+        name = f'mlp.backward_propagate{suffix}'
+        @suite.add(name, structure=MLP_STRUCTURE, batch_size=BATCH_SIZE, dtype=dtype)
+        def setup(make_model=make_model, dtype=dtype, name=name):
+            mlp, X, Y = make_model()
+            if dtype != 'float64':
+                suite.benchmarks[name].params.update(_training_drift(mlp, X, Y))
+            optimizer = SGD(0.01)
+            return lambda: mlp.backward_propagate(X, Y, optimizer=optimizer)
+    deep = '-'.join(map(str, DEEP_STRUCTURE))
+    full_memory = Workspace.activation_memory(DEEP_STRUCTURE, 'float64', BATCH_SIZE)
+    for memory_budget in (None, full_memory * 3 // 5):
+        name = f'mlp.backward_propagate[{deep},b{BATCH_SIZE}' + (f',budget={memory_budget}]' if memory_budget else ']')
+        @suite.add(name, structure=DEEP_STRUCTURE, batch_size=BATCH_SIZE, memory_budget=memory_budget)
+        def setup(memory_budget=memory_budget):
+            random.seed(0)
+            mlp = MultiLayerPerceptron(DEEP_STRUCTURE, 'ReLU', 'sigmoid', memory_budget=memory_budget)
+            X = Matrix.randomize(DEEP_STRUCTURE[0], BATCH_SIZE, -1, 1)
+            Y = Matrix.randomize(DEEP_STRUCTURE[-1], BATCH_SIZE, 0, 1)
+            optimizer = SGD(0.01)
+            return lambda: mlp.backward_propagate(X, Y, optimizer=optimizer)
+    workers_counts = sorted({2, os.cpu_count() or 1} - {1})
+    for workers in workers_counts:
+        @suite.add(f'mlp.data_parallel[{structure},b{BATCH_SIZE},workers={workers}]',
+                   structure=MLP_STRUCTURE, batch_size=BATCH_SIZE, workers=workers)
+        def setup(workers=workers):
+            random.seed(0)
+            mlp = MultiLayerPerceptron(MLP_STRUCTURE, 'ReLU', 'sigmoid')
+            X = Matrix.randomize(MLP_STRUCTURE[0], BATCH_SIZE, -1, 1)
+            Y = Matrix.randomize(MLP_STRUCTURE[-1], BATCH_SIZE, 0, 1)
+            parallel = DataParallel(workers)
+            parallel.start()
+            return lambda: parallel.compute_gradients(mlp, X, Y), parallel.close
+    epoch = f'[{"-".join(map(str, EPOCH_STRUCTURE))},{EPOCH_SAMPLES} samples,b64]'
+    @suite.add(f'mlp.train_epoch{epoch}', structure=EPOCH_STRUCTURE, samples=EPOCH_SAMPLES, batch_size=64)
+    def setup():
+        random.seed(0)
+        mlp = MultiLayerPerceptron(EPOCH_STRUCTURE, 'ReLU', 'sigmoid')
+        training_data = _random_samples(EPOCH_SAMPLES, EPOCH_STRUCTURE[0], EPOCH_STRUCTURE[-1])
+        testing_data = _random_samples(EPOCH_SAMPLES // 4, EPOCH_STRUCTURE[0], EPOCH_STRUCTURE[-1])
+        scratch = tempfile.TemporaryDirectory()
+        def train():
+            with _scratch(scratch.name):
+                mlp.train(training_data, testing_data, learning_rate=0.01, epochs=1, batch_size=64)
+        return train, scratch.cleanup
+    @suite.add(f'mlp.data_loader[{EPOCH_STRUCTURE[0]}+{EPOCH_STRUCTURE[-1]},{EPOCH_SAMPLES} samples,b64]',
+               samples=EPOCH_SAMPLES, batch_size=64)
+    def setup():
+        loader = DataLoader(_random_samples(EPOCH_SAMPLES, EPOCH_STRUCTURE[0], EPOCH_STRUCTURE[-1]), 64, prefetch=0)
+        return lambda: sum(1 for _ in loader)
+
+def _add_quantized_benchmarks(suite: BenchmarkSuite) -> None:
+    structure = '-'.join(map(str, MLP_STRUCTURE))
+    for dtype in ('float64', 'float32'):
+        for weights in ('float', 'int8'):
+            for batch_size in (1, BATCH_SIZE):
+                name = f'quantized.predict[{structure},b{batch_size},{weights}' + (f',{dtype}]' if dtype != 'float64' else ']')
+                @suite.add(name, structure=MLP_STRUCTURE, batch_size=batch_size, weights=weights, dtype=dtype)
+                def setup(dtype=dtype, weights=weights, batch_size=batch_size):
+                    random.seed(0)
+                    mlp = MultiLayerPerceptron(MLP_STRUCTURE, 'ReLU', 'sigmoid', dtype=dtype)
+                    model = mlp.quantize() if weights == 'int8' else mlp
+                    X = Matrix.randomize(MLP_STRUCTURE[0], batch_size, -1, 1, dtype)
+                    return lambda: model.predict_batch(X)
+
+def _add_checkpoint_benchmarks(suite: BenchmarkSuite) -> None:
+    structure = '-'.join(map(str, MLP_STRUCTURE))
+    formats = {'json': ('model.json', {}), 'binary': ('model.bdl', {'binary': True})}
+    for label, (filename, options) in formats.items():
+        def make_saved_model(filename=filename, options=options) -> tuple[MultiLayerPerceptron, tempfile.TemporaryDirectory]:
+            random.seed(0)
+            mlp = MultiLayerPerceptron(MLP_STRUCTURE, 'ReLU', 'sigmoid')
+            scratch = tempfile.TemporaryDirectory()
+            with _scratch(scratch.name):
+                mlp.save(filename, **options)
+            return mlp, scratch
+        @suite.add(f'checkpoint.save[{label},{structure}]', structure=MLP_STRUCTURE, format=label)
+        def setup(make_saved_model=make_saved_model, filename=filename, options=options):
+            mlp, scratch = make_saved_model()
+            def save():
+                with _scratch(scratch.name):
+                    mlp.save(filename, **options)
+            return save, scratch.cleanup
+        for memory_map in ((True, False) if label == 'binary' else (True,)):
+            name = f'checkpoint.load[{label},{structure}' + ('' if label == 'json' else f',memory_map={memory_map}') + ']'
+            @suite.add(name, structure=MLP_STRUCTURE, format=label, memory_map=memory_map)
+            def setup(make_saved_model=make_saved_model, filename=filename, memory_map=memory_map):
+                _, scratch = make_saved_model()
+                path = os.path.join(scratch.name, 'cache', filename)
+                return lambda: MultiLayerPerceptron.load(path, memory_map=memory_map), scratch.cleanup
+
+def _add_serving_benchmarks(suite: BenchmarkSuite) -> None:
+    structure = '-'.join(map(str, MLP_STRUCTURE))
+    for max_batch_size in (1, 64):
+        @suite.add(f'serving.requests[{structure},{SERVING_REQUESTS} concurrent,max_batch_size={max_batch_size}]',
+                   structure=MLP_STRUCTURE, requests=SERVING_REQUESTS, max_batch_size=max_batch_size)
+        def setup(max_batch_size=max_batch_size):
+            random.seed(0)
+            server = InferenceServer(max_batch_size=max_batch_size)
+            server.add_model('mlp', MultiLayerPerceptron(MLP_STRUCTURE, 'ReLU', 'sigmoid'))
+            inputs = [Matrix.randomize(MLP_STRUCTURE[0], 1, -1, 1) for _ in range(SERVING_REQUESTS)]
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(server.start())
+            async def burst():
+                await asyncio.gather(*(server.predict('mlp', x) for x in inputs))
+            def teardown():
+                loop.run_until_complete(server.close())
+                loop.close()
+            return lambda: loop.run_until_complete(burst()), teardown
+
+def _add_startup_benchmarks(suite: BenchmarkSuite) -> None:
+    def interpreter(code: str, cold: bool) -> tuple:
+        """Returns a function running code in a new interpreter, with the same module search path as this one, and the
+        teardown of its bytecode cache. A cold interpreter neither reads nor writes the bytecode cache (so every module
+        is compiled from source), while a warm one reads the bytecode cache written by a first run."""
+        cache = tempfile.TemporaryDirectory()
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path), PYTHONPYCACHEPREFIX=cache.name)
+        environment.pop('PYTHONDONTWRITEBYTECODE', None)
+        command = [sys.executable] + (['-B'] if cold else []) + ['-c', code]
+        return lambda: subprocess.run(command, env=environment, check=True), cache.cleanup
+    @suite.add('startup.interpreter')
+    def setup():
+        return interpreter('pass', cold=False)
+    for state in ('cold', 'warm'):
+        @suite.add(f'startup.import[{state}]', state=state)
+        def setup(state=state):
+            return interpreter('import basic_deep_learning', cold=state == 'cold')
+        @suite.add(f'startup.first_model[{state}]', state=state)
+        def setup(state=state):
+            return interpreter('from basic_deep_learning import MultiLayerPerceptron; MultiLayerPerceptron([4, 8, 2], "ReLU", "sigmoid")',
+                               cold=state == 'cold')
+
+def default_suite() -> BenchmarkSuite:
+    """Returns the suite of benchmarks run by "python -m basic_deep_learning.bench"."""
+    suite = BenchmarkSuite()
+    _add_matrix_benchmarks(suite)
+    _add_lazy_benchmarks(suite)
+    _add_sparse_benchmarks(suite)
+    _add_activation_benchmarks(suite)
+    _add_approximation_benchmarks(suite)
+    _add_layer_benchmarks(suite)
+    _add_mlp_benchmarks(suite)
+    _add_quantized_benchmarks(suite)
+    _add_checkpoint_benchmarks(suite)
+    _add_serving_benchmarks(suite)
+    _add_startup_benchmarks(suite)
+    return suite
@@ -0,0 +1,124 @@
+"""Module containing the BenchmarkSuite class."""
+from typing import Callable
+from datetime import datetime
+import fnmatch
+import json
+import os
+import platform
+from ..functionality.matrix import Matrix
+from .benchmark import Benchmark
+
+class BenchmarkSuite:
+    FORMAT_VERSION = 1
+    DEFAULT_THRESHOLD = 0.2 #Relative slowdown counted as a regression; timings on a shared machine often vary by 10%.
+
+    def __init__(self) -> None:
+        """Collection of benchmarks, run together into JSON-serializable results that can be compared against a baseline.
+
+        Benchmarks are registered with the add decorator and selected by patterns on their names (e.g. "matrix.*",
+        "*float32*")."""
+        self.benchmarks: dict[str, Benchmark] = {}
+
+    def add(self,
+            name: str,
+            group: str|None = None,
+            **params) -> Callable:
+        """Decorator registering a setup function (see Benchmark) under the given name.
+
+        The group defaults to the part of the name before the first dot."""
+        def decorator(setup: Callable) -> Callable:
+            if name in self.benchmarks:
+                raise ValueError(f"A benchmark named {name!r} is already registered.")
+            self.benchmarks[name] = Benchmark(name, setup, group or name.split('.')[0], params)
+            return setup
+        return decorator
+
+    def select(self, patterns: list[str]|None = None) -> list[Benchmark]:
+        """Returns the benchmarks whose names match at least one of the patterns (all of them if there is none).
+
+        Patterns support the * and ? wildcards; brackets are matched literally, since they appear in the names."""
+        if not patterns:
+            return list(self.benchmarks.values())
+        patterns = [pattern.replace('[', '[[]') for pattern in patterns]
+        return [B for name, B in self.benchmarks.items() if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+    @staticmethod
+    def environment() -> dict:
+        """Describes the machine and the configuration the results were measured on."""
+        from .. import __version__
+        return {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'version': __version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'threads': Matrix.get_num_threads()
+        }
+
+    def run(self,
+            patterns: list[str]|None = None,
+            repeats: int = 5,
+            min_time: float = 0.05,
+            report: Callable[[dict], None]|None = None) -> dict:
+        """Runs the selected benchmarks and returns the results, as {'format', 'environment', 'results': {name: statistics}}.
+
+        report, if given, is called with the statistics of each benchmark as soon as it has run."""
+        results = {}
+        for benchmark in self.select(patterns):
+            results[benchmark.name] = benchmark.run(repeats, min_time)
+            if report is not None:
+                report(results[benchmark.name])
+        return {'format': BenchmarkSuite.FORMAT_VERSION, 'environment': BenchmarkSuite.environment(), 'results': results}
+
+    @staticmethod
+    def save(results: dict, filename: str) -> None:
+        """Writes results (as returned by run) to a JSON file."""
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    @staticmethod
+    def load(filename: str) -> dict:
+        """Reads results written by save."""
+        with open(filename, 'r') as f:
+            results = json.load(f)
+        if results.get('format') != BenchmarkSuite.FORMAT_VERSION:
+            raise ValueError(f"{filename} does not hold benchmark results of format {BenchmarkSuite.FORMAT_VERSION}.")
+        return results
+
+    @staticmethod
+    def compare(results: dict,
+                baseline: dict,
+                threshold: float = DEFAULT_THRESHOLD,
+                statistic: str = 'min') -> list[dict]:
+        """Compares the results of a run against a baseline, benchmark by benchmark, on the given statistic.
+
+        Returns one entry per benchmark, {'name', 'baseline', 'current', 'ratio', 'status'}, whose status is
+        'regression' if it is more than threshold (relative) slower than the baseline, 'improvement' if it is faster
+        by the same margin, 'unchanged' otherwise, and 'new' or 'missing' if it only appears on one side."""
+        if threshold < 0:
+            raise ValueError("The threshold must be non-negative.")
+        current, reference = results['results'], baseline['results']
+        comparison = []
+        for name in list(current) + [name for name in reference if name not in current]:
+            entry = {'name': name, 'baseline': None, 'current': None, 'ratio': None}
+            if name not in reference:
+                entry.update(current=current[name][statistic], status='new')
+            elif name not in current:
+                entry.update(baseline=reference[name][statistic], status='missing')
+            else:
+                entry.update(baseline=reference[name][statistic], current=current[name][statistic])
+                entry['ratio'] = entry['current'] / entry['baseline']
+                if entry['ratio'] > 1 + threshold:
+                    entry['status'] = 'regression'
+                elif entry['ratio'] < 1 / (1 + threshold):
+                    entry['status'] = 'improvement'
+                else:
+                    entry['status'] = 'unchanged'
+            comparison.append(entry)
+        return comparison
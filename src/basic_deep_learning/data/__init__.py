@@ -0,0 +1,8 @@
+"""Datasets streamed from disk and the loader assembling them into mini-batches."""
+
+from .dataset import Dataset
+from .csv_dataset import CSVDataset
+from .binary_dataset import BinaryDataset
+from .data_loader import DataLoader
+
+__all__ = ['Dataset', 'CSVDataset', 'BinaryDataset', 'DataLoader']
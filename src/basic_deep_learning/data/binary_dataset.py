@@ -0,0 +1,77 @@
+"""Module containing the BinaryDataset class."""
+from typing import Literal, Iterable
+from array import array
+import mmap
+import os
+from .dataset import Dataset
+
+class BinaryDataset(Dataset):
+    TYPECODES = {'float64': 'd', 'float32': 'f'}
+
+    def __init__(self,
+                 filename: str,
+                 n_inputs: int,
+                 n_outputs: int,
+                 dtype: Literal['float64', 'float32'] = 'float64') -> None:
+        """Dataset over a binary file of records, memory-mapped rather than read.
+
+        Each record is made of n_inputs inputs followed by n_outputs outputs, stored as contiguous floats of the given
+        type in the native byte order: the layout written by BinaryDataset.write, or by numpy.ndarray.tofile on a
+        (samples, n_inputs + n_outputs) array. Only the pages of the records being read are brought into memory, so
+        the file can be larger than the available memory.
+
+        Supports random access; raises an error if the size of the file is not a whole number of records."""
+        super().__init__(n_inputs, n_outputs)
+        if dtype not in BinaryDataset.TYPECODES:
+            raise ValueError(f"Unsupported type of entries {dtype!r}; expected one of {list(BinaryDataset.TYPECODES)}.")
+        self.filename = filename
+        self.dtype = dtype
+        typecode = BinaryDataset.TYPECODES[dtype]
+        record_size = (n_inputs + n_outputs) * array(typecode).itemsize
+        size = os.path.getsize(filename)
+        if size == 0 or size % record_size != 0:
+            raise ValueError(f"The size of {filename} ({size} bytes) is not a positive multiple of the size of a record ({record_size} bytes).")
+        with open(filename, 'rb') as f:
+            self.__records = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(typecode)
+        self.__length = size // record_size
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __getitem__(self, i: int) -> tuple[memoryview, memoryview]:
+        if not -self.__length <= i < self.__length:
+            raise IndexError(f"Index {i} is out of the expected range [0,{self.__length - 1}].")
+        width = self.n_inputs + self.n_outputs
+        start = (i % self.__length) * width
+        return self.__records[start:start + self.n_inputs], self.__records[start + self.n_inputs:start + width]
+
+    def __iter__(self):
+        for i in range(self.__length):
+            yield self[i]
+
+    def read_records(self,
+                     start: int,
+                     stop: int) -> memoryview:
+        """Returns a flat view over the records start to stop - 1, without copying them."""
+        width = self.n_inputs + self.n_outputs
+        return self.__records[start * width:stop * width]
+
+    @staticmethod
+    def write(filename: str,
+              samples: Iterable,
+              dtype: Literal['float64', 'float32'] = 'float64') -> int:
+        """Writes (inputs, outputs) samples, e.g. the list of (Matrix, Matrix) tuples usually passed to train or a
+        CSVDataset, to a binary file readable by BinaryDataset, and returns the number of samples written.
+
+        The samples are streamed: they never have to fit in memory all at once."""
+        if dtype not in BinaryDataset.TYPECODES:
+            raise ValueError(f"Unsupported type of entries {dtype!r}; expected one of {list(BinaryDataset.TYPECODES)}.")
+        typecode = BinaryDataset.TYPECODES[dtype]
+        count = 0
+        with open(filename, 'wb') as f:
+            for sample in samples:
+                for part in sample:
+                    view = Dataset._flat_view(part)
+                    f.write(view if view.format == typecode else array(typecode, view))
+                count += 1
+        return count
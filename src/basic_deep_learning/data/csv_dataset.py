@@ -0,0 +1,34 @@
+"""Module containing the CSVDataset class."""
+from array import array
+import csv
+from .dataset import Dataset
+
+class CSVDataset(Dataset):
+    def __init__(self,
+                 filename: str,
+                 n_inputs: int,
+                 n_outputs: int,
+                 delimiter: str = ',',
+                 skip_rows: int = 0) -> None:
+        """Dataset streaming the rows of a CSV file, each made of n_inputs inputs followed by n_outputs outputs.
+
+        The file is read again, one row at a time, on every pass: it never has to fit in memory. The first skip_rows
+        rows (e.g. a header) and the empty rows are ignored.
+
+        Raises an error, while reading, on a row that does not have n_inputs + n_outputs values."""
+        super().__init__(n_inputs, n_outputs)
+        self.filename = filename
+        self.delimiter = delimiter
+        self.skip_rows = skip_rows
+
+    def __iter__(self):
+        width = self.n_inputs + self.n_outputs
+        with open(self.filename, newline='') as f:
+            reader = csv.reader(f, delimiter=self.delimiter)
+            for row in reader:
+                if reader.line_num <= self.skip_rows or not row:
+                    continue
+                if len(row) != width:
+                    raise ValueError(f"Line {reader.line_num} of {self.filename} has {len(row)} values instead of {width}.")
+                record = memoryview(array('d', map(float, row)))
+                yield record[:self.n_inputs], record[self.n_inputs:]
@@ -0,0 +1,195 @@
+"""Module containing the DataLoader class."""
+from typing import Iterable, Iterator, Literal
+from array import array
+from queue import Queue, Full
+import random
+import threading
+from ..functionality.matrix import Matrix
+from ..functionality.sparse_matrix import SparseMatrix
+from .dataset import Dataset
+
+class DataLoader:
+    __END = object() #Marks the end of a pass in the queue of prefetched batches.
+
+    def __init__(self,
+                 dataset: Dataset|Iterable,
+                 batch_size: int = 32,
+                 shuffle: bool = False,
+                 shuffle_buffer: int = 1024,
+                 drop_last: bool = False,
+                 prefetch: int = 2,
+                 seed: int|None = None,
+                 dtype: Literal['float64', 'float32'] = 'float64') -> None:
+        """Iterable over the mini-batches of a dataset, as (input batch, expected batch) pairs of matrices with one
+        column per sample.
+
+        dataset can be any Dataset (CSVDataset, BinaryDataset, ...) or any iterable of (inputs, outputs) samples whose
+        parts are column Matrix instances or flat float buffers, such as the usual list of (Matrix, Matrix) tuples.
+        Every pass streams the dataset again, so only the shuffle buffer and the prefetched batches are held in memory.
+        The samples of a batch are copied once into a contiguous buffer of records, which a native kernel splits into
+        the two batch matrices; unshuffled BinaryDataset batches are read straight from the memory-mapped file.
+
+        If shuffle, datasets with random access (__len__ and __getitem__) are visited in a new random order on each
+        pass; other datasets are shuffled through a buffer of shuffle_buffer samples, each sample read replacing one
+        drawn at random from the buffer.
+
+        With prefetch > 0, a background thread reads and assembles up to prefetch batches ahead of the consumer, so that
+        reading the data overlaps with training (the native kernels release the GIL). prefetch=0 assembles the batches
+        in the consumer's thread.
+
+        The inputs of the samples can also be sparse column vectors (SparseMatrix instances), in which case the input
+        batches are SparseMatrix instances too, stacked without ever storing their zeros.
+
+        dtype is the type of the entries of the batches, whatever the type of the entries of the samples."""
+        if batch_size < 1:
+            raise ValueError("The batch size must be a positive integer.")
+        if shuffle_buffer < 1:
+            raise ValueError("The size of the shuffle buffer must be a positive integer.")
+        if prefetch < 0:
+            raise ValueError("The number of prefetched batches must be non-negative.")
+        if dtype not in Matrix._NATIVE_TYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {list(Matrix._NATIVE_TYPES)}.")
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.drop_last = drop_last
+        self.prefetch = prefetch
+        self.dtype = dtype
+        self.__random = random.Random(seed)
+
+    @property
+    def random_access(self) -> bool:
+        """Whether the dataset supports random access (__len__ and __getitem__)."""
+        return hasattr(self.dataset, '__len__') and hasattr(self.dataset, '__getitem__')
+
+    def __len__(self) -> int:
+        """The number of batches per pass; only defined for datasets of known length."""
+        if not hasattr(self.dataset, '__len__'):
+            raise TypeError("A streamed dataset has no length.")
+        if self.drop_last:
+            return len(self.dataset) // self.batch_size
+        return -(-len(self.dataset) // self.batch_size)
+
+    def __iter__(self) -> Iterator[tuple[Matrix, Matrix]]:
+        if self.prefetch == 0:
+            return self.__batches()
+        return self.__prefetched(self.__batches())
+
+    def __samples(self) -> Iterator: #Private method.
+        """Yields the samples of one pass, in order or shuffled."""
+        if self.random_access:
+            order = array('q', range(len(self.dataset)))
+            if self.shuffle:
+                self.__random.shuffle(order)
+            for i in order:
+                yield self.dataset[i]
+            return
+        if not self.shuffle:
+            yield from self.dataset
+            return
+        buffer = []
+        for sample in self.dataset:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sample)
+                continue
+            k = self.__random.randrange(self.shuffle_buffer)
+            yield buffer[k]
+            buffer[k] = sample
+        self.__random.shuffle(buffer)
+        yield from buffer
+
+    @staticmethod
+    def __append(records: array, part, size: int|None) -> int: #Private method.
+        """Appends the entries of one part of a sample to the records, checks their number and returns it."""
+        view = Dataset._flat_view(part)
+        if size is not None and len(view) != size:
+            raise ValueError(f"Inconsistent sample sizes ({len(view)}≠{size}).")
+        if view.format == 'd':
+            records.frombytes(view.cast('B'))
+        else:
+            records.extend(view)
+        return len(view)
+
+    def __assemble(self, records, count: int, n_inputs: int, sparse_inputs: list[SparseMatrix]|None = None) -> tuple[Matrix|SparseMatrix, Matrix]: #Private method.
+        """Builds the batch of count samples from their records, or from their sparse inputs and the records of their outputs."""
+        if sparse_inputs:
+            X = SparseMatrix.hstack(sparse_inputs)
+            _, Y = Matrix._NATIVE_TYPES[self.dtype].batch_from_records(records, count, 0)
+            return (X if X.dtype == self.dtype else X.astype(self.dtype)), Matrix._from_native(Y)
+        X, Y = Matrix._NATIVE_TYPES[self.dtype].batch_from_records(records, count, n_inputs)
+        return Matrix._from_native(X), Matrix._from_native(Y)
+
+    def __batches(self) -> Iterator[tuple[Matrix, Matrix]]: #Private method.
+        """Yields the batches of one pass."""
+        if not self.shuffle and hasattr(self.dataset, 'read_records'):
+            length = len(self.dataset)
+            for start in range(0, length, self.batch_size):
+                stop = min(start + self.batch_size, length)
+                if self.drop_last and stop - start < self.batch_size:
+                    break
+                yield self.__assemble(self.dataset.read_records(start, stop), stop - start, self.dataset.n_inputs)
+            return
+        records, count = array('d'), 0
+        n_inputs = n_outputs = None
+        sparse_inputs = []
+        for inputs, outputs in self.__samples():
+            if isinstance(inputs, SparseMatrix):
+                if inputs.format[1] != 1 or (n_inputs is not None and inputs.format[0] != n_inputs):
+                    raise ValueError(f"Inconsistent sample sizes ({inputs.format}≠({n_inputs}, 1)).")
+                if count > len(sparse_inputs):
+                    raise TypeError("Cannot batch sparse and dense inputs together.")
+                n_inputs = inputs.format[0]
+                sparse_inputs.append(inputs)
+            elif sparse_inputs:
+                raise TypeError("Cannot batch sparse and dense inputs together.")
+            else:
+                n_inputs = self.__append(records, inputs, n_inputs)
+            n_outputs = self.__append(records, outputs, n_outputs)
+            count += 1
+            if count == self.batch_size:
+                yield self.__assemble(records, count, n_inputs, sparse_inputs)
+                records, count, sparse_inputs = array('d'), 0, []
+        if count and not self.drop_last:
+            yield self.__assemble(records, count, n_inputs, sparse_inputs)
+
+    @staticmethod
+    def __put(queue: Queue, item, stop: threading.Event) -> bool: #Private method.
+        """Puts an item in the queue unless the consumer stops first; returns whether the item was put."""
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def __prefetched(self, batches: Iterator) -> Iterator[tuple[Matrix, Matrix]]: #Private method.
+        """Yields the batches assembled ahead of time by a background thread."""
+        queue = Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for batch in batches:
+                    if not self.__put(queue, batch, stop):
+                        return
+                self.__put(queue, DataLoader.__END, stop)
+            except BaseException as error:
+                self.__put(queue, error, stop)
+            finally:
+                batches.close()
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is DataLoader.__END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
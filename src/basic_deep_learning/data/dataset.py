@@ -0,0 +1,33 @@
+"""Module containing the Dataset class."""
+from abc import ABC, abstractmethod
+from typing import Iterator
+from ..functionality.matrix import Matrix
+
+class Dataset(ABC):
+    def __init__(self,
+                 n_inputs: int,
+                 n_outputs: int) -> None:
+        """Base class of the datasets streamed by a DataLoader.
+
+        A dataset is an iterable of (inputs, outputs) samples, each part being a flat sequence of n_inputs (resp.
+        n_outputs) floats exposing the buffer protocol (memoryview, array.array, ...). Only the samples being consumed
+        need to be in memory. Datasets that also implement __len__ and __getitem__ support random access, which lets a
+        DataLoader shuffle them exactly rather than through a bounded buffer.
+
+        Subclasses must implement __iter__."""
+        if n_inputs < 1 or n_outputs < 1:
+            raise ValueError("The numbers of inputs and outputs must be positive integers.")
+        self.n_inputs = n_inputs
+        self.n_outputs = n_outputs
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[tuple[memoryview, memoryview]]:
+        """Yields the (inputs, outputs) samples of the dataset."""
+
+    @staticmethod
+    def _flat_view(part) -> memoryview:
+        """Returns a flat memoryview over the entries of one part of a sample (a column Matrix or a float buffer)."""
+        if isinstance(part, Matrix):
+            part = part._native
+        view = memoryview(part)
+        return view if view.ndim == 1 else view.cast('B').cast(view.format)
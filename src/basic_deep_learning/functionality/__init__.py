@@ -2,6 +2,9 @@
 encapsulation of matrices and activation function."""
 
 from .matrix import Matrix
+from .sparse_matrix import SparseMatrix
+from .lazy_matrix import LazyMatrix
+from .quantized_matrix import QuantizedMatrix
 from .activations_registry import ActivationFunctionsRegistry
 
-__all__ = ['Matrix', 'ActivationFunctionsRegistry']
\ No newline at end of file
+__all__ = ['Matrix', 'SparseMatrix', 'LazyMatrix', 'QuantizedMatrix', 'ActivationFunctionsRegistry']
\ No newline at end of file
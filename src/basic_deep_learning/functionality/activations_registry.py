@@ -1,67 +1,223 @@
 """Module containing the ActivationFunctionsRegistry class."""
 import math
+from functools import partial
+import matrix_ops
 from .matrix import Matrix
-from ..miscellaneous.decorators import extend_to_matrices
+from ..miscellaneous.decorators import vectorize_with
+
+_kind = matrix_ops.Activation
+
+def _native_scalar(kernel, kind):
+    """The scalar counterpart of a native kernel, evaluated on a 1x1 matrix so that numbers get the same approximation as matrices."""
+    return lambda x: kernel(matrix_ops.Matrix([[float(x)]]), kind).get_entry(1, 1)
 
 class ActivationFunctionsRegistry:
-    """Registry for the most popular activation functions and their deriviatives."""
+    """Registry for the most popular activation functions and their deriviatives.
+
+    Matrix instances are processed by native kernels over their whole buffer; numbers and lists are processed component-wise.
+
+    Each "_prime_from_output" derivative takes the output A = f(Z) of the activation instead of Z, so that backpropagation
+    never evaluates an activation twice, and each "_inplace" variant overwrites the Matrix instance it receives.
+
+    sigmoid and tanh also come in approximate versions, which do not evaluate exp nor tanh: "_table" ones interpolate
+    a table of tanh linearly, and "_rational" ones evaluate a rational function, branch-free, so that their loops are
+    vectorized (sigmoid is computed as (1 + tanh(z / 2)) / 2). ApproximationErrors gives the largest absolute error of
+    each of them on the real line, in either dtype. Their derivatives are those of the exact functions, evaluated at
+    their outputs. Their labels can be passed to MultiLayerPerceptron like the others."""
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.sigmoid))
     def sigmoid(Z):
         return 1/(1+math.exp(-Z))
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.sigmoid))
     def sigmoid_prime(Z):
-        s = ActivationFunctionsRegistry.sigmoid(Z)
+        s = 1/(1+math.exp(-Z))
         return s * (1 - s)
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime_from_output, kind=_kind.sigmoid))
+    def sigmoid_prime_from_output(A):
+        return A * (1 - A)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.ReLU))
     def ReLU(Z):
         return max(0, Z)
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.ReLU))
     def ReLU_prime(Z):
         return float(Z > 0)
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime_from_output, kind=_kind.ReLU))
+    def ReLU_prime_from_output(A):
+        return float(A > 0)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.linear))
     def linear(Z):
         return Z
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.linear))
     def linear_prime(Z):
         return 1
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime_from_output, kind=_kind.linear))
+    def linear_prime_from_output(A):
+        return 1
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.tanh))
     def tanh(Z):
         return math.tanh(Z)
     
     @staticmethod
-    @extend_to_matrices
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.tanh))
     def tanh_prime(Z):
         return 1 - (math.tanh(Z))**2
     
     @staticmethod
-    def softmax(M: Matrix): #Turns a column vector into a probability distribution.
-        if M.format[1] != 1:
-            raise TypeError("Must insert a Matrix instance whose format is that of a column vector.")
-        values = M.get_column(1)
-        max_val = max(values)
-        exponents = [math.exp(v - max_val) for v in values]
-        total = sum(exponents)
-        softmaxed_matrix = Matrix.zero(*M.format)
-        for i, exp_val in enumerate(exponents, start=1):
-            softmaxed_matrix.set_entry(exp_val / total, i, 1)
-        return softmaxed_matrix
+    @vectorize_with(partial(matrix_ops.activation_prime_from_output, kind=_kind.tanh))
+    def tanh_prime_from_output(A):
+        return 1 - A**2
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.sigmoid_table))
+    def sigmoid_table(Z):
+        return _native_scalar(matrix_ops.activate, _kind.sigmoid_table)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.sigmoid_table))
+    def sigmoid_table_prime(Z):
+        return _native_scalar(matrix_ops.activation_prime, _kind.sigmoid_table)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.tanh_table))
+    def tanh_table(Z):
+        return _native_scalar(matrix_ops.activate, _kind.tanh_table)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.tanh_table))
+    def tanh_table_prime(Z):
+        return _native_scalar(matrix_ops.activation_prime, _kind.tanh_table)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.sigmoid_rational))
+    def sigmoid_rational(Z):
+        return _native_scalar(matrix_ops.activate, _kind.sigmoid_rational)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.sigmoid_rational))
+    def sigmoid_rational_prime(Z):
+        return _native_scalar(matrix_ops.activation_prime, _kind.sigmoid_rational)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activate, kind=_kind.tanh_rational))
+    def tanh_rational(Z):
+        return _native_scalar(matrix_ops.activate, _kind.tanh_rational)(Z)
+
+    @staticmethod
+    @vectorize_with(partial(matrix_ops.activation_prime, kind=_kind.tanh_rational))
+    def tanh_rational_prime(Z):
+        return _native_scalar(matrix_ops.activation_prime, _kind.tanh_rational)(Z)
+
+    @staticmethod
+    def softmax(M: Matrix): #Turns each column into a probability distribution.
+        if not isinstance(M, Matrix):
+            raise TypeError("Must insert a Matrix instance.")
+        return Matrix._from_native(matrix_ops.softmax(M._native))
+
+    @staticmethod
+    def softmax_prime_from_output(S: Matrix): #Diagonal of the Jacobian of softmax, s * (1 - s), from its output S.
+        if not isinstance(S, Matrix):
+            raise TypeError("Must insert a Matrix instance.")
+        return Matrix._from_native(matrix_ops.activation_prime_from_output(S._native, _kind.sigmoid))
+
+    @staticmethod
+    def sigmoid_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.sigmoid)
+        return M
+
+    @staticmethod
+    def ReLU_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.ReLU)
+        return M
+
+    @staticmethod
+    def linear_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.linear)
+        return M
+
+    @staticmethod
+    def tanh_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.tanh)
+        return M
+
+    @staticmethod
+    def sigmoid_table_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.sigmoid_table)
+        return M
+
+    @staticmethod
+    def tanh_table_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.tanh_table)
+        return M
+
+    @staticmethod
+    def sigmoid_rational_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.sigmoid_rational)
+        return M
+
+    @staticmethod
+    def tanh_rational_inplace(M: Matrix) -> Matrix:
+        matrix_ops.activate_inplace(M._native, _kind.tanh_rational)
+        return M
+
+    @staticmethod
+    def softmax_inplace(M: Matrix) -> Matrix:
+        matrix_ops.softmax_inplace(M._native)
+        return M
     
     Activations = {
         'sigmoid': (sigmoid, sigmoid_prime),
         'ReLU': (ReLU, ReLU_prime),
         'linear': (linear, linear_prime),
-        'tanh': (tanh, tanh_prime)
+        'tanh': (tanh, tanh_prime),
+        'sigmoid_table': (sigmoid_table, sigmoid_table_prime),
+        'tanh_table': (tanh_table, tanh_table_prime),
+        'sigmoid_rational': (sigmoid_rational, sigmoid_rational_prime),
+        'tanh_rational': (tanh_rational, tanh_rational_prime)
+    }
+
+    ActivationsFromOutput = { #Same functions, with the deriviatives expressed through the activation output.
+        'sigmoid': (sigmoid, sigmoid_prime_from_output),
+        'ReLU': (ReLU, ReLU_prime_from_output),
+        'linear': (linear, linear_prime_from_output),
+        'tanh': (tanh, tanh_prime_from_output),
+        'sigmoid_table': (sigmoid_table, sigmoid_prime_from_output),
+        'tanh_table': (tanh_table, tanh_prime_from_output),
+        'sigmoid_rational': (sigmoid_rational, sigmoid_prime_from_output),
+        'tanh_rational': (tanh_rational, tanh_prime_from_output)
+    }
+
+    InPlaceActivations = {
+        'sigmoid': sigmoid_inplace,
+        'ReLU': ReLU_inplace,
+        'linear': linear_inplace,
+        'tanh': tanh_inplace,
+        'sigmoid_table': sigmoid_table_inplace,
+        'tanh_table': tanh_table_inplace,
+        'sigmoid_rational': sigmoid_rational_inplace,
+        'tanh_rational': tanh_rational_inplace
+    }
+
+    ApproximationErrors = { #Largest absolute error of each approximation, and of its derivative, measured on a fine grid of [-12, 12].
+        'sigmoid_table': (8e-7, 6e-7),
+        'tanh_table': (1.6e-6, 2.1e-6),
+        'sigmoid_rational': (2.5e-7, 2.5e-7),
+        'tanh_rational': (4e-7, 8e-7)
     }
\ No newline at end of file
@@ -0,0 +1,349 @@
+"""Module containing the LazyMatrix class."""
+from typing import Self, Literal
+import matrix_ops
+from .matrix import Matrix
+
+_ELEMENTWISE = {'add', 'sub', 'cwise_prod', 'scale', 'add_to_columns', 'activate', 'activation_prime',
+                'activation_prime_from_output'}
+_FUSED_OPS = {'add': matrix_ops.FusedOp.add, 'sub': matrix_ops.FusedOp.sub, 'cwise_prod': matrix_ops.FusedOp.mul,
+              'activate': matrix_ops.FusedOp.activate, 'activation_prime': matrix_ops.FusedOp.activation_prime,
+              'activation_prime_from_output': matrix_ops.FusedOp.activation_prime_from_output}
+
+class LazyMatrix:
+    def __init__(self, matrix: Matrix) -> None:
+        """Matrix expression evaluated on demand: its operators mirror those of Matrix, but build an expression tree
+        instead of computing a result. "M.lazy()" (or "LazyMatrix(M)") starts an expression from the matrix M, and Matrix
+        instances can be mixed into it.
+
+        Example: "E = ((A.lazy() - Y) @ Z.activation_prime('sigmoid')).evaluate()" evaluates the error of a sigmoid layer
+        in a single pass over the entries, without creating A - Y nor the derivative.
+
+        When evaluated, the expression is simplified and compiled into as few native kernels as possible:
+        - chains of element-wise operations (+, -, @, scaling, add_to_columns and activation functions) are fused into
+        a single kernel, which creates no intermediate matrix;
+        - products absorb the transpositions and the scalar factors of their operands (e.g. "(c * A.T()) * B" is
+        one call of the product kernel), and a product followed by add_to_columns and an activation function is
+        evaluated by the fused dense layer kernel;
+        - identical subexpressions (e.g. two "W.T()") are evaluated once.
+
+        The operands are read when the expression is evaluated, not when it is built. The result is kept, so evaluating
+        an expression again is free."""
+        if not isinstance(matrix, Matrix):
+            raise TypeError("Must insert a Matrix instance.")
+        self.op = 'leaf' #The operation of the node ('leaf' for a matrix).
+        self.operands: tuple[Self, ...] = ()
+        self.params: tuple = () #The parameters of the operation (e.g. the factor of a scaling), part of its identity.
+        self.format = matrix.format
+        self.dtype = matrix.dtype
+        self._value: Matrix|None = matrix #The result, once evaluated.
+
+    @classmethod
+    def _node(cls,
+              op: str,
+              operands: tuple[Self, ...],
+              params: tuple,
+              format: tuple[int, int]) -> Self: #Private method.
+        """Builds the node applying op to the operands; they must already have the same dtype."""
+        node = cls.__new__(cls)
+        node.op = op
+        node.operands = operands
+        node.params = params
+        node.format = format
+        node.dtype = operands[0].dtype
+        node._value = None
+        return node
+
+    @staticmethod
+    def __wrap(B: Matrix|Self) -> Self|None: #Private method.
+        """Returns B as a LazyMatrix, or None if it is neither a Matrix nor a LazyMatrix instance."""
+        if isinstance(B, LazyMatrix):
+            return B
+        if isinstance(B, Matrix):
+            return LazyMatrix(B)
+        return None
+
+    def __check_dtype(self, B: Self) -> None: #Private method.
+        """Raises an error if the entries of B are not of the same type as those of the expression."""
+        if self.dtype != B.dtype:
+            raise TypeError(f"Cannot combine matrices of dtypes {self.dtype} and {B.dtype}; convert one with astype.")
+
+    def __binary(self,
+                 op: str,
+                 B: Matrix|Self,
+                 message: str) -> Self: #Private method.
+        """Builds an element-wise operation between two expressions of the same format."""
+        B = LazyMatrix.__wrap(B)
+        if B is None:
+            return NotImplemented
+        if self.format != B.format:
+            raise TypeError(message)
+        self.__check_dtype(B)
+        return LazyMatrix._node(op, (self, B), (), self.format)
+
+    def __add__(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of the + operator of Matrix."""
+        return self.__binary('add', B, "Cannot add two matrices of different formats.")
+
+    def __radd__(self, B: Matrix) -> Self:
+        return LazyMatrix.__wrap(B) + self if isinstance(B, Matrix) else NotImplemented
+
+    def __sub__(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of the - operator of Matrix."""
+        return self.__binary('sub', B, "Cannot subtract two matrices of different formats.")
+
+    def __rsub__(self, B: Matrix) -> Self:
+        return LazyMatrix.__wrap(B) - self if isinstance(B, Matrix) else NotImplemented
+
+    def __matmul__(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of the @ operator (element-wise product) of Matrix."""
+        return self.__binary('cwise_prod', B, "Cannot multiply component-wise two matrices of different formats.")
+
+    def __rmatmul__(self, B: Matrix) -> Self:
+        return LazyMatrix.__wrap(B) @ self if isinstance(B, Matrix) else NotImplemented
+
+    def __mul__(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of the * operator (matrix product) of Matrix."""
+        B = LazyMatrix.__wrap(B)
+        if B is None:
+            return NotImplemented
+        if self.format[1] != B.format[0]:
+            raise TypeError(f"Invalid matrix formats ({self.format[1]}≠{B.format[0]}).")
+        self.__check_dtype(B)
+        return LazyMatrix._node('product', (self, B), (False, False, 1.0), (self.format[0], B.format[1]))
+
+    def __rmul__(self, B: int|float|Matrix) -> Self:
+        """Lazy counterpart of the multiplication of a Matrix instance by a scalar on the left."""
+        if isinstance(B, Matrix):
+            return LazyMatrix(B) * self
+        if not isinstance(B, (int, float)):
+            return NotImplemented
+        return LazyMatrix._node('scale', (self,), (float(B),), self.format)
+
+    def __truediv__(self, scalar: int|float) -> Self:
+        if not isinstance(scalar, (int, float)):
+            raise TypeError("Can only divide by scalar")
+        return (1 / scalar) * self
+
+    def T(self) -> Self:
+        """Lazy counterpart of Matrix.T."""
+        return LazyMatrix._node('transpose', (self,), (), (self.format[1], self.format[0]))
+
+    def T_mul(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of Matrix.T_mul; the same as "self.T() * B"."""
+        return self.T() * B
+
+    def mul_T(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of Matrix.mul_T; the same as "self * B.T()"."""
+        B = LazyMatrix.__wrap(B)
+        if B is None:
+            raise TypeError("Must insert a Matrix or a LazyMatrix instance.")
+        return self * B.T()
+
+    def add_to_columns(self, B: Matrix|Self) -> Self:
+        """Lazy counterpart of Matrix.add_to_columns."""
+        B = LazyMatrix.__wrap(B)
+        if B is None:
+            raise TypeError("Must insert a Matrix or a LazyMatrix instance.")
+        if B.format != (self.format[0], 1):
+            raise TypeError(f"Must add a column vector of format ({self.format[0]}, 1).")
+        self.__check_dtype(B)
+        return LazyMatrix._node('add_to_columns', (self, B), (), self.format)
+
+    def sum_columns(self) -> Self:
+        """Lazy counterpart of Matrix.sum_columns."""
+        return LazyMatrix._node('sum_columns', (self,), (), (self.format[0], 1))
+
+    def __activation(self,
+                     op: str,
+                     label: str) -> Self: #Private method.
+        if not hasattr(matrix_ops.Activation, label):
+            raise ValueError(f"Unknown activation function {label!r}.")
+        return LazyMatrix._node(op, (self,), (label,), self.format)
+
+    def activate(self, label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                      'sigmoid_rational', 'tanh_rational']) -> Self:
+        """Applies the activation function of the given label (see ActivationFunctionsRegistry) to every entry."""
+        return self.__activation('activate', label)
+
+    def activation_prime(self, label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                              'sigmoid_rational', 'tanh_rational']) -> Self:
+        """Evaluates the derivative of the activation function of the given label at every entry."""
+        return self.__activation('activation_prime', label)
+
+    def activation_prime_from_output(self, label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                                          'sigmoid_rational', 'tanh_rational']) -> Self:
+        """Evaluates the derivative of the activation function of the given label from its output A = f(Z)."""
+        return self.__activation('activation_prime_from_output', label)
+
+    def evaluate(self) -> Matrix:
+        """Evaluates the expression and returns the resulting Matrix instance."""
+        return LazyMatrix.evaluate_all(self)[0]
+
+    @staticmethod
+    def evaluate_all(*expressions: Self) -> list[Matrix]:
+        """Evaluates several expressions together, so that the subexpressions they share are only evaluated once."""
+        compiler = _Compiler()
+        roots = [compiler.canonical(E) for E in expressions]
+        compiler.count_consumers(roots)
+        results = []
+        for E, root in zip(expressions, roots):
+            E._value = compiler.evaluate(root)
+            results.append(E._value)
+        return results
+
+    def __repr__(self) -> str:
+        if self.op == 'leaf':
+            return f'LazyMatrix(leaf, format={self.format}, dtype={self.dtype})'
+        params = f', {self.params}' if self.params else ''
+        return f'LazyMatrix({self.op}{params}, format={self.format}, dtype={self.dtype})'
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        """Simplifies expressions into a graph without duplicate nodes and evaluates it with native kernels."""
+        self.nodes: dict[tuple, LazyMatrix] = {} #The canonical nodes, by structural key.
+        self.canonical_of: dict[int, LazyMatrix] = {} #The canonical node of each visited expression, by id.
+        self.consumers: dict[int, int] = {} #The number of nodes using each canonical node, by id.
+        self.values: dict[int, Matrix] = {} #The evaluated canonical nodes, by id.
+
+    def make(self,
+             op: str,
+             operands: tuple[LazyMatrix, ...],
+             params: tuple,
+             format: tuple[int, int]) -> LazyMatrix:
+        """Returns the canonical node applying op to canonical operands, after the algebraic simplifications."""
+        if op == 'transpose':
+            (X,) = operands
+            if X.op == 'transpose': #(X^T)^T = X.
+                return X.operands[0]
+            if X.op == 'scale': #(kX)^T = k X^T, so that the factor can reach a product.
+                return self.make('scale', (self.make('transpose', X.operands, (), format),), X.params, format)
+            if X.op == 'product': #(AB)^T = B^T A^T, with the transpositions absorbed by the product.
+                (A, B), (transpose_a, transpose_b, alpha) = X.operands, X.params
+                return self.make('product', (B, A), (not transpose_b, not transpose_a, alpha), format)
+        elif op == 'scale':
+            (X,), (k,) = operands, params
+            if k == 1:
+                return X
+            if X.op == 'scale':
+                return self.make('scale', X.operands, (X.params[0] * k,), format)
+            if X.op == 'product':
+                return self.make('product', X.operands, X.params[:2] + (X.params[2] * k,), format)
+        elif op == 'product':
+            (A, B), (transpose_a, transpose_b, alpha) = operands, params
+            while A.op in ('transpose', 'scale') or B.op in ('transpose', 'scale'):
+                if A.op == 'transpose':
+                    A, transpose_a = A.operands[0], not transpose_a
+                elif A.op == 'scale':
+                    A, alpha = A.operands[0], alpha * A.params[0]
+                elif B.op == 'transpose':
+                    B, transpose_b = B.operands[0], not transpose_b
+                else:
+                    B, alpha = B.operands[0], alpha * B.params[0]
+            operands, params = (A, B), (transpose_a, transpose_b, alpha)
+        key = (op, tuple(id(X) for X in operands), params)
+        if key not in self.nodes:
+            self.nodes[key] = LazyMatrix._node(op, operands, params, format)
+        return self.nodes[key]
+
+    def canonical(self, E: LazyMatrix) -> LazyMatrix:
+        """Returns the canonical node of the expression E."""
+        if id(E) in self.canonical_of:
+            return self.canonical_of[id(E)]
+        if E._value is not None: #Matrices and evaluated expressions are leaves, identified by their result.
+            key = ('leaf', id(E._value), ())
+            if key not in self.nodes:
+                self.nodes[key] = LazyMatrix(E._value)
+            node = self.nodes[key]
+        else:
+            node = self.make(E.op, tuple(self.canonical(X) for X in E.operands), E.params, E.format)
+        self.canonical_of[id(E)] = node
+        return node
+
+    def count_consumers(self, roots: list[LazyMatrix]) -> None:
+        """Counts the nodes (and roots) using each node of the graph."""
+        stack = list(roots)
+        for root in roots:
+            self.consumers[id(root)] = self.consumers.get(id(root), 0) + 1
+        visited = set()
+        while stack:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            for X in node.operands:
+                self.consumers[id(X)] = self.consumers.get(id(X), 0) + 1
+                stack.append(X)
+
+    def is_fusable(self, node: LazyMatrix) -> bool:
+        """Whether node can be evaluated inside the kernel of its consumer, i.e. element-wise and used only once."""
+        return node.op in _ELEMENTWISE and self.consumers[id(node)] == 1 and id(node) not in self.values
+
+    def evaluate(self, node: LazyMatrix) -> Matrix:
+        """Evaluates a canonical node, reusing the nodes already evaluated."""
+        if id(node) in self.values:
+            return self.values[id(node)]
+        if node.op == 'leaf':
+            value = node._value
+        elif node.op == 'product':
+            (A, B), (transpose_a, transpose_b, alpha) = node.operands, node.params
+            value = Matrix._from_native(type(self.native(A)).product(self.native(A), self.native(B), transpose_a=transpose_a,
+                                                                       transpose_b=transpose_b, alpha=alpha))
+        elif node.op == 'transpose':
+            value = Matrix._from_native(type(self.native(node.operands[0])).transpose(self.native(node.operands[0])))
+        elif node.op == 'sum_columns':
+            value = Matrix._from_native(type(self.native(node.operands[0])).sum_columns(self.native(node.operands[0])))
+        else:
+            value = self.dense_layer(node) or self.fused(node)
+        self.values[id(node)] = value
+        return value
+
+    def native(self, node: LazyMatrix) -> matrix_ops.Matrix|matrix_ops.Matrix32:
+        return self.evaluate(node)._native
+
+    def dense_layer(self, node: LazyMatrix) -> Matrix|None:
+        """Evaluates "f((W * X).add_to_columns(b))" (or "(W * X).add_to_columns(b)") with the fused dense layer kernel,
+        or returns None if node does not have that form."""
+        kind = matrix_ops.Activation.linear
+        if node.op == 'activate' and self.is_fusable(node.operands[0]) and node.operands[0].op == 'add_to_columns':
+            kind = getattr(matrix_ops.Activation, node.params[0])
+            node = node.operands[0]
+        if node.op != 'add_to_columns':
+            return None
+        product, bias = node.operands
+        if (product.op != 'product' or product.params != (False, False, 1.0) or self.consumers[id(product)] != 1
+                or id(product) in self.values):
+            return None
+        W, X = product.operands
+        A, _ = matrix_ops.dense_forward(self.native(W), self.native(X), self.native(bias), kind, keep_pre_activation=False)
+        return Matrix._from_native(A)
+
+    def fused(self, root: LazyMatrix) -> Matrix:
+        """Evaluates an element-wise node, together with the element-wise nodes only it uses, in a single kernel."""
+        operands = []
+        program = []
+        registers: dict[tuple[int, bool], int] = {}
+        def load(node: LazyMatrix, column: bool) -> int:
+            if (id(node), column) not in registers:
+                operands.append(self.native(node))
+                op = matrix_ops.FusedOp.load_column if column else matrix_ops.FusedOp.load
+                program.append((op, len(operands) - 1, 0, 0.0))
+                registers[(id(node), column)] = len(program) - 1
+            return registers[(id(node), column)]
+        def emit(node: LazyMatrix) -> int:
+            if node is not root and not self.is_fusable(node):
+                return load(node, column=False)
+            if node.op == 'scale':
+                program.append((matrix_ops.FusedOp.scale, emit(node.operands[0]), 0, node.params[0]))
+            elif node.op == 'add_to_columns':
+                a, b = emit(node.operands[0]), load(node.operands[1], column=True)
+                program.append((matrix_ops.FusedOp.add, a, b, 0.0))
+            elif node.op in ('activate', 'activation_prime', 'activation_prime_from_output'):
+                kind = getattr(matrix_ops.Activation, node.params[0])
+                program.append((_FUSED_OPS[node.op], emit(node.operands[0]), int(kind), 0.0))
+            else:
+                a, b = emit(node.operands[0]), emit(node.operands[1])
+                program.append((_FUSED_OPS[node.op], a, b, 0.0))
+            return len(program) - 1
+        emit(root)
+        return Matrix._from_native(matrix_ops.fused_elementwise(operands, program, *root.format))
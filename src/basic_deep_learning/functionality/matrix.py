@@ -1,11 +1,16 @@
 """Module containing the Matrix class."""
-from typing import Self
+from typing import Self, Literal
+from array import array
 import random
+import sys
 import matrix_ops
 
 class Matrix:
+    _NATIVE_TYPES = {'float64': matrix_ops.Matrix, 'float32': matrix_ops.Matrix32} #The native class of each dtype.
+
     def __init__(self,
-                matrix: list[list[int|float]]) -> None:
+                matrix: list[list[int|float]],
+                dtype: Literal['float64', 'float32'] = 'float64') -> None:
         """Implementation of matrices as a list of lists; each inner list representing a row.
         
         Example: The following matrix M=
@@ -15,22 +20,162 @@ class Matrix:
         
         is implemented as "M=Matrix([[1,2],[3,4]])".
         
-        If the user passes to the matrix argument a list of uneven rows, the constructor automatically fills the empty places with 0's."""
+        If the user passes to the matrix argument a list of uneven rows, the constructor automatically fills the empty places with 0's.
+
+        The entries are copied once into a contiguous native buffer (a matrix_ops.Matrix instance) shared with the C++ extension;
+        the list of lists is only rebuilt when the matrix attribute is accessed.
+
+        dtype is the type of the entries: 'float64' (default) or 'float32', which halves the memory and doubles the
+        throughput of the native kernels at the cost of a lower precision. Operations between matrices require them to
+        have the same dtype; use astype to convert."""
         if not matrix:
             raise TypeError("Cannot pass an empty matrix.")
         pmax = max(len(matrix[i]) for i in range(len(matrix)))
         if pmax < 1:
             raise TypeError("Cannot pass an empty matrix.")   
         self.format = (len(matrix), pmax) #The format of the matrix in the form of a (number of rows, numbers of columns) tuple.
-        self.matrix = [row + [0] * (pmax - len(row)) for row in matrix] #The list of lists representing the matrix, where the empty spaces are filled with 0's.
+        self._native = Matrix.__native_type(dtype)(matrix) #The native buffer, where the empty spaces are filled with 0's.
+
+    @staticmethod
+    def __native_type(dtype: str) -> type: #Private method.
+        """Returns the native class storing entries of the given dtype."""
+        if dtype not in Matrix._NATIVE_TYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {list(Matrix._NATIVE_TYPES)}.")
+        return Matrix._NATIVE_TYPES[dtype]
+
+    @classmethod
+    def _from_native(cls, native: matrix_ops.Matrix|matrix_ops.Matrix32) -> Self: #Private method.
+        """Wraps an existing matrix_ops.Matrix (or Matrix32) instance without copying its buffer."""
+        matrix_instance = cls.__new__(cls)
+        matrix_instance.format = (native.rows, native.cols)
+        matrix_instance._native = native
+        return matrix_instance
+
+    @property
+    def matrix(self) -> list[list[float]]:
+        """The list of lists representing the matrix, built from the native buffer on access."""
+        return self._native.get_matrix()
+
+    @property
+    def dtype(self) -> str:
+        """The type of the entries: 'float64' or 'float32'."""
+        return self._native.dtype
+
+    def astype(self, dtype: Literal['float64', 'float32']) -> Self:
+        """Returns a copy of the matrix whose entries are converted to the given dtype."""
+        return Matrix._from_native(Matrix.__native_type(dtype)(self._native))
+
+    def __into(self,
+               out: Self,
+               kernel,
+               *operands) -> Self: #Private method.
+        """Runs a native "_into" kernel writing into the buffer of out, which it reuses whenever it is large enough,
+        and returns out. If out is too small while its buffer is exported (see __buffer__), the kernel raises a
+        BufferError instead of reallocating it, and out is left unchanged."""
+        if not isinstance(out, Matrix):
+            raise TypeError("The output must be a Matrix instance.")
+        if out._native.dtype != self._native.dtype:
+            raise TypeError(f"Cannot write a {self.dtype} result into a {out.dtype} matrix.")
+        kernel(out._native, *operands)
+        out.format = (out._native.rows, out._native.cols)
+        return out
+
+    def __check_dtype(self, B: Self) -> None: #Private method.
+        """Raises an error if the entries of B are not of the same type as those of the matrix."""
+        if self._native.dtype != B._native.dtype:
+            raise TypeError(f"Cannot combine matrices of different dtypes ({self.dtype}≠{B.dtype}).")
+
+    def __buffer__(self, flags: int) -> memoryview:
+        """Exposes the entries through the buffer protocol, as a writable row-major 2-D buffer of float64 ('d') or
+        float32 ('f') entries, without copying them: memoryview(M), array.array, numpy.asarray(M), ...
+
+        While such an export is alive, the buffer of the matrix is never reallocated: an operation that would need to
+        grow it (an out= argument too small for the result, ...) raises a BufferError instead, as for a bytearray."""
+        return memoryview(self._native)
+
+    def __array__(self, dtype=None, copy: bool|None = None):
+        """Returns the matrix as a NumPy array of the same format, which shares the buffer of the matrix unless a copy
+        is requested or needed to convert the entries to dtype (see __buffer__ for the lifetime of a shared buffer)."""
+        import numpy
+        array = numpy.asarray(memoryview(self._native))
+        if dtype is not None and array.dtype != numpy.dtype(dtype):
+            if copy is False:
+                raise ValueError(f"Cannot convert a {self.dtype} matrix to {numpy.dtype(dtype)} without copying it.")
+            return array.astype(dtype)
+        return array.copy() if copy else array
+
+    @classmethod
+    def from_buffer(cls,
+                    buffer,
+                    n: int|None = None,
+                    p: int|None = None,
+                    dtype: Literal['float64', 'float32']|None = None,
+                    copy: bool|None = None) -> Self:
+        """Returns a matrix over the entries of any object supporting the buffer protocol (array.array, memoryview,
+        bytearray, NumPy arrays, ...), read in row-major order.
+
+        The format is (n, p) if given, the shape of a 2-D buffer, or a column vector for a 1-D buffer. dtype defaults
+        to the type of the entries of the buffer: float32 for 'f' entries, float64 otherwise.
+
+        A writable, C-contiguous buffer of float64 or float32 entries of that dtype is wrapped without copying: the
+        matrix and the buffer then share their entries, and the matrix keeps the buffer alive. Any other buffer is
+        copied, converting its entries, unless copy is False, in which case an error is raised; copy=True always copies."""
+        view = memoryview(buffer)
+        if n is None or p is None:
+            if view.ndim == 2:
+                n, p = view.shape
+            elif view.ndim == 1:
+                n, p = view.shape[0], 1
+            else:
+                raise TypeError(f"Cannot infer the format of a {view.ndim}-dimensional buffer; pass n and p.")
+        if n < 1 or p < 1:
+            raise TypeError("Cannot pass an empty matrix.")
+        if n * p != view.nbytes // view.itemsize:
+            raise ValueError(f"The buffer holds {view.nbytes // view.itemsize} entries, not {n}x{p}={n * p}.")
+        typecode = view.format
+        if typecode[0] in '@=' or typecode[0] == ('<' if sys.byteorder == 'little' else '>'):
+            typecode = typecode[1:]
+        if len(typecode) != 1:
+            raise TypeError(f"Unsupported buffer format {view.format!r}.")
+        if dtype is None:
+            dtype = 'float32' if typecode == 'f' else 'float64'
+        native_type = cls.__native_type(dtype)
+        wrappable = typecode == ('d' if dtype == 'float64' else 'f') and not view.readonly and view.c_contiguous
+        if wrappable and not copy:
+            return cls._from_native(native_type.view(view.cast('B').cast(typecode), n, p))
+        if copy is False:
+            raise ValueError(f"A {dtype} matrix cannot share the entries of a {'read-only ' if view.readonly else ''}buffer "
+                             f"of format {view.format!r}{'' if view.c_contiguous else ' that is not C-contiguous'}.")
+        entries = array('f' if dtype == 'float32' else 'd', memoryview(view.tobytes()).cast(typecode))
+        return cls._from_native(native_type.view(entries, n, p))
+
+    @classmethod
+    def from_numpy(cls,
+                   array,
+                   dtype: Literal['float64', 'float32']|None = None,
+                   copy: bool|None = None) -> Self:
+        """Returns a matrix over the entries of a 1-D (column vector) or 2-D NumPy array.
+
+        As with from_buffer, a writable, C-contiguous float64 or float32 array is wrapped without copying; other arrays
+        are converted by NumPy (unless copy is False, in which case an error is raised). NumPy itself is not needed to
+        use the rest of the library."""
+        if array.ndim not in (1, 2):
+            raise TypeError(f"Cannot build a matrix from a {array.ndim}-dimensional array.")
+        if dtype is None:
+            dtype = 'float32' if array.dtype == 'float32' else 'float64'
+        if array.dtype != dtype or not array.flags.c_contiguous or not array.flags.writeable or copy:
+            if copy is False:
+                raise ValueError(f"A {dtype} matrix cannot share the entries of this {array.dtype} array.")
+            array = array.astype(dtype, order='C')
+        return cls.from_buffer(array, *(array.shape if array.ndim == 2 else (array.shape[0], 1)), dtype=dtype, copy=False)
 
     def __validate_indices(self,
                            i: int|None = None,
                            j: int|None = None) -> None: #Private method.
         """If at least one index is passesd, the method will raise an error if that index is within the appropriate range."""
-        if i is not None and i not in range(1,self.format[0]+1):
+        if i is not None and not 1 <= i <= self.format[0]:
             raise IndexError(f"Index {i} is out of the expected range [1,{self.format[0]}].")
-        if j is not None and j not in range(1,self.format[1]+1):
+        if j is not None and not 1 <= j <= self.format[1]:
             raise IndexError(f"Index {j} is out of the expected range [1,{self.format[1]}].")
     
     def get_entry(self,
@@ -42,7 +187,7 @@ class Matrix:
         
         Raises an error if either one of the indices is out of range."""
         self.__validate_indices(i, j)
-        return self.matrix[i-1][j-1]
+        return self._native.get_entry(i, j)
     
     def set_entry(self,
                   value: int|float,
@@ -54,7 +199,7 @@ class Matrix:
         
         Raises an error if either one of the indices is out of range."""
         self.__validate_indices(i, j)
-        self.matrix[i-1][j-1] = value
+        self._native.set_entry(value, i, j)
     
     def get_row(self,
                 i: int) -> list[int|float]:
@@ -64,7 +209,7 @@ class Matrix:
         
         Raises an error if the index is out of range."""
         self.__validate_indices(i=i)
-        return self.matrix[i-1]
+        return self._native.get_row(i)
     
     def get_column(self,
                 j: int) -> list[int|float]:
@@ -74,19 +219,95 @@ class Matrix:
         
         Raises an error if the index is out of range."""
         self.__validate_indices(j=j)
-        return [row[j - 1] for row in self.matrix]
-    
+        return self._native.get_column(j)
+
+    def get_columns(self,
+                    j: int,
+                    k: int,
+                    out: Self|None = None) -> Self:
+        """Returns the matrix made of the columns j to k (both included), written into out if it is given (see add).
+
+        The indexation of the matrix's rows and columns are according to the mathematical convention, ie. starts at 1.
+
+        Raises an error if either one of the indices is out of range or if j > k."""
+        self.__validate_indices(j=j)
+        self.__validate_indices(j=k)
+        if j > k:
+            raise IndexError(f"Invalid range of columns [{j},{k}].")
+        if out is not None:
+            return self.__into(out, type(self._native).columns_into, self._native, j-1, k-j+1)
+        return Matrix._from_native(type(self._native).columns(self._native, j-1, k-j+1))
+
     @classmethod
     def zero(cls,
             n: int,
-            p: int) -> Self:
+            p: int,
+            dtype: Literal['float64', 'float32'] = 'float64') -> Self:
         """Takes a format (number of rows, number of columns) and returns a matrix with that format and whose entries are all zeros."""
-        return cls([[0 for j in range(p)] for i in range(n)])
+        if n < 1 or p < 1:
+            raise TypeError("Cannot pass an empty matrix.")
+        return cls._from_native(cls.__native_type(dtype).zero(n, p))
+    
+    def copy(self, out: Self|None = None) -> Self:
+        """Returns a copy of the matrix that does not share its buffer, written into out if it is given (see add)."""
+        if out is not None:
+            return self.__into(out, type(self._native).columns_into, self._native, 0, self.format[1])
+        return Matrix._from_native(type(self._native)(self._native))
     
-    def T(self) -> Self:
-        """Returns the transposed matrix."""
-        transposed = [[self.matrix[j][i] for j in range(self.format[0])] for i in range(self.format[1])]
-        return Matrix(transposed)
+    def T(self, out: Self|None = None) -> Self:
+        """Returns the transposed matrix, written into out if it is given (see add)."""
+        if out is not None:
+            return self.__into(out, type(self._native).transpose_into, self._native)
+        return Matrix._from_native(type(self._native).transpose(self._native))
+
+    @classmethod
+    def hstack(cls,
+               matrices: list[Self]) -> Self:
+        """Takes a list of matrices with the same number of rows and returns the matrix obtained by placing them side by side.
+
+        Typically used to stack column vectors (samples) into a single batch matrix.
+
+        Raises an error if the list is empty or if the numbers of rows do not match."""
+        if not matrices:
+            raise TypeError("Cannot stack an empty list of matrices.")
+        if any(M.format[0] != matrices[0].format[0] for M in matrices):
+            raise TypeError("Cannot stack matrices with different numbers of rows.")
+        for M in matrices:
+            matrices[0].__check_dtype(M)
+        return cls._from_native(type(matrices[0]._native).hstack([M._native for M in matrices]))
+
+    def add_to_columns(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the matrix obtained by adding the column vector B to each column of the matrix, written into out if
+        it is given (see add).
+
+        Raises an error if B is not a column vector with as many rows as the matrix."""
+        if B.format != (self.format[0], 1):
+            raise TypeError(f"Must add a column vector of format ({self.format[0]}, 1).")
+        self.__check_dtype(B)
+        if out is not None:
+            return self.__into(out, type(self._native).add_to_columns_into, self._native, B._native)
+        return Matrix._from_native(type(self._native).add_to_columns(self._native, B._native))
+
+    def sum_columns(self, out: Self|None = None) -> Self:
+        """Returns the column vector obtained by summing all the columns of the matrix, written into out if it is given (see add)."""
+        if out is not None:
+            return self.__into(out, type(self._native).sum_columns_into, self._native)
+        return Matrix._from_native(type(self._native).sum_columns(self._native))
+
+    def add(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the sum of the matrix and B, like the + operator.
+
+        If out is given, the result is written into it and out is returned: its buffer is reused whenever it is large
+        enough (it is resized to the format of the result), so that no matrix is allocated. out can be one of the
+        operands of element-wise operations, but not of products, transpositions nor sums of columns.
+
+        Raises an error if the formats of the matrices do not match."""
+        if self.format != B.format:
+            raise TypeError("Cannot add two matrices of different formats.")
+        self.__check_dtype(B)
+        if out is not None:
+            return self.__into(out, type(self._native).sum_into, self._native, B._native)
+        return Matrix._from_native(type(self._native).sum(self._native, B._native))
 
     def __add__(self, B: Self) -> Self:
         """Overloads the + operator to Matrix objects.
@@ -94,13 +315,18 @@ class Matrix:
         If M and N are two Matrix instances, "M+N" returns a matrix instance representing their sum.
         
         Raises an error if the formats of the matrices do not match."""
-        if self.format != B.format:
-            raise TypeError("Cannot add two matrices of different formats.")
-        A_cpp = matrix_ops.Matrix(self.matrix)
-        B_cpp = matrix_ops.Matrix(B.matrix)  # Changed from B.format to B.matrix
-        C_cpp = matrix_ops.Matrix.sum(A_cpp, B_cpp)
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        return self.add(B)
 
-        return Matrix(C_cpp.get_matrix())
+    def sub(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the difference of the matrix and B, like the - operator, written into out if it is given (see add)."""
+        if self.format != B.format:
+            raise TypeError("Cannot subtraact two matrices of different formats.")
+        self.__check_dtype(B)
+        if out is not None:
+            return self.__into(out, type(self._native).difference_into, self._native, B._native)
+        return Matrix._from_native(type(self._native).difference(self._native, B._native))
 
     def __sub__(self, B: Self) -> Self:
         """Overloads the - operator to Matrix objects.
@@ -108,71 +334,123 @@ class Matrix:
         If M and N are two Matrix instances, "M-N" returns a matrix instance representing their difference.
         
         Raises an error if the formats of the matrices do not match."""
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        return self.sub(B)
+        
+    def cwise_prod(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the element-wise product of the matrix and B, like the @ operator, written into out if it is given (see add)."""
         if self.format != B.format:
-            raise TypeError("Cannot subtraact two matrices of different formats.")
-        A_cpp = matrix_ops.Matrix(self.matrix)
-        B_cpp = matrix_ops.Matrix(B.matrix)  # Changed from B.format to B.matrix
-        minusB_cpp = matrix_ops.Matrix.scale(B_cpp, -1)
-        C_cpp = matrix_ops.Matrix.sum(A_cpp, minusB_cpp)
+            raise TypeError("Cannot multiply component-wise two matrices of different formats.")
+        self.__check_dtype(B)
+        if out is not None:
+            return self.__into(out, type(self._native).cwise_prod_into, self._native, B._native)
+        return Matrix._from_native(type(self._native).cwise_prod(self._native, B._native))
 
-        return Matrix(C_cpp.get_matrix())
-        
     def __matmul__(self, B: Self) -> Self:
         """Overloads the @ operator to Matrix objects.
         
         If M and N are two Matrix instances, "M @ N" returns a matrix instance representing their element-wise product.
         
         Raises an error if the formats of the matrices do not match."""
-        if self.format != B.format:
-            raise TypeError("Cannot multiply component-wise two matrices of different formats.")
-        A_cpp = matrix_ops.Matrix(self.matrix)
-        B_cpp = matrix_ops.Matrix(B.matrix)
-        C_cpp = matrix_ops.Matrix.cwise_prod(A_cpp, B_cpp)
-
-        return Matrix(C_cpp.get_matrix())
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        return self.cwise_prod(B)
     
+    def __product(self,
+                  B: Self,
+                  out: Self|None,
+                  transpose_a: bool,
+                  transpose_b: bool) -> Self: #Private method.
+        self.__check_dtype(B)
+        if out is not None:
+            return self.__into(out, type(self._native).product_into, self._native, B._native, transpose_a, transpose_b)
+        return Matrix._from_native(type(self._native).product(self._native, B._native, transpose_a, transpose_b))
+
+    def mul(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the product of the matrix and B, like the * operator, written into out if it is given (see add).
+
+        Raises an error if the number of columns of the first does not match the number of rows of the second."""
+        if self.format[1] != B.format[0]:
+            raise TypeError(f"Invalid matrix formats ({self.format[1]}≠{B.format[0]}).")
+        return self.__product(B, out, False, False)
+
     def __mul__(self, B: Self) -> Self:
         """Overloads the * operator to Matrix objects.
         
         If M and N are two Matrix instances, "M * N" returns a matrix instance representing their product.
         
         Raises an error if the number of columns of the first does not match the number of rows of the second."""
-        if self.format[1] != B.format[0]:
-            raise TypeError(f"Invalid matrix formats ({self.format[1]}≠{B.format[0]}).")
-        A_cpp = matrix_ops.Matrix(self.matrix)
-        B_cpp = matrix_ops.Matrix(B.matrix)
-        C_cpp = matrix_ops.Matrix.product(A_cpp, B_cpp)
-        return Matrix(C_cpp.get_matrix())
-    
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        return self.mul(B)
+
+    def T_mul(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the product "self.T() * B" without building the transposed matrix, written into out if it is given (see add).
+
+        Raises an error if the numbers of rows of both matrices do not match."""
+        if self.format[0] != B.format[0]:
+            raise TypeError(f"Invalid matrix formats ({self.format[0]}≠{B.format[0]}).")
+        return self.__product(B, out, True, False)
+
+    def mul_T(self, B: Self, out: Self|None = None) -> Self:
+        """Returns the product "self * B.T()" without building the transposed matrix, written into out if it is given (see add).
+
+        Raises an error if the numbers of columns of both matrices do not match."""
+        if self.format[1] != B.format[1]:
+            raise TypeError(f"Invalid matrix formats ({self.format[1]}≠{B.format[1]}).")
+        return self.__product(B, out, False, True)
+
+    def lazy(self) -> 'LazyMatrix':
+        """Returns the matrix as a LazyMatrix instance, from which operators build an expression evaluated on demand
+        with fused kernels instead of computing each intermediate result."""
+        from .lazy_matrix import LazyMatrix
+        return LazyMatrix(self)
+
+    @staticmethod
+    def set_num_threads(n: int) -> None:
+        """Sets the number of threads used by matrix products; 0 uses one thread per available core.
+
+        The threads are persistent workers shared by every product: products issued concurrently from several Python
+        threads split their work among the same workers rather than each starting its own threads."""
+        matrix_ops.set_num_threads(n)
+
+    @staticmethod
+    def get_num_threads() -> int:
+        """Returns the number of threads used by matrix products."""
+        return matrix_ops.get_num_threads()
+
+    def scale(self, scalar: int|float, out: Self|None = None) -> Self:
+        """Returns the matrix multiplied by a scalar, like "scalar * M", written into out if it is given (see add)."""
+        if out is not None:
+            return self.__into(out, type(self._native).scale_into, self._native, scalar)
+        return Matrix._from_native(type(self._native).scale(self._native, scalar))
+
     def __rmul__(self, scalar: int|float) -> Self:
         """Overloads the * operator to allow multiplication of a Matrix instance by a scalar on the left.
         
         If M is a Matrix instance and c is a scalar, "c * M" returns a matrix instance representing their product."""
-        A_cpp = matrix_ops.Matrix(self.matrix)
-        scaledA_cpp = matrix_ops.Matrix.scale(A_cpp, scalar)
-        return Matrix(scaledA_cpp.get_matrix())
+        return self.scale(scalar)
     
     def __truediv__(self, scalar):
         # Add element-wise division by scalar
         if not isinstance(scalar, (int, float)):
             raise TypeError("Can only divide by scalar")
-        A_cpp = matrix_ops.Matrix(self.matrix)
-        scaledA_cpp = matrix_ops.Matrix.scale(A_cpp, 1/scalar)
-        return Matrix(scaledA_cpp.get_matrix())
+        return Matrix._from_native(type(self._native).scale(self._native, 1/scalar))
     
     def __eq__(self, B: Self) -> bool:
-        """Overloads the == operator."""
-        if self.matrix == B.matrix:
-            return True
-        else:
+        """Overloads the == operator; matrices of different dtypes are never equal."""
+        if self._native.dtype != B._native.dtype:
             return False
+        return type(self._native).equals(self._native, B._native)
 
     def __str__(self) -> str:
+        rows = self.matrix
         n = self.format[0]
         s = ''
         for i in range(n-1):
-            s += f'\t{self.matrix[i]},\n'
-        s += f'\t{self.matrix[n-1]}'
+            s += f'\t{rows[i]},\n'
+        s += f'\t{rows[n-1]}'
         return f'matrix([\n{s}\n])'
     
     @classmethod
@@ -180,11 +458,14 @@ class Matrix:
                   n: int,
                   p: int,
                   min_value: int|float,
-                  max_value: int|float) -> Self:
+                  max_value: int|float,
+                  dtype: Literal['float64', 'float32'] = 'float64') -> Self:
         """Takes a format (n, p) and a range of values to create a random Matrix instance."""
-        matrix_instance = cls.zero(n, p)
-        for i in range(1, n+1):
-            for j in range(1, p+1):
+        rows = []
+        for i in range(n):
+            row = []
+            for j in range(p):
                 t = random.random()
-                matrix_instance.set_entry(min_value*(1-t) + t*max_value, i, j)
-        return matrix_instance
\ No newline at end of file
+                row.append(min_value*(1-t) + t*max_value)
+            rows.append(row)
+        return cls(rows, dtype)
@@ -1,38 +1,699 @@
 #include <vector>
 #include <ctime>
 #include <cstdlib>
+#include <stdexcept>
+#include <algorithm>
+#include <thread>
+#include <mutex>
+#include <condition_variable>
+#include <deque>
+#include <exception>
+#include <functional>
+#include <cmath>
+#include <atomic>
+#include <tuple>
+#include <cstdint>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
 namespace py = pybind11;
 
-double dot(std::vector<double> u, std::vector<double> v) {
-    double dot_product = 0;
-    size_t min_size = std::min(u.size(), v.size());
-    for (size_t i = 0; i < min_size; i++) {
-        dot_product += u[i] * v[i];
+// Number of threads used by the product kernel (0 means one per hardware thread).
+static int num_threads = 0;
+
+void set_num_threads(int n) {
+    if (n < 0) {
+        throw std::invalid_argument("The number of threads must be non-negative.");
+    }
+    num_threads = n;
+}
+
+int get_num_threads() {
+    if (num_threads > 0) return num_threads;
+    int hw = (int)std::thread::hardware_concurrency();
+    return hw > 0 ? hw : 1;
+}
+
+// Worker threads shared by the parallel kernels, started as the calls need them and kept for the life of the process.
+// A call of count tasks queues them, runs them alongside count - 1 workers, and returns once they are all done.
+// Concurrent calls (the kernels release the GIL) share the same workers, so the threads running kernels never outnumber
+// the configured number of threads plus the callers, whatever the number of Python threads issuing products.
+// The pool is never destroyed: joining its threads at exit could deadlock, e.g. in a forked child, where they do not
+// exist. A call never waits for a task that no worker has claimed, so it still completes there, on the calling thread.
+class WorkerPool {
+public:
+    static WorkerPool& instance() {
+        static WorkerPool* pool = new WorkerPool();
+        return *pool;
+    }
+
+    // Runs task(0), ..., task(count - 1), on the calling thread and the workers, and rethrows the first exception thrown.
+    void run(int count, const std::function<void(int)>& task) {
+        Call call{task, count};
+        std::unique_lock<std::mutex> lock(mutex);
+        if (count > 1) {
+            while ((int)threads.size() < count - 1) threads.emplace_back(&WorkerPool::work, this);
+            calls.push_back(&call);
+            work_available.notify_all();
+        }
+        while (call.claimed < count) {
+            int index = claim(call);
+            lock.unlock();
+            execute(call, index);
+            lock.lock();
+            finish(call);
+        }
+        call.done.wait(lock, [&] { return call.finished == count; });
+        if (call.error) std::rethrow_exception(call.error);
+    }
+
+private:
+    struct Call {
+        const std::function<void(int)>& task;
+        int count;
+        int claimed = 0;  // Guarded by the mutex of the pool, as are finished and error.
+        int finished = 0;
+        std::exception_ptr error;
+        std::condition_variable done;
+    };
+
+    std::mutex mutex;
+    std::condition_variable work_available;
+    std::deque<Call*> calls;  // The calls that still have unclaimed tasks.
+    std::vector<std::thread> threads;  // Never joined.
+
+    void work() {
+        std::unique_lock<std::mutex> lock(mutex);
+        while (true) {
+            work_available.wait(lock, [&] { return !calls.empty(); });
+            Call& call = *calls.front();
+            int index = claim(call);
+            lock.unlock();
+            execute(call, index);
+            lock.lock();
+            finish(call);
+        }
+    }
+
+    // Takes the next task of a call, with the mutex held; the call leaves the queue with its last task.
+    int claim(Call& call) {
+        int index = call.claimed++;
+        if (call.claimed == call.count) {
+            auto position = std::find(calls.begin(), calls.end(), &call);
+            if (position != calls.end()) calls.erase(position);
+        }
+        return index;
+    }
+
+    void execute(Call& call, int index) {
+        try {
+            call.task(index);
+        } catch (...) {
+            std::lock_guard<std::mutex> guard(mutex);
+            if (!call.error) call.error = std::current_exception();
+        }
+    }
+
+    // Counts a finished task, with the mutex held. The call lives on the stack of its caller, which returns as soon as
+    // the last task is counted: the call must not be touched afterwards.
+    void finish(Call& call) {
+        if (++call.finished == call.count) call.done.notify_one();
+    }
+};
+
+// Splits [0, extent) into chunks of at least grain entries (and a multiple of grain), one per thread of the product
+// kernel at most, and runs body(start, stop) on each of them through the worker pool.
+static void parallel_for(int extent, int threads, int grain, const std::function<void(int, int)>& body) {
+    int chunk = (extent + threads - 1) / threads;
+    chunk = ((chunk + grain - 1) / grain) * grain;
+    int count = (extent + chunk - 1) / chunk;
+    WorkerPool::instance().run(count, [&](int t) { body(t * chunk, std::min(extent, (t + 1) * chunk)); });
+}
+
+// Number of heap allocations of matrix buffers since the module was loaded, for the telemetry of training.
+static std::atomic<unsigned long long> allocations(0);
+
+unsigned long long allocation_count() {
+    return allocations.load(std::memory_order_relaxed);
+}
+
+static inline void count_allocation(size_t capacity_before, size_t capacity_after) {
+    if (capacity_after > capacity_before) allocations.fetch_add(1, std::memory_order_relaxed);
+}
+
+// Element-wise activation functions and their derivatives, over contiguous spans of entries.
+// The "_table" and "_rational" kinds are approximations of sigmoid and tanh (see TanhTable and rational_tanh), whose
+// derivatives are those of the exact functions evaluated at the approximate outputs.
+enum class Activation { sigmoid, ReLU, linear, tanh, sigmoid_table, tanh_table, sigmoid_rational, tanh_rational };
+
+// Samples of tanh on [0, RANGE], linearly interpolated: the interpolation error is at most h^2 / 8 * max|tanh''|, about
+// 1.5e-6 for h = RANGE / SIZE, and tanh is rounded to +-1 beyond RANGE (an error of 2.3e-7). The table takes 16 KB in
+// double precision, so that it stays in the L1 cache, and is stored in the precision of the spans it is applied to.
+template <typename T>
+struct TanhTable {
+    static const int SIZE = 2048;
+    static constexpr T RANGE = T(8);
+    T values[SIZE + 1];
+    T slopes[SIZE]; // values[i + 1] - values[i]
+
+    TanhTable() {
+        for (int i = 0; i <= SIZE; i++) values[i] = T(std::tanh((double)i * RANGE / SIZE));
+        for (int i = 0; i < SIZE; i++) slopes[i] = values[i + 1] - values[i];
+    }
+    static const TanhTable& instance() {
+        static const TanhTable table; // Built on first use; thread-safe since C++11.
+        return table;
+    }
+    T operator()(T x) const {
+        T t = std::fabs(x) * (SIZE / RANGE);
+        if (!(t < T(SIZE))) return t >= T(SIZE) ? std::copysign(T(1), x) : x; // Saturated, or NaN.
+        int i = (int)t;
+        return std::copysign(values[i] + slopes[i] * (t - T(i)), x);
+    }
+};
+
+// tanh(x) ~ x * p(x^2) / q(x^2) on [-CLAMP, CLAMP] (saturated beyond it), a minimax rational approximation of degrees
+// 13/6 with an absolute error below 4e-7: branch-free, so the loops over spans are vectorized, and without any call
+// to exp.
+template <typename T>
+static inline T rational_tanh(T x) {
+    const T CLAMP = T(7.90531110763549805);
+    x = std::min(std::max(x, -CLAMP), CLAMP);
+    T x2 = x * x;
+    T p = T(-2.76076847742355e-16);
+    p = p * x2 + T(2.00018790482477e-13);
+    p = p * x2 + T(-8.60467152213735e-11);
+    p = p * x2 + T(5.12229709037114e-08);
+    p = p * x2 + T(1.48572235717979e-05);
+    p = p * x2 + T(6.37261928875436e-04);
+    p = p * x2 + T(4.89352455891786e-03);
+    T q = T(1.19825839466702e-06);
+    q = q * x2 + T(1.18534705686654e-04);
+    q = q * x2 + T(2.26843463243900e-03);
+    q = q * x2 + T(4.89352518554385e-03);
+    return x * p / q;
+}
+
+// Writes f(x) for every entry x of the span into y (which may be x itself).
+template <typename T, typename F>
+static inline void map_span(const T* x, T* y, size_t count, F f) {
+    for (size_t l = 0; l < count; l++) {
+        y[l] = f(x[l]);
+    }
+}
+
+// The spans are evaluated in the precision of their entries (float32 spans never round-trip through double).
+template <typename T>
+static void activation_span(const T* z, T* a, size_t count, Activation kind) {
+    switch (kind) {
+        case Activation::sigmoid:
+            map_span(z, a, count, [](T x) { return T(1) / (T(1) + std::exp(-x)); });
+            break;
+        case Activation::ReLU:
+            map_span(z, a, count, [](T x) { return x > T(0) ? x : T(0); });
+            break;
+        case Activation::linear:
+            if (z != a) std::copy(z, z + count, a);
+            break;
+        case Activation::tanh:
+            map_span(z, a, count, [](T x) { return std::tanh(x); });
+            break;
+        case Activation::sigmoid_table: {
+            const TanhTable<T>& table = TanhTable<T>::instance();
+            map_span(z, a, count, [&table](T x) { return T(0.5) + T(0.5) * table(T(0.5) * x); });
+            break;
+        }
+        case Activation::tanh_table: {
+            const TanhTable<T>& table = TanhTable<T>::instance();
+            map_span(z, a, count, [&table](T x) { return table(x); });
+            break;
+        }
+        case Activation::sigmoid_rational:
+            map_span(z, a, count, [](T x) { return T(0.5) + T(0.5) * rational_tanh(T(0.5) * x); });
+            break;
+        case Activation::tanh_rational:
+            map_span(z, a, count, [](T x) { return rational_tanh(x); });
+            break;
+    }
+}
+
+template <typename T>
+static void activation_prime_from_output_span(const T* a, T* d, size_t count, Activation kind);
+
+// Derivative evaluated at the pre-activation z (for the approximations, through their outputs).
+template <typename T>
+static void activation_prime_span(const T* z, T* d, size_t count, Activation kind) {
+    switch (kind) {
+        case Activation::sigmoid:
+            map_span(z, d, count, [](T x) { T s = T(1) / (T(1) + std::exp(-x)); return s * (T(1) - s); });
+            break;
+        case Activation::ReLU:
+            map_span(z, d, count, [](T x) { return x > T(0) ? T(1) : T(0); });
+            break;
+        case Activation::linear:
+            map_span(z, d, count, [](T) { return T(1); });
+            break;
+        case Activation::tanh:
+            map_span(z, d, count, [](T x) { T t = std::tanh(x); return T(1) - t * t; });
+            break;
+        case Activation::sigmoid_table:
+        case Activation::tanh_table:
+        case Activation::sigmoid_rational:
+        case Activation::tanh_rational:
+            activation_span(z, d, count, kind);
+            activation_prime_from_output_span(d, d, count, kind);
+            break;
+    }
+}
+
+// Derivative expressed through the activation output a = f(z), so that f is never evaluated again.
+template <typename T>
+static void activation_prime_from_output_span(const T* a, T* d, size_t count, Activation kind) {
+    switch (kind) {
+        case Activation::sigmoid:
+        case Activation::sigmoid_table:
+        case Activation::sigmoid_rational:
+            map_span(a, d, count, [](T x) { return x * (T(1) - x); });
+            break;
+        case Activation::ReLU:
+            map_span(a, d, count, [](T x) { return x > T(0) ? T(1) : T(0); });
+            break;
+        case Activation::linear:
+            map_span(a, d, count, [](T) { return T(1); });
+            break;
+        case Activation::tanh:
+        case Activation::tanh_table:
+        case Activation::tanh_rational:
+            map_span(a, d, count, [](T x) { return T(1) - x * x; });
+            break;
     }
-    return dot_product;
 }
 
+// Multiplies every entry y by f'(z), read from the activation output a = f(z).
+template <typename T>
+static void multiply_prime_from_output_span(const T* a, T* y, size_t count, Activation kind) {
+    switch (kind) {
+        case Activation::sigmoid:
+        case Activation::sigmoid_table:
+        case Activation::sigmoid_rational:
+            for (size_t l = 0; l < count; l++) y[l] *= a[l] * (T(1) - a[l]);
+            break;
+        case Activation::ReLU:
+            for (size_t l = 0; l < count; l++) y[l] = a[l] > T(0) ? y[l] : T(0);
+            break;
+        case Activation::linear:
+            break;
+        case Activation::tanh:
+        case Activation::tanh_table:
+        case Activation::tanh_rational:
+            for (size_t l = 0; l < count; l++) y[l] *= T(1) - a[l] * a[l];
+            break;
+    }
+}
+
+// Tile sizes of the blocked product: a KC x NC panel of B and a MC x KC block of A stay in cache
+// while the micro-kernel keeps an MR x NR block of C in registers.
+static const int GEMM_MC = 64;
+static const int GEMM_KC = 256;
+static const int GEMM_NC = 512;
+// The register block holds the same number of entries whatever the precision: a float32 block fills half the vector
+// registers of a float64 one, so each multiply-add instruction of the micro-kernel processes twice as many entries.
+static const int GEMM_MR = 4;
+static const int GEMM_NR = 8;
+// Below this many multiply-adds the product stays on the calling thread.
+static const double GEMM_PARALLEL_THRESHOLD = 64.0 * 64.0 * 64.0;
+// Below this many multiply-adds packing does not pay off and plain loops are used instead.
+static const double GEMM_SMALL_THRESHOLD = 96.0 * 96.0 * 96.0;
+
+// Work applied to each finished tile of C while it is still in cache.
+enum class Epilogue { none, activate, multiply_prime };
+
+// C = alpha * op(A) * op(B) + beta * C, where op(A) is n x m, op(B) is m x p and every buffer is row-major.
+// When trans_a (resp. trans_b) is set, A (resp. B) is stored untransposed as m x n (resp. p x m).
+// If row_bias is set, C starts from row_bias[i] on its i-th row instead of beta * C.
+// The activate epilogue writes f(C) into activation_out (C itself if null); the multiply_prime
+// epilogue multiplies C entry-wise by f'(z), read from prime_source = f(z) laid out like C.
+// If A_int8 is set, A is int8 quantized instead: op(A)[i][k] = A_scales[i] * A_int8[i * m + k], without transposition.
+template <typename T>
+struct GemmArgs {
+    const T* A;
+    const T* B;
+    T* C;
+    int n, m, p;
+    bool trans_a, trans_b;
+    T alpha, beta;
+    const T* row_bias = nullptr;
+    Epilogue epilogue = Epilogue::none;
+    Activation kind = Activation::linear;
+    T* activation_out = nullptr;
+    const T* prime_source = nullptr;
+    const int8_t* A_int8 = nullptr;
+    const float* A_scales = nullptr;
+};
+
+// Entry (i, k) of op(A).
+template <typename T>
+static inline T gemm_a(const GemmArgs<T>& g, int i, int k) {
+    if (g.A_int8) return (T)g.A_scales[i] * (T)g.A_int8[(size_t)i * g.m + k];
+    return g.trans_a ? g.A[(size_t)k * g.n + i] : g.A[(size_t)i * g.m + k];
+}
+
+template <typename T>
+static void gemm_epilogue(const GemmArgs<T>& g, int i0, int i1, int j0, int j1) {
+    if (g.epilogue == Epilogue::none) return;
+    size_t count = (size_t)(j1 - j0);
+    for (int i = i0; i < i1; i++) {
+        size_t offset = (size_t)i * g.p + j0;
+        if (g.epilogue == Epilogue::activate) {
+            T* out = g.activation_out ? g.activation_out + offset : g.C + offset;
+            activation_span(g.C + offset, out, count, g.kind);
+        } else {
+            multiply_prime_from_output_span(g.prime_source + offset, g.C + offset, count, g.kind);
+        }
+    }
+}
+
+// Accumulates the product of a packed MR x kb sliver of A and a packed kb x NR sliver of B into C.
+template <typename T>
+static inline void gemm_micro_kernel(int kb, const T* __restrict a, const T* __restrict b,
+                                     T* C, int ldc, int rows, int cols) {
+    T acc[GEMM_MR][GEMM_NR] = {};
+    for (int k = 0; k < kb; k++) {
+        const T* a_k = a + (size_t)k * GEMM_MR;
+        const T* b_k = b + (size_t)k * GEMM_NR;
+        for (int r = 0; r < GEMM_MR; r++) {
+            T x = a_k[r];
+            for (int c = 0; c < GEMM_NR; c++) {
+                acc[r][c] += x * b_k[c];
+            }
+        }
+    }
+    for (int r = 0; r < rows; r++) {
+        T* c_row = C + (size_t)r * ldc;
+        for (int c = 0; c < cols; c++) {
+            c_row[c] += acc[r][c];
+        }
+    }
+}
+
+template <typename T>
+static void gemm_scale_output(const GemmArgs<T>& g, int i0, int i1, int j0, int j1) {
+    for (int i = i0; i < i1; i++) {
+        T* c_row = g.C + (size_t)i * g.p;
+        if (g.row_bias) {
+            std::fill(c_row + j0, c_row + j1, g.row_bias[i]);
+        } else if (g.beta == T(0)) {
+            std::fill(c_row + j0, c_row + j1, T(0));
+        } else if (g.beta != T(1)) {
+            for (int j = j0; j < j1; j++) c_row[j] *= g.beta;
+        }
+    }
+}
+
+// Unpacked loops for small products, ordered so that the innermost loop reads contiguous memory.
+template <typename T>
+static void gemm_small(const GemmArgs<T>& g) {
+    gemm_scale_output(g, 0, g.n, 0, g.p);
+    if (!g.trans_b) {
+        for (int i = 0; i < g.n; i++) {
+            T* __restrict c_row = g.C + (size_t)i * g.p;
+            for (int k = 0; k < g.m; k++) {
+                T a = g.alpha * gemm_a(g, i, k);
+                const T* __restrict b_row = g.B + (size_t)k * g.p;
+                for (int j = 0; j < g.p; j++) {
+                    c_row[j] += a * b_row[j];
+                }
+            }
+            gemm_epilogue(g, i, i + 1, 0, g.p);
+        }
+    } else {
+        for (int i = 0; i < g.n; i++) {
+            T* c_row = g.C + (size_t)i * g.p;
+            for (int j = 0; j < g.p; j++) {
+                const T* b_row = g.B + (size_t)j * g.m;
+                T dot = T(0);
+                if (g.trans_a) {
+                    for (int k = 0; k < g.m; k++) dot += g.A[(size_t)k * g.n + i] * b_row[k];
+                } else {
+                    const T* a_row = g.A + (size_t)i * g.m;
+                    for (int k = 0; k < g.m; k++) dot += a_row[k] * b_row[k];
+                }
+                c_row[j] += g.alpha * dot;
+            }
+            gemm_epilogue(g, i, i + 1, 0, g.p);
+        }
+    }
+}
+
+template <typename T>
+static void gemm_tile(const GemmArgs<T>& g, int i0, int i1, int j0, int j1) {
+    gemm_scale_output(g, i0, i1, j0, j1);
+    // Packed blocks are stored sliver by sliver (MR rows of A, NR columns of B), k-major and zero-padded. Their buffers
+    // belong to the thread, which keeps them from one product to the next.
+    thread_local std::vector<T> A_pack((size_t)(GEMM_MC + GEMM_MR) * GEMM_KC);
+    thread_local std::vector<T> B_pack((size_t)GEMM_KC * (GEMM_NC + GEMM_NR));
+    for (int jj = j0; jj < j1; jj += GEMM_NC) {
+        int nb = std::min(GEMM_NC, j1 - jj);
+        for (int kk = 0; kk < g.m; kk += GEMM_KC) {
+            int kb = std::min(GEMM_KC, g.m - kk);
+            for (int js = 0; js < nb; js += GEMM_NR) {
+                T* dst = B_pack.data() + (size_t)js * kb;
+                int cols = std::min(GEMM_NR, nb - js);
+                for (int k = 0; k < kb; k++) {
+                    for (int c = 0; c < GEMM_NR; c++) {
+                        T b = T(0);
+                        if (c < cols) {
+                            int j = jj + js + c;
+                            b = g.trans_b ? g.B[(size_t)j * g.m + kk + k] : g.B[(size_t)(kk + k) * g.p + j];
+                        }
+                        dst[(size_t)k * GEMM_NR + c] = b;
+                    }
+                }
+            }
+            for (int ii = i0; ii < i1; ii += GEMM_MC) {
+                int ib = std::min(GEMM_MC, i1 - ii);
+                for (int is = 0; is < ib; is += GEMM_MR) {
+                    T* dst = A_pack.data() + (size_t)is * kb;
+                    int rows = std::min(GEMM_MR, ib - is);
+                    for (int k = 0; k < kb; k++) {
+                        for (int r = 0; r < GEMM_MR; r++) {
+                            T a = T(0);
+                            if (r < rows) {
+                                int i = ii + is + r;
+                                a = gemm_a(g, i, kk + k);
+                            }
+                            dst[(size_t)k * GEMM_MR + r] = g.alpha * a;
+                        }
+                    }
+                }
+                for (int is = 0; is < ib; is += GEMM_MR) {
+                    int rows = std::min(GEMM_MR, ib - is);
+                    for (int js = 0; js < nb; js += GEMM_NR) {
+                        int cols = std::min(GEMM_NR, nb - js);
+                        gemm_micro_kernel(kb, A_pack.data() + (size_t)is * kb, B_pack.data() + (size_t)js * kb,
+                                          g.C + (size_t)(ii + is) * g.p + jj + js, g.p, rows, cols);
+                    }
+                }
+                if (kk + kb == g.m) {
+                    gemm_epilogue(g, ii, ii + ib, jj, jj + nb);
+                }
+            }
+        }
+    }
+}
+
+// Splits C along its larger dimension across the configured number of threads, run by the worker pool.
+template <typename T>
+void gemm(const GemmArgs<T>& g) {
+    if (g.n == 0 || g.p == 0) return;
+    double work = (double)g.n * g.m * g.p;
+    if (work <= GEMM_SMALL_THRESHOLD) {
+        gemm_small(g);
+        return;
+    }
+    int threads = get_num_threads();
+    int max_useful = (int)(work / GEMM_PARALLEL_THRESHOLD);
+    threads = std::max(1, std::min(threads, max_useful));
+    bool split_rows = g.n >= g.p;
+    int extent = split_rows ? g.n : g.p;
+    threads = std::min(threads, std::max(1, extent / GEMM_MR));
+    if (threads == 1) {
+        gemm_tile(g, 0, g.n, 0, g.p);
+        return;
+    }
+    parallel_for(extent, threads, GEMM_MR, [&](int start, int stop) {
+        if (split_rows) {
+            gemm_tile(g, start, stop, 0, g.p);
+        } else {
+            gemm_tile(g, 0, g.n, start, stop);
+        }
+    });
+}
+
+// Storage of a Matrix: either an owned vector, or a view over memory owned by a Python object (e.g. a memory-mapped file).
+// A view is never freed nor resized in place: growing it detaches it into an owned copy, and copying it always yields owned storage.
+// The owner is only released when the Matrix is destroyed, so that detaching never touches Python objects without the GIL.
+// The Python buffers exported over the storage (memoryviews, NumPy arrays, ...) are counted: while one is alive, any
+// operation that would move the storage raises BufferError instead, as for a bytearray, so that no export is left
+// pointing to freed memory. Changes that fit in the allocated storage are still allowed.
+template <typename T>
+class Buffer {
+    std::vector<T> owned;
+    T* external = nullptr;
+    size_t external_size = 0;
+    py::object owner;
+    size_t exports = 0; // Counted under the GIL by the buffer slots of the Python class (see count_buffer_exports).
+
+    void ensure_not_exported() const {
+        if (exports > 0) {
+            throw py::buffer_error("Cannot reallocate the entries of a matrix while they are exported (memoryview, NumPy array, ...).");
+        }
+    }
+
+    void detach(size_t n) {
+        if (!external) return;
+        ensure_not_exported();
+        size_t before = owned.capacity();
+        owned.assign(external, external + std::min(n, external_size));
+        count_allocation(before, owned.capacity());
+        external = nullptr;
+        external_size = 0;
+    }
+
+public:
+    Buffer() = default;
+    Buffer(const Buffer& other) : owned(other.begin(), other.end()) { count_allocation(0, owned.capacity()); }
+    Buffer(Buffer&& other)
+        : owned(std::move(other.owned)), external(other.external), external_size(other.external_size), owner(std::move(other.owner)) {
+        other.external = nullptr;
+        other.external_size = 0;
+    }
+    Buffer& operator=(const Buffer& other) {
+        if (this != &other) {
+            ensure_not_exported();
+            std::vector<T> copy(other.begin(), other.end());
+            count_allocation(0, copy.capacity());
+            external = nullptr;
+            external_size = 0;
+            owned.swap(copy);
+        }
+        return *this;
+    }
+    Buffer& operator=(Buffer&& other) {
+        if (this != &other) {
+            ensure_not_exported();
+            owned = std::move(other.owned);
+            external = other.external;
+            external_size = other.external_size;
+            owner = std::move(other.owner);
+            other.external = nullptr;
+            other.external_size = 0;
+        }
+        return *this;
+    }
+
+    static Buffer view(T* ptr, size_t n, py::object owner) {
+        Buffer buffer;
+        buffer.external = ptr;
+        buffer.external_size = n;
+        buffer.owner = std::move(owner);
+        return buffer;
+    }
+
+    bool is_view() const { return external != nullptr; }
+    T* data() { return external ? external : owned.data(); }
+    const T* data() const { return external ? external : owned.data(); }
+    size_t size() const { return external ? external_size : owned.size(); }
+    size_t capacity() const { return external ? external_size : owned.capacity(); }
+    bool empty() const { return size() == 0; }
+    T* begin() { return data(); }
+    T* end() { return data() + size(); }
+    const T* begin() const { return data(); }
+    const T* end() const { return data() + size(); }
+    T& operator[](size_t k) { return data()[k]; }
+    const T& operator[](size_t k) const { return data()[k]; }
+
+    void add_export() { exports++; }
+    void release_export() { exports--; }
+
+    void assign(size_t n, T value) {
+        if (external || n > owned.capacity()) ensure_not_exported();
+        external = nullptr;
+        external_size = 0;
+        size_t before = owned.capacity();
+        owned.assign(n, value);
+        count_allocation(before, owned.capacity());
+    }
+    void resize(size_t n) {
+        if (external && n == external_size) return;
+        detach(n);
+        size_t before = owned.capacity();
+        if (n > before) {
+            ensure_not_exported();
+            owned.reserve(n); // Exactly n: a growing std::vector may double, and workspaces are sized to a memory budget.
+        }
+        owned.resize(n);
+        count_allocation(before, owned.capacity());
+    }
+    // Adopts a vector allocated by the caller, which counts as one allocation.
+    void swap(std::vector<T>& other) {
+        ensure_not_exported();
+        external = nullptr;
+        external_size = 0;
+        count_allocation(0, other.capacity());
+        owned.swap(other);
+    }
+    bool operator==(const Buffer& other) const {
+        return size() == other.size() && std::equal(begin(), end(), other.begin());
+    }
+};
+
+template <typename T>
 class Matrix {
 public:
     std::vector<int> format;
-    std::vector<std::vector<double>> matrix;
-    
-    double get_entry(int i, int j) const;
-    void set_entry(double val, int i, int j);
-    std::vector<double> get_row(int i) const;
-    std::vector<double> get_column(int j) const;
+    Buffer<T> data; // Row-major contiguous buffer of format[0] * format[1] entries.
+
+    T get_entry(int i, int j) const;
+    void set_entry(T val, int i, int j);
+    std::vector<T> get_row(int i) const;
+    std::vector<T> get_column(int j) const;
     static Matrix zero(int n, int p);
     static Matrix sum(const Matrix& A, const Matrix& B);
-    static Matrix scale(const Matrix& A, double k);
-    static Matrix product(const Matrix& A, const Matrix& B);
+    static Matrix difference(const Matrix& A, const Matrix& B);
+    static Matrix scale(const Matrix& A, T k);
+    static Matrix product(const Matrix& A, const Matrix& B, bool transpose_a, bool transpose_b, T alpha);
+    static Matrix reference_product(const Matrix& A, const Matrix& B);
     static Matrix cwise_product(const Matrix& A, const Matrix& B);
-    static Matrix randomize(int n, int p, double min_value, double max_value);
-    Matrix(std::vector<std::vector<double>> inpt_matrix);
-    
-    
+    static Matrix transpose(const Matrix& A);
+    static Matrix add_to_columns(const Matrix& A, const Matrix& B);
+    static void product_into(Matrix& C, const Matrix& A, const Matrix& B, bool transpose_a, bool transpose_b);
+    static void add_to_columns_inplace(Matrix& A, const Matrix& B);
+    static void add_inplace(Matrix& A, const Matrix& B);
+    static Matrix sum_columns(const Matrix& A);
+    static Matrix hstack(const std::vector<const Matrix*>& blocks);
+    static Matrix columns(const Matrix& A, int start, int count);
+    static void sum_into(Matrix& C, const Matrix& A, const Matrix& B);
+    static void difference_into(Matrix& C, const Matrix& A, const Matrix& B);
+    static void cwise_product_into(Matrix& C, const Matrix& A, const Matrix& B);
+    static void scale_into(Matrix& C, const Matrix& A, T k);
+    static void transpose_into(Matrix& C, const Matrix& A);
+    static void add_to_columns_into(Matrix& C, const Matrix& A, const Matrix& B);
+    static void sum_columns_into(Matrix& C, const Matrix& A);
+    static void columns_into(Matrix& C, const Matrix& A, int start, int count);
+    static bool equals(const Matrix& A, const Matrix& B);
+    static Matrix randomize(int n, int p, T min_value, T max_value);
+    Matrix(std::vector<std::vector<T>> inpt_matrix);
+    Matrix(int n, int p);
+    template <typename U> explicit Matrix(const Matrix<U>& other); // Converts the entries to T.
+
+    void resize(int n, int p);
+    int capacity() const { return (int)data.capacity(); }
+    int rows() const { return format[0]; }
+    int cols() const { return format[1]; }
+    T* ptr() { return data.data(); }
+    const T* ptr() const { return data.data(); }
+
     //Python-friendly methods
     py::list get_row_py(int i) const;
     py::list get_column_py(int j) const;
@@ -40,156 +701,1157 @@ public:
     py::list get_matrix() const;
 };
 
-Matrix::Matrix(std::vector<std::vector<double>> inpt_matrix) {
+template <typename T>
+Matrix<T>::Matrix(std::vector<std::vector<T>> inpt_matrix) {
     int n = inpt_matrix.size();
     if (n == 0) {
         format = {0, 0};
         return;
     }
-    
+
     int p = 0;
     for (const auto& row : inpt_matrix) {
-        if (row.size() > p) p = row.size();
+        if ((int)row.size() > p) p = row.size();
     }
-    
-    for (auto& row : inpt_matrix) {
-        row.resize(p, 0.0);
+
+    format = {n, p};
+    data.assign((size_t)n * p, T(0));
+    for (int i = 0; i < n; i++) {
+        std::copy(inpt_matrix[i].begin(), inpt_matrix[i].end(), data.begin() + (size_t)i * p);
+    }
+}
+
+template <typename T>
+Matrix<T>::Matrix(int n, int p) {
+    if (n < 0 || p < 0) {
+        throw std::invalid_argument("Matrix dimensions must be non-negative.");
     }
-    matrix = inpt_matrix;
     format = {n, p};
+    data.assign((size_t)n * p, T(0));
+}
+
+template <typename T>
+template <typename U>
+Matrix<T>::Matrix(const Matrix<U>& other) {
+    format = other.format;
+    data.resize(other.data.size());
+    std::copy(other.ptr(), other.ptr() + other.data.size(), data.begin());
 }
 
-double Matrix::get_entry(int i, int j) const {
+// Changes the format while keeping the allocated buffer whenever it is large enough; the entries are left unspecified.
+template <typename T>
+void Matrix<T>::resize(int n, int p) {
+    if (n < 0 || p < 0) {
+        throw std::invalid_argument("Matrix dimensions must be non-negative.");
+    }
+    data.resize((size_t)n * p);
+    format = {n, p};
+}
+
+template <typename T>
+T Matrix<T>::get_entry(int i, int j) const {
     if (i < 1 || i > format[0] || j < 1 || j > format[1]) {
-        return 0.0;
+        return T(0);
     }
-    return matrix[i-1][j-1];
+    return data[(size_t)(i-1) * format[1] + (j-1)];
 }
 
-void Matrix::set_entry(double val, int i, int j) {
+template <typename T>
+void Matrix<T>::set_entry(T val, int i, int j) {
     if (i < 1 || j < 1) return;
-    
-    if (i > format[0]) {
-        matrix.resize(i, std::vector<double>(format[1], 0.0));
-        format[0] = i;
-    }
-    if (j > format[1]) {
-        for (auto& row : matrix) {
-            row.resize(j, 0.0);
+
+    if (i > format[0] || j > format[1]) {
+        int n = std::max(i, format[0]);
+        int p = std::max(j, format[1]);
+        std::vector<T> grown((size_t)n * p, T(0));
+        for (int r = 0; r < format[0]; r++) {
+            std::copy(data.begin() + (size_t)r * format[1], data.begin() + (size_t)(r+1) * format[1], grown.begin() + (size_t)r * p);
         }
-        format[1] = j;
+        data.swap(grown);
+        format = {n, p};
     }
-    
-    matrix[i-1][j-1] = val;
+
+    data[(size_t)(i-1) * format[1] + (j-1)] = val;
 }
 
-std::vector<double> Matrix::get_row(int i) const {
+template <typename T>
+std::vector<T> Matrix<T>::get_row(int i) const {
     if (i < 1 || i > format[0]) {
-        return std::vector<double>();
+        return std::vector<T>();
     }
-    return matrix[i-1];
+    auto start = data.begin() + (size_t)(i-1) * format[1];
+    return std::vector<T>(start, start + format[1]);
 }
 
-std::vector<double> Matrix::get_column(int j) const {
-    std::vector<double> column;
+template <typename T>
+std::vector<T> Matrix<T>::get_column(int j) const {
+    std::vector<T> column;
     if (j < 1 || j > format[1]) {
         return column;
     }
-    
-    for (const auto& row : matrix) {
-        column.push_back(row[j-1]);
+
+    column.reserve(format[0]);
+    for (int i = 0; i < format[0]; i++) {
+        column.push_back(data[(size_t)i * format[1] + (j-1)]);
     }
     return column;
 }
 
-Matrix Matrix::zero(int n, int p) {
-    std::vector<std::vector<double>> M;
-    for (int i = 0; i < n; i++) {
-        std::vector<double> row(p, 0.0);
-        M.push_back(row);
-    }
-    return Matrix(M);
+template <typename T>
+Matrix<T> Matrix<T>::zero(int n, int p) {
+    return Matrix(n, p);
 }
 
-Matrix Matrix::randomize(int n, int p, double min_value, double max_value) {
+template <typename T>
+Matrix<T> Matrix<T>::randomize(int n, int p, T min_value, T max_value) {
     Matrix random_matrix = Matrix::zero(n, p);
     std::srand(std::time(0));
-    
-    for (int i = 1; i <= n; i++) {
-        for (int j = 1; j <= p; j++) {
-            double t = static_cast<double>(std::rand()) / RAND_MAX;
-            random_matrix.set_entry(min_value + t * (max_value - min_value), i, j);
-        }
+
+    for (T& x : random_matrix.data) {
+        double t = static_cast<double>(std::rand()) / RAND_MAX;
+        x = (T)(min_value + t * (max_value - min_value));
     }
     return random_matrix;
 }
 
-Matrix Matrix::product(const Matrix& A, const Matrix& B) {
-    Matrix result = zero(A.format[0], B.format[1]);
-    for (int i = 1; i <= A.format[0]; i++) {
-        for (int j = 1; j <= B.format[1]; j++) {
-            double value = dot(A.get_row(i), B.get_column(j));
-            result.set_entry(value, i, j);
+template <typename T>
+Matrix<T> Matrix<T>::product(const Matrix& A, const Matrix& B, bool transpose_a, bool transpose_b, T alpha) {
+    int n = transpose_a ? A.format[1] : A.format[0];
+    int m = transpose_a ? A.format[0] : A.format[1];
+    int m_b = transpose_b ? B.format[1] : B.format[0];
+    int p = transpose_b ? B.format[0] : B.format[1];
+    if (m != m_b) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    Matrix result = zero(n, p);
+    gemm(GemmArgs<T>{A.ptr(), B.ptr(), result.ptr(), n, m, p, transpose_a, transpose_b, alpha, T(0)});
+    return result;
+}
+
+// Writes the product into C, reusing its buffer, instead of allocating a new matrix.
+template <typename T>
+void Matrix<T>::product_into(Matrix& C, const Matrix& A, const Matrix& B, bool transpose_a, bool transpose_b) {
+    if (&C == &A || &C == &B) {
+        throw std::invalid_argument("The output of a product cannot be one of its operands.");
+    }
+    int n = transpose_a ? A.format[1] : A.format[0];
+    int m = transpose_a ? A.format[0] : A.format[1];
+    int m_b = transpose_b ? B.format[1] : B.format[0];
+    int p = transpose_b ? B.format[0] : B.format[1];
+    if (m != m_b) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    C.resize(n, p);
+    gemm(GemmArgs<T>{A.ptr(), B.ptr(), C.ptr(), n, m, p, transpose_a, transpose_b, T(1), T(0)});
+}
+
+// Straightforward triple loop, kept as a baseline for the benchmarks of the blocked kernel.
+template <typename T>
+Matrix<T> Matrix<T>::reference_product(const Matrix& A, const Matrix& B) {
+    if (A.format[1] != B.format[0]) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    int n = A.format[0], m = A.format[1], p = B.format[1];
+    Matrix result = zero(n, p);
+    const T* a = A.ptr();
+    const T* b = B.ptr();
+    T* c = result.ptr();
+    for (int i = 0; i < n; i++) {
+        T* c_row = c + (size_t)i * p;
+        for (int k = 0; k < m; k++) {
+            T a_ik = a[(size_t)i * m + k];
+            const T* b_row = b + (size_t)k * p;
+            for (int j = 0; j < p; j++) {
+                c_row[j] += a_ik * b_row[j];
+            }
         }
     }
     return result;
 }
 
-Matrix Matrix::sum(const Matrix& A, const Matrix& B){
-    Matrix result = zero(A.format[0], A.format[1]);
-    for(int i = 1; i <= A.format[0]; i++){
-        for(int j = 1; j <= A.format[1]; j++){
-            double a = A.get_entry(i, j);
-            double b = B.get_entry(i, j);
-            double c = a + b;
-            result.set_entry(c, i, j);
+// The element-wise kernels write into C, which may be one of their operands, and reuse its buffer when it is large enough.
+template <typename T>
+void Matrix<T>::sum_into(Matrix& C, const Matrix& A, const Matrix& B){
+    if (A.format != B.format) {
+        throw std::invalid_argument("Cannot add two matrices of different formats.");
+    }
+    C.resize(A.format[0], A.format[1]);
+    for (size_t k = 0; k < A.data.size(); k++) {
+        C.data[k] = A.data[k] + B.data[k];
+    }
+}
+
+template <typename T>
+void Matrix<T>::difference_into(Matrix& C, const Matrix& A, const Matrix& B){
+    if (A.format != B.format) {
+        throw std::invalid_argument("Cannot subtract two matrices of different formats.");
+    }
+    C.resize(A.format[0], A.format[1]);
+    for (size_t k = 0; k < A.data.size(); k++) {
+        C.data[k] = A.data[k] - B.data[k];
+    }
+}
+
+template <typename T>
+void Matrix<T>::cwise_product_into(Matrix& C, const Matrix& A, const Matrix& B){
+    if (A.format != B.format) {
+        throw std::invalid_argument("Cannot multiply component-wise two matrices of different formats.");
+    }
+    C.resize(A.format[0], A.format[1]);
+    for (size_t k = 0; k < A.data.size(); k++) {
+        C.data[k] = A.data[k] * B.data[k];
+    }
+}
+
+template <typename T>
+void Matrix<T>::scale_into(Matrix& C, const Matrix& A, T k){
+    C.resize(A.format[0], A.format[1]);
+    for (size_t l = 0; l < A.data.size(); l++) {
+        C.data[l] = A.data[l] * k;
+    }
+}
+
+template <typename T>
+void Matrix<T>::transpose_into(Matrix& C, const Matrix& A){
+    if (&C == &A) {
+        throw std::invalid_argument("The output of a transposition cannot be its operand.");
+    }
+    int n = A.format[0], p = A.format[1];
+    C.resize(p, n);
+    for (int i = 0; i < n; i++) {
+        for (int j = 0; j < p; j++) {
+            C.data[(size_t)j * n + i] = A.data[(size_t)i * p + j];
         }
     }
+}
+
+template <typename T>
+void Matrix<T>::add_to_columns_into(Matrix& C, const Matrix& A, const Matrix& B){
+    if (B.format[1] != 1 || B.format[0] != A.format[0]) {
+        throw std::invalid_argument("Must add a column vector with as many rows as the matrix.");
+    }
+    if (&C == &B) {
+        throw std::invalid_argument("The output cannot be the added column vector.");
+    }
+    int n = A.format[0], p = A.format[1];
+    C.resize(n, p);
+    for (int i = 0; i < n; i++) {
+        T b = B.data[i];
+        const T* a_row = A.ptr() + (size_t)i * p;
+        T* c_row = C.ptr() + (size_t)i * p;
+        for (int j = 0; j < p; j++) {
+            c_row[j] = a_row[j] + b;
+        }
+    }
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::sum(const Matrix& A, const Matrix& B){
+    Matrix result(0, 0);
+    sum_into(result, A, B);
     return result;
 }
 
-Matrix Matrix::cwise_product(const Matrix& A, const Matrix& B){
-    Matrix result = zero(A.format[0], A.format[1]);
-    for(int i = 1; i <= A.format[0]; i++){
-        for(int j = 1; j <= A.format[1]; j++){
-            double a = A.get_entry(i, j);
-            double b = B.get_entry(i, j);
-            result.set_entry(a * b, i, j);
+template <typename T>
+Matrix<T> Matrix<T>::difference(const Matrix& A, const Matrix& B){
+    Matrix result(0, 0);
+    difference_into(result, A, B);
+    return result;
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::cwise_product(const Matrix& A, const Matrix& B){
+    Matrix result(0, 0);
+    cwise_product_into(result, A, B);
+    return result;
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::scale(const Matrix& A, T k){
+    Matrix result(0, 0);
+    scale_into(result, A, k);
+    return result;
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::transpose(const Matrix& A){
+    Matrix result(0, 0);
+    transpose_into(result, A);
+    return result;
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::add_to_columns(const Matrix& A, const Matrix& B){
+    Matrix result(0, 0);
+    add_to_columns_into(result, A, B);
+    return result;
+}
+
+template <typename T>
+void Matrix<T>::add_inplace(Matrix& A, const Matrix& B){
+    if (A.format != B.format) {
+        throw std::invalid_argument("Cannot add two matrices of different formats.");
+    }
+    T* a = A.ptr();
+    const T* b = B.ptr();
+    size_t size = A.data.size();
+    for (size_t k = 0; k < size; k++) {
+        a[k] += b[k];
+    }
+}
+
+template <typename T>
+void Matrix<T>::add_to_columns_inplace(Matrix& A, const Matrix& B){
+    if (B.format[1] != 1 || B.format[0] != A.format[0]) {
+        throw std::invalid_argument("Must add a column vector with as many rows as the matrix.");
+    }
+    int n = A.format[0], p = A.format[1];
+    for (int i = 0; i < n; i++) {
+        T b = B.data[i];
+        T* a_row = A.ptr() + (size_t)i * p;
+        for (int j = 0; j < p; j++) {
+            a_row[j] += b;
         }
     }
+}
+
+template <typename T>
+void Matrix<T>::sum_columns_into(Matrix& C, const Matrix& A){
+    if (&C == &A) {
+        throw std::invalid_argument("The output of a sum of columns cannot be its operand.");
+    }
+    int n = A.format[0], p = A.format[1];
+    C.resize(n, 1);
+    for (int i = 0; i < n; i++) {
+        const T* a_row = A.ptr() + (size_t)i * p;
+        double s = 0.0; // Accumulated in double whatever the precision of the entries.
+        for (int j = 0; j < p; j++) {
+            s += a_row[j];
+        }
+        C.data[i] = (T)s;
+    }
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::sum_columns(const Matrix& A){
+    Matrix result(0, 0);
+    sum_columns_into(result, A);
     return result;
 }
 
-Matrix Matrix::scale(const Matrix& A, double k){
-    Matrix result = Matrix(A.matrix);
-    for(int i = 1; i <= A.format[0]; i++){
-        for(int j = 1; j <= A.format[1]; j++){
-            result.set_entry(A.get_entry(i, j)*k, i, j);
+template <typename T>
+Matrix<T> Matrix<T>::hstack(const std::vector<const Matrix*>& blocks){
+    if (blocks.empty()) {
+        throw std::invalid_argument("Cannot stack an empty list of matrices.");
+    }
+    int n = blocks[0]->format[0];
+    int p = 0;
+    for (const Matrix* block : blocks) {
+        if (block->format[0] != n) {
+            throw std::invalid_argument("Cannot stack matrices with different numbers of rows.");
         }
+        p += block->format[1];
+    }
+    Matrix result = zero(n, p);
+    int offset = 0;
+    for (const Matrix* block : blocks) {
+        int q = block->format[1];
+        for (int i = 0; i < n; i++) {
+            std::copy(block->ptr() + (size_t)i * q, block->ptr() + (size_t)(i+1) * q, result.ptr() + (size_t)i * p + offset);
+        }
+        offset += q;
     }
     return result;
 }
 
+// Writes the count columns of A starting at the (0-based) column start into C.
+template <typename T>
+void Matrix<T>::columns_into(Matrix& C, const Matrix& A, int start, int count){
+    int n = A.format[0], p = A.format[1];
+    if (start < 0 || count < 0 || start + count > p) {
+        throw std::invalid_argument("The range of columns is out of the matrix.");
+    }
+    if (&C == &A) {
+        throw std::invalid_argument("The output cannot be the matrix whose columns are copied.");
+    }
+    C.resize(n, count);
+    for (int i = 0; i < n; i++) {
+        std::copy(A.ptr() + (size_t)i * p + start, A.ptr() + (size_t)i * p + start + count, C.ptr() + (size_t)i * count);
+    }
+}
+
+template <typename T>
+Matrix<T> Matrix<T>::columns(const Matrix& A, int start, int count){
+    Matrix result(0, 0);
+    columns_into(result, A, start, count);
+    return result;
+}
+
+template <typename T>
+bool Matrix<T>::equals(const Matrix& A, const Matrix& B){
+    return A.format == B.format && A.data == B.data;
+}
+
+template <typename T>
+Matrix<T> activate(const Matrix<T>& Z, Activation kind) {
+    Matrix<T> A(Z.format[0], Z.format[1]);
+    activation_span(Z.ptr(), A.ptr(), Z.data.size(), kind);
+    return A;
+}
+
+template <typename T>
+void activate_inplace(Matrix<T>& M, Activation kind) {
+    activation_span(M.ptr(), M.ptr(), M.data.size(), kind);
+}
+
+template <typename T>
+Matrix<T> activation_prime(const Matrix<T>& Z, Activation kind) {
+    Matrix<T> D(Z.format[0], Z.format[1]);
+    activation_prime_span(Z.ptr(), D.ptr(), Z.data.size(), kind);
+    return D;
+}
+
+template <typename T>
+void activation_prime_inplace(Matrix<T>& M, Activation kind) {
+    activation_prime_span(M.ptr(), M.ptr(), M.data.size(), kind);
+}
+
+template <typename T>
+Matrix<T> activation_prime_from_output(const Matrix<T>& A, Activation kind) {
+    Matrix<T> D(A.format[0], A.format[1]);
+    activation_prime_from_output_span(A.ptr(), D.ptr(), A.data.size(), kind);
+    return D;
+}
+
+template <typename T>
+void activation_prime_from_output_inplace(Matrix<T>& M, Activation kind) {
+    activation_prime_from_output_span(M.ptr(), M.ptr(), M.data.size(), kind);
+}
+
+// Softmax of every column, shifted by the column maximum for numerical stability.
+template <typename T>
+static void softmax_into(const Matrix<T>& Z, Matrix<T>& S) {
+    int n = Z.format[0], p = Z.format[1];
+    std::vector<T> maxima(Z.ptr(), Z.ptr() + p);
+    for (int i = 1; i < n; i++) {
+        const T* z_row = Z.ptr() + (size_t)i * p;
+        for (int j = 0; j < p; j++) maxima[j] = std::max(maxima[j], z_row[j]);
+    }
+    std::vector<T> totals(p, T(0));
+    for (int i = 0; i < n; i++) {
+        const T* z_row = Z.ptr() + (size_t)i * p;
+        T* s_row = S.ptr() + (size_t)i * p;
+        for (int j = 0; j < p; j++) {
+            s_row[j] = std::exp(z_row[j] - maxima[j]);
+            totals[j] += s_row[j];
+        }
+    }
+    for (int j = 0; j < p; j++) totals[j] = T(1) / totals[j];
+    for (int i = 0; i < n; i++) {
+        T* s_row = S.ptr() + (size_t)i * p;
+        for (int j = 0; j < p; j++) s_row[j] *= totals[j];
+    }
+}
+
+template <typename T>
+Matrix<T> softmax(const Matrix<T>& Z) {
+    Matrix<T> S(Z.format[0], Z.format[1]);
+    if (Z.data.empty()) return S;
+    softmax_into(Z, S);
+    return S;
+}
+
+template <typename T>
+void softmax_inplace(Matrix<T>& M) {
+    if (M.data.empty()) return;
+    softmax_into(M, M);
+}
+
+// Operations of the programs evaluated by fused_elementwise. Every instruction (op, a, b, scalar) writes its own register:
+// load reads the operand a, load_column broadcasts the column vector operand a along the rows, add, sub and mul combine
+// the registers a and b, scale multiplies the register a by scalar, and the activation operations apply the function
+// of kind b (an Activation) to the register a.
+enum class FusedOp { load, load_column, add, sub, mul, scale, activate, activation_prime, activation_prime_from_output };
+
+using FusedInstruction = std::tuple<FusedOp, int, int, double>;
+
+// Number of entries evaluated at once: the registers of a program stay in cache while every instruction runs over them.
+static const size_t FUSED_CHUNK = 512;
+
+// Evaluates a chain of element-wise operations over n x p operands in a single pass, chunk by chunk, so that no
+// intermediate matrix is ever created. The result is the last register of the program.
+template <typename T>
+Matrix<T> fused_elementwise(const std::vector<const Matrix<T>*>& operands, const std::vector<FusedInstruction>& program, int n, int p) {
+    if (program.empty()) {
+        throw std::invalid_argument("Cannot evaluate an empty program.");
+    }
+    for (size_t r = 0; r < program.size(); r++) {
+        FusedOp op = std::get<0>(program[r]);
+        int a = std::get<1>(program[r]), b = std::get<2>(program[r]);
+        if (op == FusedOp::load || op == FusedOp::load_column) {
+            if (a < 0 || (size_t)a >= operands.size()) {
+                throw std::invalid_argument("The program loads an operand that does not exist.");
+            }
+            std::vector<int> expected = {n, op == FusedOp::load ? p : 1};
+            if (operands[a]->format != expected) {
+                throw std::invalid_argument("The formats of the operands do not match the format of the result.");
+            }
+        } else {
+            bool binary = op == FusedOp::add || op == FusedOp::sub || op == FusedOp::mul;
+            if (a < 0 || (size_t)a >= r || (binary && (b < 0 || (size_t)b >= r))) {
+                throw std::invalid_argument("The program reads a register before it is written.");
+            }
+        }
+    }
+    Matrix<T> result(n, p);
+    size_t size = (size_t)n * p;
+    size_t last = program.size() - 1;
+    std::vector<T> scratch(program.size() * FUSED_CHUNK);
+    std::vector<const T*> registers(program.size());
+    for (size_t start = 0; start < size; start += FUSED_CHUNK) {
+        size_t count = std::min(FUSED_CHUNK, size - start);
+        for (size_t r = 0; r < program.size(); r++) {
+            FusedOp op = std::get<0>(program[r]);
+            int a = std::get<1>(program[r]), b = std::get<2>(program[r]);
+            if (op == FusedOp::load) {
+                registers[r] = operands[a]->ptr() + start;
+                if (r == last) std::copy(registers[r], registers[r] + count, result.ptr() + start);
+                continue;
+            }
+            T* y = r == last ? result.ptr() + start : scratch.data() + r * FUSED_CHUNK;
+            registers[r] = y;
+            const T* x = op == FusedOp::load_column ? nullptr : registers[a];
+            const T* z = op == FusedOp::add || op == FusedOp::sub || op == FusedOp::mul ? registers[b] : nullptr;
+            switch (op) {
+                case FusedOp::load_column: {
+                    const T* column = operands[a]->ptr();
+                    for (size_t l = 0; l < count; l++) y[l] = column[(start + l) / p];
+                    break;
+                }
+                case FusedOp::add:
+                    for (size_t l = 0; l < count; l++) y[l] = x[l] + z[l];
+                    break;
+                case FusedOp::sub:
+                    for (size_t l = 0; l < count; l++) y[l] = x[l] - z[l];
+                    break;
+                case FusedOp::mul:
+                    for (size_t l = 0; l < count; l++) y[l] = x[l] * z[l];
+                    break;
+                case FusedOp::scale:
+                    map_span(x, y, count, [k = (T)std::get<3>(program[r])](T v) { return v * k; });
+                    break;
+                case FusedOp::activate:
+                    activation_span(x, y, count, static_cast<Activation>(b));
+                    break;
+                case FusedOp::activation_prime:
+                    activation_prime_span(x, y, count, static_cast<Activation>(b));
+                    break;
+                case FusedOp::activation_prime_from_output:
+                    activation_prime_from_output_span(x, y, count, static_cast<Activation>(b));
+                    break;
+                default:
+                    break;
+            }
+        }
+    }
+    return result;
+}
+
+// Fused dense layer kernels: the bias, the activation function and its derivative are applied
+// inside the products, so that no intermediate matrix is created.
+template <typename T>
+static void check_dense_formats(const Matrix<T>& W, const Matrix<T>& X, const Matrix<T>& B) {
+    if (W.format[1] != X.format[0]) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    if (B.format[1] != 1 || B.format[0] != W.format[0]) {
+        throw std::invalid_argument("The bias must be a column vector with one entry per row of the weights.");
+    }
+}
+
+// A = f(W * X + B). Z receives W * X + B if it is given; otherwise the activation is applied to A in place.
+template <typename T>
+void dense_forward_into(Matrix<T>* Z, Matrix<T>& A, const Matrix<T>& W, const Matrix<T>& X, const Matrix<T>& B, Activation kind) {
+    check_dense_formats(W, X, B);
+    if (&A == &X || Z == &X) {
+        throw std::invalid_argument("The output of a layer cannot be its input.");
+    }
+    int n = W.format[0], m = W.format[1], p = X.format[1];
+    A.resize(n, p);
+    GemmArgs<T> g = {W.ptr(), X.ptr(), A.ptr(), n, m, p, false, false, T(1), T(0)};
+    if (Z) {
+        Z->resize(n, p);
+        g.C = Z->ptr();
+        g.activation_out = A.ptr();
+    }
+    g.row_bias = B.ptr();
+    g.epilogue = Epilogue::activate;
+    g.kind = kind;
+    gemm(g);
+}
+
+// Error of the output layer: (A - Y) * f'(Z), with f'(Z) read from the output A = f(Z).
+template <typename T>
+void output_error_into(Matrix<T>& E, const Matrix<T>& A, const Matrix<T>& Y, Activation kind) {
+    if (A.format != Y.format) {
+        throw std::invalid_argument("The output and the expected output must have the same format.");
+    }
+    E.resize(A.format[0], A.format[1]);
+    const T* a = A.ptr();
+    const T* y = Y.ptr();
+    T* e = E.ptr();
+    size_t size = A.data.size();
+    for (size_t l = 0; l < size; l++) {
+        e[l] = a[l] - y[l];
+    }
+    multiply_prime_from_output_span(a, e, size, kind);
+}
+
+// Sum of the squared differences between the output A and the expected output Y, accumulated in double.
+template <typename T>
+double squared_error_sum(const Matrix<T>& A, const Matrix<T>& Y) {
+    if (A.format != Y.format) {
+        throw std::invalid_argument("The output and the expected output must have the same format.");
+    }
+    const T* a = A.ptr();
+    const T* y = Y.ptr();
+    size_t size = A.data.size();
+    double total = 0.0;
+    for (size_t l = 0; l < size; l++) {
+        double d = (double)a[l] - (double)y[l];
+        total += d * d;
+    }
+    return total;
+}
+
+// From the error E of a layer of weights W fed with A_prev: grad_W = E * A_prev^T, grad_b = sum of the columns of E and,
+// if E_prev is given, the error of the previous layer (W^T * E) * f'(Z_prev), with f'(Z_prev) read from A_prev = f(Z_prev).
+template <typename T>
+void dense_backward_into(Matrix<T>& grad_W, Matrix<T>& grad_b, Matrix<T>* E_prev,
+                         const Matrix<T>& W, const Matrix<T>& E, const Matrix<T>& A_prev, Activation kind_prev) {
+    if (E.format[0] != W.format[0] || A_prev.format[0] != W.format[1] || A_prev.format[1] != E.format[1]) {
+        throw std::invalid_argument("Invalid matrix formats for backpropagation.");
+    }
+    int n = W.format[0], m = W.format[1], p = E.format[1];
+    grad_W.resize(n, m);
+    gemm(GemmArgs<T>{E.ptr(), A_prev.ptr(), grad_W.ptr(), n, p, m, false, true, T(1), T(0)});
+    grad_b.resize(n, 1);
+    for (int i = 0; i < n; i++) {
+        const T* e_row = E.ptr() + (size_t)i * p;
+        double total = 0.0;
+        for (int j = 0; j < p; j++) total += e_row[j];
+        grad_b.data[i] = (T)total;
+    }
+    if (E_prev) {
+        E_prev->resize(m, p);
+        GemmArgs<T> g = {W.ptr(), E.ptr(), E_prev->ptr(), m, n, p, true, false, T(1), T(0)};
+        g.epilogue = Epilogue::multiply_prime;
+        g.kind = kind_prev;
+        g.prime_source = A_prev.ptr();
+        gemm(g);
+    }
+}
+
+// In-place optimizer kernels: each parameter is updated in a single pass, without temporaries.
+template <typename T>
+static void check_same_format(const Matrix<T>& A, const Matrix<T>& B) {
+    if (A.format != B.format) {
+        throw std::invalid_argument("The parameter and its gradient or state must have the same format.");
+    }
+}
+
+// W -= lr * scale * G
+template <typename T>
+void sgd_step(Matrix<T>& W, const Matrix<T>& G, double lr, double scale) {
+    check_same_format(W, G);
+    T k = (T)(lr * scale);
+    T* w = W.ptr();
+    const T* g = G.ptr();
+    size_t size = W.data.size();
+    for (size_t l = 0; l < size; l++) {
+        w[l] -= k * g[l];
+    }
+}
+
+// V = momentum * V + scale * G, then W -= lr * V
+template <typename T>
+void momentum_step(Matrix<T>& W, const Matrix<T>& G, Matrix<T>& V, double lr, double momentum, double scale) {
+    check_same_format(W, G);
+    check_same_format(W, V);
+    T* w = W.ptr();
+    T* v = V.ptr();
+    const T* g = G.ptr();
+    T mu = (T)momentum, k = (T)scale, rate = (T)lr;
+    size_t size = W.data.size();
+    for (size_t l = 0; l < size; l++) {
+        v[l] = mu * v[l] + k * g[l];
+        w[l] -= rate * v[l];
+    }
+}
+
+// M and V are the first and second moment estimates; lr_t already includes the bias corrections of step t.
+template <typename T>
+void adam_step(Matrix<T>& W, const Matrix<T>& G, Matrix<T>& M, Matrix<T>& V,
+               double lr_t, double beta1, double beta2, double eps, double scale) {
+    check_same_format(W, G);
+    check_same_format(W, M);
+    check_same_format(W, V);
+    T* w = W.ptr();
+    T* m1 = M.ptr();
+    T* m2 = V.ptr();
+    const T* g = G.ptr();
+    T b1 = (T)beta1, b2 = (T)beta2, k = (T)scale, rate = (T)lr_t, epsilon = (T)eps;
+    size_t size = W.data.size();
+    for (size_t l = 0; l < size; l++) {
+        T grad = k * g[l];
+        m1[l] = b1 * m1[l] + (T(1) - b1) * grad;
+        m2[l] = b2 * m2[l] + (T(1) - b2) * grad * grad;
+        w[l] -= rate * m1[l] / (std::sqrt(m2[l]) + epsilon);
+    }
+}
+
+// Splits count row-major records, each made of n_inputs inputs followed by the outputs, into an input batch and an
+// output batch with one column per record (the layout expected by the layers).
+template <typename T, typename R>
+void records_to_batch_into(Matrix<T>& X, Matrix<T>& Y, const R* records, int count, int n_inputs, int n_outputs) {
+    int width = n_inputs + n_outputs;
+    X.resize(n_inputs, count);
+    Y.resize(n_outputs, count);
+    for (int r = 0; r < count; r++) {
+        const R* record = records + (size_t)r * width;
+        for (int i = 0; i < n_inputs; i++) {
+            X.data[(size_t)i * count + r] = (T)record[i];
+        }
+        for (int i = 0; i < n_outputs; i++) {
+            Y.data[(size_t)i * count + r] = (T)record[n_inputs + i];
+        }
+    }
+}
+
+// Sparse matrix in compressed sparse column (CSC) format: the row indices and the values of the non-zero entries of
+// column j are rowind[colptr[j] .. colptr[j + 1]) and values[colptr[j] .. colptr[j + 1]), by increasing row index.
+// Columns are the samples of a batch, so stacking samples and slicing batches only copy the non-zero entries.
+// The CSC format of the transpose of a matrix is its CSR (compressed sparse row) format.
+template <typename T>
+class SparseMatrix {
+public:
+    std::vector<int> format;
+    std::vector<int64_t> colptr;
+    std::vector<int> rowind;
+    std::vector<T> values;
+
+    SparseMatrix(int n, int p) : format{n, p}, colptr((size_t)p + 1, 0) {}
+    SparseMatrix(int n, int p, std::vector<int64_t> colptr, std::vector<int> rowind, std::vector<T> values);
+    template <typename U> explicit SparseMatrix(const SparseMatrix<U>& other)
+        : format(other.format), colptr(other.colptr), rowind(other.rowind), values(other.values.begin(), other.values.end()) {}
+
+    int rows() const { return format[0]; }
+    int cols() const { return format[1]; }
+    int64_t nnz() const { return colptr.back(); }
+    T get_entry(int i, int j) const;
+    static SparseMatrix from_dense(const Matrix<T>& D);
+    static Matrix<T> to_dense(const SparseMatrix& S);
+    static SparseMatrix transpose(const SparseMatrix& S);
+    static SparseMatrix scale(const SparseMatrix& S, T k);
+    static SparseMatrix hstack(const std::vector<const SparseMatrix*>& blocks);
+    static SparseMatrix columns(const SparseMatrix& S, int start, int count);
+    static bool equals(const SparseMatrix& A, const SparseMatrix& B);
+    static Matrix<T> product(const SparseMatrix& S, const Matrix<T>& D);
+    static Matrix<T> dense_product(const Matrix<T>& D, const SparseMatrix& S);
+    static Matrix<T> add_to_dense(const Matrix<T>& D, const SparseMatrix& S, T k);
+};
+
+template <typename T>
+SparseMatrix<T>::SparseMatrix(int n, int p, std::vector<int64_t> colptr, std::vector<int> rowind, std::vector<T> values)
+    : format{n, p}, colptr(std::move(colptr)), rowind(std::move(rowind)), values(std::move(values)) {
+    if (n < 0 || p < 0 || this->colptr.size() != (size_t)p + 1 || this->colptr[0] != 0) {
+        throw std::invalid_argument("The column pointers must hold one entry per column plus one, starting at 0.");
+    }
+    if (this->rowind.size() != this->values.size() || (int64_t)this->rowind.size() != this->colptr.back()) {
+        throw std::invalid_argument("The row indices and the values must hold one entry per non-zero entry.");
+    }
+    for (int j = 0; j < p; j++) {
+        if (this->colptr[j + 1] < this->colptr[j]) {
+            throw std::invalid_argument("The column pointers must be non-decreasing.");
+        }
+        for (int64_t l = this->colptr[j]; l < this->colptr[j + 1]; l++) {
+            int i = this->rowind[l];
+            if (i < 0 || i >= n || (l > this->colptr[j] && i <= this->rowind[l - 1])) {
+                throw std::invalid_argument("The row indices of each column must be increasing and within the matrix.");
+            }
+        }
+    }
+}
+
+template <typename T>
+T SparseMatrix<T>::get_entry(int i, int j) const {
+    if (i < 1 || i > format[0] || j < 1 || j > format[1]) {
+        return T(0);
+    }
+    auto first = rowind.begin() + colptr[j - 1], last = rowind.begin() + colptr[j];
+    auto found = std::lower_bound(first, last, i - 1);
+    return found != last && *found == i - 1 ? values[found - rowind.begin()] : T(0);
+}
+
+template <typename T>
+SparseMatrix<T> SparseMatrix<T>::from_dense(const Matrix<T>& D) {
+    int n = D.format[0], p = D.format[1];
+    SparseMatrix S(n, p);
+    for (int j = 0; j < p; j++) {
+        for (int i = 0; i < n; i++) {
+            T x = D.data[(size_t)i * p + j];
+            if (x != T(0)) {
+                S.rowind.push_back(i);
+                S.values.push_back(x);
+            }
+        }
+        S.colptr[j + 1] = (int64_t)S.rowind.size();
+    }
+    return S;
+}
+
+template <typename T>
+Matrix<T> SparseMatrix<T>::to_dense(const SparseMatrix& S) {
+    int p = S.format[1];
+    Matrix<T> D(S.format[0], p);
+    for (int j = 0; j < p; j++) {
+        for (int64_t l = S.colptr[j]; l < S.colptr[j + 1]; l++) {
+            D.data[(size_t)S.rowind[l] * p + j] = S.values[l];
+        }
+    }
+    return D;
+}
+
+// Counting sort of the entries by row: the columns of the transpose are the rows of S, visited in increasing column order.
+template <typename T>
+SparseMatrix<T> SparseMatrix<T>::transpose(const SparseMatrix& S) {
+    int n = S.format[0], p = S.format[1];
+    SparseMatrix R(p, n);
+    R.rowind.resize(S.rowind.size());
+    R.values.resize(S.values.size());
+    for (int i : S.rowind) R.colptr[(size_t)i + 1]++;
+    for (int i = 0; i < n; i++) R.colptr[i + 1] += R.colptr[i];
+    std::vector<int64_t> next(R.colptr.begin(), R.colptr.end() - 1);
+    for (int j = 0; j < p; j++) {
+        for (int64_t l = S.colptr[j]; l < S.colptr[j + 1]; l++) {
+            int64_t target = next[S.rowind[l]]++;
+            R.rowind[target] = j;
+            R.values[target] = S.values[l];
+        }
+    }
+    return R;
+}
+
+template <typename T>
+SparseMatrix<T> SparseMatrix<T>::scale(const SparseMatrix& S, T k) {
+    SparseMatrix R = S;
+    for (T& x : R.values) x *= k;
+    return R;
+}
+
+template <typename T>
+SparseMatrix<T> SparseMatrix<T>::hstack(const std::vector<const SparseMatrix*>& blocks) {
+    if (blocks.empty()) {
+        throw std::invalid_argument("Cannot stack an empty list of matrices.");
+    }
+    int n = blocks[0]->format[0], p = 0;
+    int64_t nnz = 0;
+    for (const SparseMatrix* B : blocks) {
+        if (B->format[0] != n) {
+            throw std::invalid_argument("Cannot stack matrices with different numbers of rows.");
+        }
+        p += B->format[1];
+        nnz += B->nnz();
+    }
+    SparseMatrix S(n, p);
+    S.rowind.reserve((size_t)nnz);
+    S.values.reserve((size_t)nnz);
+    int j = 0;
+    for (const SparseMatrix* B : blocks) {
+        S.rowind.insert(S.rowind.end(), B->rowind.begin(), B->rowind.end());
+        S.values.insert(S.values.end(), B->values.begin(), B->values.end());
+        for (int c = 0; c < B->format[1]; c++, j++) {
+            S.colptr[j + 1] = S.colptr[j] + (B->colptr[c + 1] - B->colptr[c]);
+        }
+    }
+    return S;
+}
+
+template <typename T>
+SparseMatrix<T> SparseMatrix<T>::columns(const SparseMatrix& S, int start, int count) {
+    if (start < 0 || count < 0 || start + count > S.format[1]) {
+        throw std::invalid_argument("The range of columns is out of the matrix.");
+    }
+    SparseMatrix R(S.format[0], count);
+    int64_t first = S.colptr[start], last = S.colptr[start + count];
+    R.rowind.assign(S.rowind.begin() + first, S.rowind.begin() + last);
+    R.values.assign(S.values.begin() + first, S.values.begin() + last);
+    for (int c = 0; c <= count; c++) {
+        R.colptr[c] = S.colptr[start + c] - first;
+    }
+    return R;
+}
+
+template <typename T>
+bool SparseMatrix<T>::equals(const SparseMatrix& A, const SparseMatrix& B) {
+    return A.format == B.format && A.colptr == B.colptr && A.rowind == B.rowind && A.values == B.values;
+}
+
+// S * D: every non-zero entry s_ik adds s_ik times the k-th row of D to the i-th row of the result.
+template <typename T>
+Matrix<T> SparseMatrix<T>::product(const SparseMatrix& S, const Matrix<T>& D) {
+    if (S.format[1] != D.format[0]) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    int p = D.format[1];
+    Matrix<T> C(S.format[0], p);
+    for (int k = 0; k < S.format[1]; k++) {
+        const T* __restrict d_row = D.ptr() + (size_t)k * p;
+        for (int64_t l = S.colptr[k]; l < S.colptr[k + 1]; l++) {
+            T s = S.values[l];
+            T* __restrict c_row = C.ptr() + (size_t)S.rowind[l] * p;
+            for (int j = 0; j < p; j++) c_row[j] += s * d_row[j];
+        }
+    }
+    return C;
+}
+
+// C = D * S (+ the column vector B on every column): the entry (i, j) is the dot product of the i-th row of D with the
+// non-zero entries of the j-th column of S, so the work is proportional to the rows of D times the non-zero entries of S.
+template <typename T>
+static void dense_sparse_product_into(Matrix<T>& C, const Matrix<T>& D, const SparseMatrix<T>& S, const T* row_bias) {
+    if (D.format[1] != S.format[0]) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    if (&C == &D) {
+        throw std::invalid_argument("The output of a product cannot be one of its operands.");
+    }
+    int n = D.format[0], m = D.format[1], p = S.format[1];
+    C.resize(n, p);
+    for (int i = 0; i < n; i++) {
+        const T* d_row = D.ptr() + (size_t)i * m;
+        T* c_row = C.ptr() + (size_t)i * p;
+        T bias = row_bias ? row_bias[i] : T(0);
+        for (int j = 0; j < p; j++) {
+            T dot = bias;
+            for (int64_t l = S.colptr[j]; l < S.colptr[j + 1]; l++) dot += d_row[S.rowind[l]] * S.values[l];
+            c_row[j] = dot;
+        }
+    }
+}
+
+template <typename T>
+Matrix<T> SparseMatrix<T>::dense_product(const Matrix<T>& D, const SparseMatrix& S) {
+    Matrix<T> C(0, 0);
+    dense_sparse_product_into(C, D, S, (const T*)nullptr);
+    return C;
+}
+
+template <typename T>
+Matrix<T> SparseMatrix<T>::add_to_dense(const Matrix<T>& D, const SparseMatrix& S, T k) {
+    if (D.format != S.format) {
+        throw std::invalid_argument("Cannot add two matrices of different formats.");
+    }
+    Matrix<T> C(D);
+    int p = S.format[1];
+    for (int j = 0; j < p; j++) {
+        for (int64_t l = S.colptr[j]; l < S.colptr[j + 1]; l++) {
+            C.data[(size_t)S.rowind[l] * p + j] += k * S.values[l];
+        }
+    }
+    return C;
+}
+
+// Sparse counterpart of dense_forward_into for a sparse input batch X: A = f(W * X + B), with W * X + B in Z if given.
+template <typename T>
+void sparse_dense_forward_into(Matrix<T>* Z, Matrix<T>& A, const Matrix<T>& W, const SparseMatrix<T>& X, const Matrix<T>& B, Activation kind) {
+    if (B.format[1] != 1 || B.format[0] != W.format[0]) {
+        throw std::invalid_argument("The bias must be a column vector with one entry per row of the weights.");
+    }
+    Matrix<T>& C = Z ? *Z : A;
+    dense_sparse_product_into(C, W, X, B.ptr());
+    A.resize(C.format[0], C.format[1]);
+    activation_span(C.ptr(), A.ptr(), C.data.size(), kind);
+}
+
+// Sparse counterpart of dense_backward_into for a layer fed with a sparse input batch X, which has no error to propagate:
+// grad_W = E * X^T is accumulated over the non-zero entries of X only, row by row of E, and grad_b is the sum of the
+// columns of E. grad_W is dense, since the weights are, but the work is proportional to the non-zero entries of X.
+template <typename T>
+void sparse_dense_backward_into(Matrix<T>& grad_W, Matrix<T>& grad_b, const Matrix<T>& E, const SparseMatrix<T>& X) {
+    if (X.format[1] != E.format[1]) {
+        throw std::invalid_argument("Invalid matrix formats for backpropagation.");
+    }
+    int n = E.format[0], m = X.format[0], p = E.format[1];
+    grad_W.resize(n, m);
+    std::fill(grad_W.ptr(), grad_W.ptr() + grad_W.data.size(), T(0));
+    grad_b.resize(n, 1);
+    for (int i = 0; i < n; i++) {
+        const T* e_row = E.ptr() + (size_t)i * p;
+        T* g_row = grad_W.ptr() + (size_t)i * m;
+        double total = 0.0;
+        for (int j = 0; j < p; j++) {
+            T e = e_row[j];
+            total += e;
+            if (e == T(0)) continue;
+            for (int64_t l = X.colptr[j]; l < X.colptr[j + 1]; l++) g_row[X.rowind[l]] += e * X.values[l];
+        }
+        grad_b.data[i] = (T)total;
+    }
+}
+
+// Weights quantized to int8 with one float scale per row (symmetric quantization): entry (i, k) is approximated by
+// scales[i] * values[i * cols + k], the values lying in [-127, 127]. Both buffers can be views over memory owned by a
+// Python object, such as a memory-mapped quantized checkpoint.
+class QuantizedMatrix {
+public:
+    std::vector<int> format;
+    Buffer<int8_t> values; // Row-major contiguous buffer of format[0] * format[1] entries.
+    Buffer<float> scales;  // One scale per row.
+
+    QuantizedMatrix(int n, int p) : format{n, p} {
+        if (n < 0 || p < 0) {
+            throw std::invalid_argument("Matrix dimensions must be non-negative.");
+        }
+        values.assign((size_t)n * p, 0);
+        scales.assign((size_t)n, 0.0f);
+    }
+
+    int rows() const { return format[0]; }
+    int cols() const { return format[1]; }
+    size_t nbytes() const { return values.size() * sizeof(int8_t) + scales.size() * sizeof(float); }
+    template <typename T> static QuantizedMatrix quantize(const Matrix<T>& W);
+    template <typename T> static Matrix<T> dequantize(const QuantizedMatrix& Q);
+};
+
+// Each row is scaled so that its largest entry in absolute value maps to 127, and rounded to the nearest integer.
+template <typename T>
+QuantizedMatrix QuantizedMatrix::quantize(const Matrix<T>& W) {
+    int n = W.format[0], p = W.format[1];
+    QuantizedMatrix Q(n, p);
+    for (int i = 0; i < n; i++) {
+        const T* w = W.ptr() + (size_t)i * p;
+        double largest = 0.0;
+        for (int k = 0; k < p; k++) largest = std::max(largest, std::fabs((double)w[k]));
+        float scale = (float)(largest / 127.0);
+        Q.scales[i] = scale;
+        if (scale == 0.0f) continue;
+        int8_t* q = Q.values.data() + (size_t)i * p;
+        for (int k = 0; k < p; k++) {
+            double r = std::round((double)w[k] / scale);
+            q[k] = (int8_t)std::max(-127.0, std::min(127.0, r));
+        }
+    }
+    return Q;
+}
+
+template <typename T>
+Matrix<T> QuantizedMatrix::dequantize(const QuantizedMatrix& Q) {
+    int n = Q.format[0], p = Q.format[1];
+    Matrix<T> W(n, p);
+    for (int i = 0; i < n; i++) {
+        const int8_t* q = Q.values.data() + (size_t)i * p;
+        T scale = (T)Q.scales[i];
+        T* w = W.ptr() + (size_t)i * p;
+        for (int k = 0; k < p; k++) w[k] = scale * (T)q[k];
+    }
+    return W;
+}
+
+// Up to this many columns, the int8 rows are multiplied directly; wider batches go through the packed product, which
+// dequantizes the weights while packing them, so that the conversion is spread over the columns.
+static const int QUANTIZED_DIRECT_COLUMNS = 4;
+
+// Rows i0 to i1 of C = f(diag(scales) * (Q * X) + B) for a narrow X (m x p, row-major, p <= QUANTIZED_DIRECT_COLUMNS).
+template <typename T>
+static void quantized_rows(const QuantizedMatrix& Q, const T* X, T* C, int p, const T* row_bias, Activation kind, int i0, int i1) {
+    int m = Q.format[1];
+    for (int i = i0; i < i1; i++) {
+        const int8_t* __restrict q = Q.values.data() + (size_t)i * m;
+        T acc[QUANTIZED_DIRECT_COLUMNS] = {};
+        if (p == 1) {
+            // Independent partial sums, so that consecutive multiply-adds do not wait for each other.
+            T partial[8] = {};
+            int k = 0;
+            for (; k + 8 <= m; k += 8) {
+                for (int l = 0; l < 8; l++) partial[l] += (T)q[k + l] * X[k + l];
+            }
+            for (; k < m; k++) partial[0] += (T)q[k] * X[k];
+            for (int l = 0; l < 8; l++) acc[0] += partial[l];
+        } else {
+            for (int k = 0; k < m; k++) {
+                T a = (T)q[k];
+                const T* x_row = X + (size_t)k * p;
+                for (int j = 0; j < p; j++) acc[j] += a * x_row[j];
+            }
+        }
+        T scale = (T)Q.scales[i], bias = row_bias ? row_bias[i] : T(0);
+        T* c_row = C + (size_t)i * p;
+        for (int j = 0; j < p; j++) c_row[j] = scale * acc[j] + bias;
+        activation_span(c_row, c_row, (size_t)p, kind);
+    }
+}
+
+// A = f(diag(scales) * (Q * X) + B) for an int8 Q and a float X; B can be null (no bias). The weights are read as int8,
+// so the memory traffic of the product is a quarter (float32) or an eighth (float64) of that of dense_forward_into.
+template <typename T>
+void quantized_forward_into(Matrix<T>& A, const QuantizedMatrix& Q, const Matrix<T>& X, const Matrix<T>* B, Activation kind) {
+    if (Q.format[1] != X.format[0]) {
+        throw std::invalid_argument("Invalid matrix formats for product.");
+    }
+    if (B && (B->format[1] != 1 || B->format[0] != Q.format[0])) {
+        throw std::invalid_argument("The bias must be a column vector with one entry per row of the weights.");
+    }
+    if (&A == &X) {
+        throw std::invalid_argument("The output of a layer cannot be its input.");
+    }
+    int n = Q.format[0], m = Q.format[1], p = X.format[1];
+    A.resize(n, p);
+    const T* row_bias = B ? B->ptr() : nullptr;
+    if (p > QUANTIZED_DIRECT_COLUMNS) {
+        GemmArgs<T> g = {nullptr, X.ptr(), A.ptr(), n, m, p, false, false, T(1), T(0)};
+        g.A_int8 = Q.values.data();
+        g.A_scales = Q.scales.data();
+        g.row_bias = row_bias;
+        g.epilogue = Epilogue::activate;
+        g.kind = kind;
+        gemm(g);
+        return;
+    }
+    double work = (double)n * m * p;
+    int threads = std::max(1, std::min({get_num_threads(), (int)(work / GEMM_PARALLEL_THRESHOLD), n}));
+    if (threads == 1) {
+        quantized_rows(Q, X.ptr(), A.ptr(), p, row_bias, kind, 0, n);
+        return;
+    }
+    parallel_for(n, threads, 1, [&](int start, int stop) {
+        quantized_rows(Q, X.ptr(), A.ptr(), p, row_bias, kind, start, stop);
+    });
+}
+
 // Python-friendly methods
-py::list Matrix::get_row_py(int i) const {
+template <typename T>
+py::list Matrix<T>::get_row_py(int i) const {
     py::list result;
-    std::vector<double> row = get_row(i);
-    for (double val : row) {
+    std::vector<T> row = get_row(i);
+    for (T val : row) {
         result.append(val);
     }
     return result;
 }
 
-py::list Matrix::get_column_py(int j) const {
+template <typename T>
+py::list Matrix<T>::get_column_py(int j) const {
     py::list result;
-    std::vector<double> col = get_column(j);
-    for (double val : col) {
+    std::vector<T> col = get_column(j);
+    for (T val : col) {
         result.append(val);
     }
     return result;
 }
 
-py::list Matrix::get_format() const {
+template <typename T>
+py::list Matrix<T>::get_format() const {
     py::list result;
     for (int val : format) {
         result.append(val);
@@ -197,32 +1859,401 @@ py::list Matrix::get_format() const {
     return result;
 }
 
-py::list Matrix::get_matrix() const {
+template <typename T>
+py::list Matrix<T>::get_matrix() const {
     py::list result;
-    for (const auto& row : matrix) {
+    for (int i = 0; i < format[0]; i++) {
         py::list py_row;
-        for (double val : row) {
-            py_row.append(val);
+        for (int j = 0; j < format[1]; j++) {
+            py_row.append(data[(size_t)i * format[1] + j]);
         }
         result.append(py_row);
     }
     return result;
 }
 
+// Name of the Python dtype of the entries of a Matrix<T>.
+template <typename T> const char* dtype_name();
+template <> const char* dtype_name<double>() { return "float64"; }
+template <> const char* dtype_name<float>() { return "float32"; }
+
+// Buffer slots of the Python class of Matrix<T>: those of pybind11 (see def_buffer), which also count the exports of
+// the Buffer of the matrix (see Buffer), from the request of a Python buffer until its release.
+template <typename T>
+static int counted_getbuffer(PyObject* obj, Py_buffer* view, int flags) {
+    int result = py::detail::pybind11_getbuffer(obj, view, flags);
+    if (result == 0) py::handle(obj).cast<Matrix<T>&>().data.add_export();
+    return result;
+}
+
+template <typename T>
+static void counted_releasebuffer(PyObject* obj, Py_buffer* view) {
+    py::handle(obj).cast<Matrix<T>&>().data.release_export();
+    py::detail::pybind11_releasebuffer(obj, view);
+}
+
+template <typename T>
+static void count_buffer_exports(py::handle cls) {
+    PyBufferProcs& slots = ((PyHeapTypeObject*)cls.ptr())->as_buffer;
+    slots.bf_getbuffer = counted_getbuffer<T>;
+    slots.bf_releasebuffer = counted_releasebuffer<T>;
+}
+
+// Binds Matrix<T> as the Python class `name`; U is the other precision, whose matrices can be converted.
+template <typename T, typename U>
+void bind_matrix(py::module& m, const char* name) {
+    using M_T = Matrix<T>;
+    py::class_<M_T>(m, name, py::buffer_protocol())
+        .def(py::init<std::vector<std::vector<T>>>())
+        .def(py::init<int, int>())
+        .def(py::init<const M_T&>())
+        .def(py::init<const Matrix<U>&>(), py::call_guard<py::gil_scoped_release>())
+        .def_property_readonly_static("dtype", [](py::object) { return dtype_name<T>(); })
+        .def_buffer([](M_T& M) -> py::buffer_info {
+            // Exposes the native buffer to Python (memoryview, array, ...) without copying.
+            return py::buffer_info(
+                M.ptr(),
+                sizeof(T),
+                py::format_descriptor<T>::format(),
+                2,
+                {(py::ssize_t)M.format[0], (py::ssize_t)M.format[1]},
+                {(py::ssize_t)(sizeof(T) * M.format[1]), (py::ssize_t)sizeof(T)}
+            );
+        })
+        .def_static("view", [](py::buffer buffer, int n, int p) {
+            py::buffer_info info = buffer.request(true);
+            if (info.format != py::format_descriptor<T>::format() || info.itemsize != (py::ssize_t)sizeof(T)) {
+                throw std::invalid_argument(std::string("The buffer must hold ") + dtype_name<T>() + " entries.");
+            }
+            if (n < 0 || p < 0 || info.size != (py::ssize_t)n * p) {
+                throw std::invalid_argument("The buffer size does not match the matrix format.");
+            }
+            py::ssize_t stride = sizeof(T);
+            for (py::ssize_t d = info.ndim - 1; d >= 0; d--) {
+                if (info.shape[d] > 1 && info.strides[d] != stride) {
+                    throw std::invalid_argument("The buffer must be C-contiguous.");
+                }
+                stride *= info.shape[d];
+            }
+            M_T M(0, 0);
+            M.format = {n, p};
+            M.data = Buffer<T>::view(static_cast<T*>(info.ptr), (size_t)info.size, buffer);
+            return M;
+        }, py::arg("buffer"), py::arg("n"), py::arg("p"),
+        "Returns a matrix of format (n, p) over the entries of a writable, C-contiguous buffer of the same dtype, without "
+        "copying them; the matrix keeps the buffer alive.")
+        .def_static("batch_from_records", [](py::buffer records, int count, int n_inputs) -> py::tuple {
+            py::buffer_info info = records.request();
+            bool is_double = info.format == py::format_descriptor<double>::format();
+            bool is_float = info.format == py::format_descriptor<float>::format();
+            if (!is_double && !is_float) {
+                throw std::invalid_argument("The records must be float64 or float32 entries.");
+            }
+            if (count < 1 || n_inputs < 0 || info.size % count != 0 || info.size / count <= n_inputs) {
+                throw std::invalid_argument("The size of the records does not match their count and number of inputs.");
+            }
+            int n_outputs = (int)(info.size / count) - n_inputs;
+            M_T X(0, 0), Y(0, 0);
+            {
+                py::gil_scoped_release release;
+                if (is_double) {
+                    records_to_batch_into(X, Y, static_cast<const double*>(info.ptr), count, n_inputs, n_outputs);
+                } else {
+                    records_to_batch_into(X, Y, static_cast<const float*>(info.ptr), count, n_inputs, n_outputs);
+                }
+            }
+            return py::make_tuple(std::move(X), std::move(Y));
+        }, py::arg("records"), py::arg("count"), py::arg("n_inputs"),
+        "Returns the (input batch, output batch) of count contiguous row-major records of n_inputs inputs followed by the "
+        "outputs, with one column per record.")
+        .def_property_readonly("is_view", [](const M_T& M) { return M.data.is_view(); })
+        .def("resize", &M_T::resize)
+        .def_property_readonly("capacity", &M_T::capacity)
+        .def_property_readonly("rows", &M_T::rows)
+        .def_property_readonly("cols", &M_T::cols)
+        .def("get_entry", &M_T::get_entry)
+        .def("set_entry", &M_T::set_entry)
+        .def("get_row", &M_T::get_row_py)
+        .def("get_column", &M_T::get_column_py)
+        .def("get_format", &M_T::get_format)
+        .def("get_matrix", &M_T::get_matrix)
+        .def_static("zero", &M_T::zero)
+        .def_static("randomize", &M_T::randomize)
+        .def_static("product", &M_T::product,
+                    py::arg("A"), py::arg("B"), py::arg("transpose_a") = false, py::arg("transpose_b") = false,
+                    py::arg("alpha") = T(1), py::call_guard<py::gil_scoped_release>())
+        .def_static("product_into", &M_T::product_into,
+                    py::arg("C"), py::arg("A"), py::arg("B"), py::arg("transpose_a") = false, py::arg("transpose_b") = false,
+                    py::call_guard<py::gil_scoped_release>())
+        .def_static("reference_product", &M_T::reference_product, py::call_guard<py::gil_scoped_release>())
+        .def_static("cwise_prod", &M_T::cwise_product)
+        .def_static("sum", &M_T::sum)
+        .def_static("difference", &M_T::difference)
+        .def_static("scale", &M_T::scale)
+        .def_static("transpose", &M_T::transpose)
+        .def_static("add_to_columns", &M_T::add_to_columns)
+        .def_static("add_to_columns_inplace", &M_T::add_to_columns_inplace)
+        .def_static("add_inplace", &M_T::add_inplace, py::call_guard<py::gil_scoped_release>())
+        .def_static("sum_columns", &M_T::sum_columns)
+        .def_static("hstack", &M_T::hstack)
+        .def_static("columns", &M_T::columns, py::arg("A"), py::arg("start"), py::arg("count"))
+        .def_static("sum_into", &M_T::sum_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("difference_into", &M_T::difference_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("cwise_prod_into", &M_T::cwise_product_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("scale_into", &M_T::scale_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("transpose_into", &M_T::transpose_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("add_to_columns_into", &M_T::add_to_columns_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("sum_columns_into", &M_T::sum_columns_into, py::call_guard<py::gil_scoped_release>())
+        .def_static("columns_into", &M_T::columns_into, py::arg("C"), py::arg("A"), py::arg("start"), py::arg("count"),
+                    py::call_guard<py::gil_scoped_release>())
+        .def_static("equals", &M_T::equals);
+    count_buffer_exports<T>(m.attr(name));
+}
+
+// Binds SparseMatrix<T> as the Python class `name`; U is the other precision, whose matrices can be converted.
+template <typename T, typename U>
+void bind_sparse_matrix(py::module& m, const char* name) {
+    using S_T = SparseMatrix<T>;
+    py::class_<S_T>(m, name)
+        .def(py::init<int, int, std::vector<int64_t>, std::vector<int>, std::vector<T>>(),
+             py::arg("n"), py::arg("p"), py::arg("colptr"), py::arg("rowind"), py::arg("values"))
+        .def(py::init<const S_T&>())
+        .def(py::init<const SparseMatrix<U>&>(), py::call_guard<py::gil_scoped_release>())
+        .def_property_readonly_static("dtype", [](py::object) { return dtype_name<T>(); })
+        .def_property_readonly("rows", &S_T::rows)
+        .def_property_readonly("cols", &S_T::cols)
+        .def_property_readonly("nnz", &S_T::nnz)
+        .def_readonly("colptr", &S_T::colptr)
+        .def_readonly("rowind", &S_T::rowind)
+        .def_readonly("values", &S_T::values)
+        .def("get_entry", &S_T::get_entry)
+        .def_static("from_dense", &S_T::from_dense, py::call_guard<py::gil_scoped_release>())
+        .def_static("to_dense", &S_T::to_dense, py::call_guard<py::gil_scoped_release>())
+        .def_static("transpose", &S_T::transpose, py::call_guard<py::gil_scoped_release>())
+        .def_static("scale", &S_T::scale)
+        .def_static("hstack", &S_T::hstack)
+        .def_static("columns", &S_T::columns, py::arg("S"), py::arg("start"), py::arg("count"))
+        .def_static("equals", &S_T::equals)
+        .def_static("product", &S_T::product, py::call_guard<py::gil_scoped_release>(),
+                    "Returns S * D, for a sparse S and a dense D.")
+        .def_static("dense_product", &S_T::dense_product, py::call_guard<py::gil_scoped_release>(),
+                    "Returns D * S, for a dense D and a sparse S.")
+        .def_static("add_to_dense", &S_T::add_to_dense, py::arg("D"), py::arg("S"), py::arg("k") = T(1),
+                    py::call_guard<py::gil_scoped_release>(), "Returns D + k * S as a dense matrix.");
+}
+
+void bind_quantized_matrix(py::module& m) {
+    py::class_<QuantizedMatrix>(m, "QuantizedMatrix")
+        .def(py::init<int, int>())
+        .def(py::init<const QuantizedMatrix&>())
+        .def_property_readonly("rows", &QuantizedMatrix::rows)
+        .def_property_readonly("cols", &QuantizedMatrix::cols)
+        .def_property_readonly("nbytes", &QuantizedMatrix::nbytes)
+        .def_property_readonly("is_view", [](const QuantizedMatrix& Q) { return Q.values.is_view(); })
+        .def_static("quantize", &QuantizedMatrix::quantize<double>, py::arg("W"), py::call_guard<py::gil_scoped_release>())
+        .def_static("quantize", &QuantizedMatrix::quantize<float>, py::arg("W"), py::call_guard<py::gil_scoped_release>(),
+                    "Returns the int8 quantization of W, with one scale per row.")
+        .def_static("dequantize", &QuantizedMatrix::dequantize<double>, py::arg("Q"), py::call_guard<py::gil_scoped_release>(),
+                    "Returns the float64 matrix approximated by Q.")
+        .def_static("dequantize32", &QuantizedMatrix::dequantize<float>, py::arg("Q"), py::call_guard<py::gil_scoped_release>(),
+                    "Returns the float32 matrix approximated by Q.")
+        .def("values_bytes", [](const QuantizedMatrix& Q) {
+            return py::bytes(reinterpret_cast<const char*>(Q.values.data()), Q.values.size());
+        }, "Returns a copy of the int8 values, row-major.")
+        .def("scales_bytes", [](const QuantizedMatrix& Q) {
+            return py::bytes(reinterpret_cast<const char*>(Q.scales.data()), Q.scales.size() * sizeof(float));
+        }, "Returns a copy of the float32 scales of the rows, in native byte order.")
+        .def_static("view", [](py::buffer values, py::buffer scales, int n, int p) {
+            py::buffer_info v = values.request(true), s = scales.request(true);
+            if (v.format != py::format_descriptor<int8_t>::format() || s.format != py::format_descriptor<float>::format()) {
+                throw std::invalid_argument("The buffers must hold int8 values and float32 scales.");
+            }
+            if (n < 0 || p < 0 || v.size != (py::ssize_t)n * p || s.size != (py::ssize_t)n) {
+                throw std::invalid_argument("The buffer sizes do not match the matrix format.");
+            }
+            if ((v.ndim > 1 && v.strides[v.ndim - 1] != 1) || (v.ndim == 1 && v.strides[0] != 1) ||
+                (s.ndim == 1 && s.strides[0] != (py::ssize_t)sizeof(float))) {
+                throw std::invalid_argument("The buffers must be C-contiguous.");
+            }
+            QuantizedMatrix Q(0, 0);
+            Q.format = {n, p};
+            Q.values = Buffer<int8_t>::view(static_cast<int8_t*>(v.ptr), (size_t)v.size, values);
+            Q.scales = Buffer<float>::view(static_cast<float*>(s.ptr), (size_t)s.size, scales);
+            return Q;
+        }, py::arg("values"), py::arg("scales"), py::arg("n"), py::arg("p"),
+        "Returns a quantized matrix of format (n, p) over writable, C-contiguous buffers of int8 values and float32 scales, "
+        "without copying them; the matrix keeps the buffers alive.");
+}
+
+// Registers the kernels on Matrix<T>; the module functions are overloaded on the precision of their operands.
+template <typename T>
+void bind_kernels(py::module& m) {
+    using M_T = Matrix<T>;
+    m.def("activate", &activate<T>, py::arg("Z"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Returns the activation function applied to every entry of Z.");
+    m.def("activate_inplace", &activate_inplace<T>, py::arg("M"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Applies an activation function to every entry of M in place.");
+    m.def("activation_prime", &activation_prime<T>, py::arg("Z"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Returns the derivative of an activation function at every entry of Z.");
+    m.def("activation_prime_inplace", &activation_prime_inplace<T>, py::arg("M"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Replaces every entry of M by the derivative of an activation function at that entry.");
+    m.def("activation_prime_from_output", &activation_prime_from_output<T>, py::arg("A"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Returns the derivative of an activation function from its output A = f(Z).");
+    m.def("activation_prime_from_output_inplace", &activation_prime_from_output_inplace<T>, py::arg("M"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Replaces every output entry a = f(z) of M by f'(z).");
+    m.def("softmax", &softmax<T>, py::arg("Z"),
+          py::call_guard<py::gil_scoped_release>(), "Returns the softmax of every column of Z.");
+    m.def("softmax_inplace", &softmax_inplace<T>, py::arg("M"),
+          py::call_guard<py::gil_scoped_release>(), "Replaces every column of M by its softmax.");
+
+    m.def("fused_elementwise", &fused_elementwise<T>, py::arg("operands"), py::arg("program"), py::arg("n"), py::arg("p"),
+          py::call_guard<py::gil_scoped_release>(),
+          "Evaluates a program of element-wise operations (see FusedOp) over n x p operands in a single pass.");
+
+    m.def("dense_forward", [](const M_T& W, const M_T& X, const M_T& B, Activation kind, bool keep_pre_activation) -> py::tuple {
+              M_T A(0, 0);
+              if (!keep_pre_activation) {
+                  {
+                      py::gil_scoped_release release;
+                      dense_forward_into<T>(nullptr, A, W, X, B, kind);
+                  }
+                  return py::make_tuple(std::move(A), py::none());
+              }
+              M_T Z(0, 0);
+              {
+                  py::gil_scoped_release release;
+                  dense_forward_into(&Z, A, W, X, B, kind);
+              }
+              return py::make_tuple(std::move(A), std::move(Z));
+          }, py::arg("W"), py::arg("X"), py::arg("B"), py::arg("kind"), py::arg("keep_pre_activation") = true,
+          "Returns (f(W * X + B), W * X + B) in a single fused product; the second entry is None unless keep_pre_activation.");
+    m.def("dense_forward_into", [](M_T& A, const M_T& W, const M_T& X, const M_T& B, Activation kind) {
+              dense_forward_into<T>(nullptr, A, W, X, B, kind);
+          }, py::arg("A"), py::arg("W"), py::arg("X"), py::arg("B"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Writes f(W * X + B) into A, reusing its buffer.");
+    m.def("sparse_dense_forward", [](const M_T& W, const SparseMatrix<T>& X, const M_T& B, Activation kind, bool keep_pre_activation) -> py::tuple {
+              M_T A(0, 0);
+              if (!keep_pre_activation) {
+                  {
+                      py::gil_scoped_release release;
+                      sparse_dense_forward_into<T>(nullptr, A, W, X, B, kind);
+                  }
+                  return py::make_tuple(std::move(A), py::none());
+              }
+              M_T Z(0, 0);
+              {
+                  py::gil_scoped_release release;
+                  sparse_dense_forward_into(&Z, A, W, X, B, kind);
+              }
+              return py::make_tuple(std::move(A), std::move(Z));
+          }, py::arg("W"), py::arg("X"), py::arg("B"), py::arg("kind"), py::arg("keep_pre_activation") = true,
+          "Sparse counterpart of dense_forward, for a sparse input batch X.");
+    m.def("sparse_dense_forward_into", [](M_T& A, const M_T& W, const SparseMatrix<T>& X, const M_T& B, Activation kind) {
+              sparse_dense_forward_into<T>(nullptr, A, W, X, B, kind);
+          }, py::arg("A"), py::arg("W"), py::arg("X"), py::arg("B"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Writes f(W * X + B) into A, reusing its buffer, for a sparse input batch X.");
+    m.def("sparse_dense_backward_into", &sparse_dense_backward_into<T>, py::arg("grad_W"), py::arg("grad_b"), py::arg("E"), py::arg("X"),
+          py::call_guard<py::gil_scoped_release>(), "Writes the outputs of sparse_dense_backward into grad_W and grad_b, reusing their buffers.");
+    m.def("sparse_dense_backward", [](const M_T& E, const SparseMatrix<T>& X) -> py::tuple {
+              M_T grad_W(0, 0), grad_b(0, 0);
+              {
+                  py::gil_scoped_release release;
+                  sparse_dense_backward_into(grad_W, grad_b, E, X);
+              }
+              return py::make_tuple(std::move(grad_W), std::move(grad_b));
+          }, py::arg("E"), py::arg("X"),
+          "Returns (E * X^T, sum of the columns of E) for a layer fed with a sparse input batch X, in time proportional to its non-zero entries.");
+    m.def("output_error", [](const M_T& A, const M_T& Y, Activation kind) {
+              M_T E(0, 0);
+              output_error_into(E, A, Y, kind);
+              return E;
+          }, py::arg("A"), py::arg("Y"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Returns (A - Y) * f'(Z) in one pass, f'(Z) being read from the output A = f(Z).");
+    m.def("output_error_into", &output_error_into<T>, py::arg("E"), py::arg("A"), py::arg("Y"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Writes (A - Y) * f'(Z) into E, reusing its buffer.");
+    m.def("dense_backward_into", [](M_T& grad_W, M_T& grad_b, M_T* E_prev, const M_T& W, const M_T& E, const M_T& A_prev, Activation kind_prev) {
+              if (E_prev == &E || E_prev == &A_prev) {
+                  throw std::invalid_argument("The error of the previous layer cannot be written over an input of the kernel.");
+              }
+              dense_backward_into(grad_W, grad_b, E_prev, W, E, A_prev, kind_prev);
+          }, py::arg("grad_W"), py::arg("grad_b"), py::arg("E_prev").none(true), py::arg("W"), py::arg("E"), py::arg("A_prev"),
+          py::arg("kind_prev"), py::call_guard<py::gil_scoped_release>(),
+          "Writes the outputs of dense_backward into grad_W, grad_b and E_prev (skipped if None), reusing their buffers.");
+    m.def("squared_error_sum", &squared_error_sum<T>, py::arg("A"), py::arg("Y"),
+          py::call_guard<py::gil_scoped_release>(), "Returns the sum of the squared entries of A - Y, without building it.");
+    m.def("dense_backward", [](const M_T& W, const M_T& E, const M_T& A_prev, Activation kind_prev, bool need_input_error) -> py::tuple {
+              M_T grad_W(0, 0), grad_b(0, 0);
+              if (!need_input_error) {
+                  {
+                      py::gil_scoped_release release;
+                      dense_backward_into<T>(grad_W, grad_b, nullptr, W, E, A_prev, kind_prev);
+                  }
+                  return py::make_tuple(std::move(grad_W), std::move(grad_b), py::none());
+              }
+              M_T E_prev(0, 0);
+              {
+                  py::gil_scoped_release release;
+                  dense_backward_into(grad_W, grad_b, &E_prev, W, E, A_prev, kind_prev);
+              }
+              return py::make_tuple(std::move(grad_W), std::move(grad_b), std::move(E_prev));
+          }, py::arg("W"), py::arg("E"), py::arg("A_prev"), py::arg("kind_prev"), py::arg("need_input_error") = true,
+          "Returns (E * A_prev^T, sum of the columns of E, (W^T * E) * f'(Z_prev)) without temporaries; the last entry is None unless need_input_error.");
+
+    m.def("quantized_product", [](const QuantizedMatrix& Q, const M_T& X) {
+              M_T C(0, 0);
+              quantized_forward_into<T>(C, Q, X, nullptr, Activation::linear);
+              return C;
+          }, py::arg("Q"), py::arg("X"), py::call_guard<py::gil_scoped_release>(),
+          "Returns Q * X for an int8 quantized Q and a float X, with the dtype of X.");
+    m.def("quantized_forward_into", [](M_T& A, const QuantizedMatrix& Q, const M_T& X, const M_T& B, Activation kind) {
+              quantized_forward_into<T>(A, Q, X, &B, kind);
+          }, py::arg("A"), py::arg("Q"), py::arg("X"), py::arg("B"), py::arg("kind"),
+          py::call_guard<py::gil_scoped_release>(), "Writes f(Q * X + B) into A, reusing its buffer, for int8 quantized weights Q.");
+
+    m.def("sgd_step", &sgd_step<T>, py::arg("W"), py::arg("G"), py::arg("lr"), py::arg("scale") = 1.0,
+          py::call_guard<py::gil_scoped_release>(), "In-place update W -= lr * scale * G.");
+    m.def("momentum_step", &momentum_step<T>,
+          py::arg("W"), py::arg("G"), py::arg("V"), py::arg("lr"), py::arg("momentum"), py::arg("scale") = 1.0,
+          py::call_guard<py::gil_scoped_release>(), "In-place update V = momentum * V + scale * G, W -= lr * V.");
+    m.def("adam_step", &adam_step<T>,
+          py::arg("W"), py::arg("G"), py::arg("M"), py::arg("V"), py::arg("lr_t"),
+          py::arg("beta1"), py::arg("beta2"), py::arg("eps"), py::arg("scale") = 1.0,
+          py::call_guard<py::gil_scoped_release>(), "In-place Adam update of W and of its moment estimates M and V.");
+}
+
 // PyBind11 Module
 PYBIND11_MODULE(matrix_ops, m) {
-    py::class_<Matrix>(m, "Matrix")
-        .def(py::init<std::vector<std::vector<double>>>())
-        .def("get_entry", &Matrix::get_entry)
-        .def("set_entry", &Matrix::set_entry)
-        .def("get_row", &Matrix::get_row_py)
-        .def("get_column", &Matrix::get_column_py)
-        .def("get_format", &Matrix::get_format)
-        .def("get_matrix", &Matrix::get_matrix)
-        .def_static("zero", &Matrix::zero)
-        .def_static("randomize", &Matrix::randomize)
-        .def_static("product", &Matrix::product)
-        .def_static("cwise_prod", &Matrix::cwise_product)
-        .def_static("sum", &Matrix::sum)
-        .def_static("scale", &Matrix::scale);
-}
\ No newline at end of file
+    m.def("set_num_threads", &set_num_threads, "Sets the number of threads of the product kernel (0 for one per hardware thread).");
+    m.def("get_num_threads", &get_num_threads, "Returns the number of threads used by the product kernel.");
+    m.def("allocation_count", &allocation_count, "Returns the number of matrix buffers allocated since the module was loaded.");
+
+    py::enum_<Activation>(m, "Activation")
+        .value("sigmoid", Activation::sigmoid)
+        .value("ReLU", Activation::ReLU)
+        .value("linear", Activation::linear)
+        .value("tanh", Activation::tanh)
+        .value("sigmoid_table", Activation::sigmoid_table)
+        .value("tanh_table", Activation::tanh_table)
+        .value("sigmoid_rational", Activation::sigmoid_rational)
+        .value("tanh_rational", Activation::tanh_rational);
+
+    py::enum_<FusedOp>(m, "FusedOp")
+        .value("load", FusedOp::load)
+        .value("load_column", FusedOp::load_column)
+        .value("add", FusedOp::add)
+        .value("sub", FusedOp::sub)
+        .value("mul", FusedOp::mul)
+        .value("scale", FusedOp::scale)
+        .value("activate", FusedOp::activate)
+        .value("activation_prime", FusedOp::activation_prime)
+        .value("activation_prime_from_output", FusedOp::activation_prime_from_output);
+
+    // The classes are registered before the kernels so that their signatures name them.
+    bind_matrix<double, float>(m, "Matrix");
+    bind_matrix<float, double>(m, "Matrix32");
+    bind_sparse_matrix<double, float>(m, "SparseMatrix");
+    bind_sparse_matrix<float, double>(m, "SparseMatrix32");
+    bind_quantized_matrix(m);
+    bind_kernels<double>(m);
+    bind_kernels<float>(m);
+}
@@ -0,0 +1,72 @@
+"""Module containing the QuantizedMatrix class."""
+from typing import Self, Literal
+import matrix_ops
+from .matrix import Matrix
+
+class QuantizedMatrix:
+    def __init__(self, M: Matrix) -> None:
+        """Int8 approximation of a Matrix, for the weights of models used for inference only.
+
+        Example: the quantization of a matrix W is "QuantizedMatrix(W)".
+
+        Each row is stored as 8-bit integers and one float32 scale, the largest entry of the row in absolute value being
+        mapped to 127 (symmetric quantization): an entry is approximated within half a scale, i.e. within 0.4% of the
+        largest entry of its row. The matrix takes one byte per entry (plus four per row), 8 times less than float64
+        and 4 times less than float32.
+
+        "Q * X" multiplies a quantized matrix by a Matrix of either dtype, and returns a Matrix of that dtype: the
+        integers are converted on the fly, so the weights are read from memory at one byte per entry.
+
+        The entries are stored in a native matrix_ops.QuantizedMatrix instance."""
+        if not isinstance(M, Matrix):
+            raise TypeError("Can only quantize a Matrix instance.")
+        self.format = M.format #The format of the matrix in the form of a (number of rows, numbers of columns) tuple.
+        self._native = matrix_ops.QuantizedMatrix.quantize(M._native)
+
+    @classmethod
+    def _from_native(cls, native: matrix_ops.QuantizedMatrix) -> Self: #Private method.
+        """Wraps an existing matrix_ops.QuantizedMatrix instance without copying it."""
+        matrix_instance = cls.__new__(cls)
+        matrix_instance.format = (native.rows, native.cols)
+        matrix_instance._native = native
+        return matrix_instance
+
+    @classmethod
+    def from_buffers(cls,
+                     values,
+                     scales,
+                     n: int,
+                     p: int) -> Self:
+        """Returns the quantized matrix of format (n, p) over writable buffers of its int8 values (row-major) and of the
+        float32 scales of its rows (e.g. memoryviews over a memory-mapped file), without copying them."""
+        return cls._from_native(matrix_ops.QuantizedMatrix.view(values, scales, n, p))
+
+    def to_bytes(self) -> tuple[bytes, bytes]:
+        """Returns the int8 values (row-major) and the float32 scales of the rows (in native byte order) as bytes."""
+        return self._native.values_bytes(), self._native.scales_bytes()
+
+    def dequantize(self, dtype: Literal['float64', 'float32'] = 'float64') -> Matrix:
+        """Returns the Matrix approximated by the quantized matrix, with entries of the given dtype."""
+        if dtype not in Matrix._NATIVE_TYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {list(Matrix._NATIVE_TYPES)}.")
+        native_type = matrix_ops.QuantizedMatrix
+        return Matrix._from_native(native_type.dequantize(self._native) if dtype == 'float64' else native_type.dequantize32(self._native))
+
+    @property
+    def nbytes(self) -> int:
+        """The memory taken by the values and the scales, in bytes."""
+        return self._native.nbytes
+
+    def __mul__(self, B: Matrix) -> Matrix:
+        """Overloads the * operator: if Q is a QuantizedMatrix and M a Matrix instance, "Q * M" returns their product as
+        a Matrix instance of the dtype of M.
+
+        Raises an error if the number of columns of the first does not match the number of rows of the second."""
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        if self.format[1] != B.format[0]:
+            raise TypeError(f"Invalid matrix formats ({self.format[1]}≠{B.format[0]}).")
+        return Matrix._from_native(matrix_ops.quantized_product(self._native, B._native))
+
+    def __str__(self) -> str:
+        return f'quantized_matrix(format={self.format}, nbytes={self.nbytes})'
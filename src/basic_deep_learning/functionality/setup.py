@@ -1,11 +1,22 @@
+import sys
 from setuptools import setup, Extension
 import pybind11
 
+if sys.platform == 'win32':
+    compile_args = ['/std:c++14', '/O2', '/fp:precise']
+    link_args = []
+else:
+    # Floating-point exceptions are never read, so comparisons can be turned into branch-free selects in vectorized
+    # loops (ReLU, the clamp of rational_tanh); no result changes.
+    compile_args = ['-std=c++14', '-O3', '-funroll-loops', '-fno-trapping-math', '-fvisibility=hidden', '-pthread']
+    link_args = ['-pthread']
+
 matrix_ops = Extension(
     'matrix_ops',
     sources=['matrix_ops.cpp'],
     include_dirs=[pybind11.get_include()],
-    extra_compile_args=['-std=c++11'],
+    extra_compile_args=compile_args,
+    extra_link_args=link_args,
     language='c++'
 )
 
@@ -15,4 +26,4 @@ setup(
     version='0.1',
     description='Python package for matrix operations',
     ext_modules=[matrix_ops]
-)
\ No newline at end of file
+)
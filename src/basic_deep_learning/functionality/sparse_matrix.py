@@ -0,0 +1,247 @@
+"""Module containing the SparseMatrix class."""
+from typing import Self, Literal
+from array import array
+import matrix_ops
+from .matrix import Matrix
+
+class SparseMatrix:
+    _NATIVE_TYPES = {'float64': matrix_ops.SparseMatrix, 'float32': matrix_ops.SparseMatrix32} #The native class of each dtype.
+
+    def __init__(self,
+                 n: int,
+                 p: int,
+                 entries: dict[tuple[int, int], int|float],
+                 dtype: Literal['float64', 'float32'] = 'float64') -> None:
+        """Implementation of sparse matrices, which only store their non-zero entries: memory and the products with dense
+        matrices grow with the number of non-zero entries rather than with the format.
+
+        Example: the one-hot column vector of format (5, 1) whose 3rd entry is 1 is implemented as
+        "SparseMatrix(5, 1, {(3, 1): 1})".
+
+        entries maps (i, j) indices, starting at 1 as for Matrix, to values; zeros are dropped.
+
+        The entries are stored in a native matrix_ops.SparseMatrix instance, in compressed sparse column (CSC) format,
+        so that stacking sparse samples into a batch (hstack) and slicing a batch (get_columns) are cheap. from_csr,
+        from_csc, to_csr and to_csc convert from and to the standard compressed formats (the CSR format of a matrix being
+        the CSC format of its transpose).
+
+        A SparseMatrix can be multiplied by a Matrix on either side, added to or subtracted from one (which gives a
+        Matrix), and scaled by a scalar. MultiLayerPerceptron accepts sparse input batches, whose first layer is then
+        computed and differentiated by sparse kernels."""
+        if n < 1 or p < 1:
+            raise TypeError("Cannot pass an empty matrix.")
+        columns = [[] for _ in range(p)]
+        for (i, j), value in entries.items():
+            if not 1 <= i <= n or not 1 <= j <= p:
+                raise IndexError(f"Index ({i}, {j}) is out of the format ({n}, {p}).")
+            if value != 0:
+                columns[j - 1].append((i - 1, value))
+        colptr, rowind, values = [0], [], []
+        for column in columns:
+            column.sort()
+            rowind.extend(i for i, _ in column)
+            values.extend(value for _, value in column)
+            colptr.append(len(rowind))
+        self.format = (n, p) #The format of the matrix in the form of a (number of rows, numbers of columns) tuple.
+        self._native = SparseMatrix.__native_type(dtype)(n, p, colptr, rowind, values)
+
+    @staticmethod
+    def __native_type(dtype: str) -> type: #Private method.
+        """Returns the native class storing entries of the given dtype."""
+        if dtype not in SparseMatrix._NATIVE_TYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {list(SparseMatrix._NATIVE_TYPES)}.")
+        return SparseMatrix._NATIVE_TYPES[dtype]
+
+    @classmethod
+    def _from_native(cls, native: matrix_ops.SparseMatrix|matrix_ops.SparseMatrix32) -> Self: #Private method.
+        """Wraps an existing matrix_ops.SparseMatrix (or SparseMatrix32) instance without copying it."""
+        matrix_instance = cls.__new__(cls)
+        matrix_instance.format = (native.rows, native.cols)
+        matrix_instance._native = native
+        return matrix_instance
+
+    @classmethod
+    def from_csc(cls,
+                 n: int,
+                 p: int,
+                 indptr,
+                 indices,
+                 values,
+                 dtype: Literal['float64', 'float32'] = 'float64') -> Self:
+        """Builds a matrix of format (n, p) from its compressed sparse column format: the row indices (starting at 0) and
+        the values of the non-zero entries of the j-th column are indices[indptr[j]:indptr[j+1]] and
+        values[indptr[j]:indptr[j+1]], by increasing row index. Any sequences are accepted (lists, array.array, ...)."""
+        if n < 1 or p < 1:
+            raise TypeError("Cannot pass an empty matrix.")
+        return cls._from_native(cls.__native_type(dtype)(n, p, list(indptr), list(indices), list(values)))
+
+    @classmethod
+    def from_csr(cls,
+                 n: int,
+                 p: int,
+                 indptr,
+                 indices,
+                 values,
+                 dtype: Literal['float64', 'float32'] = 'float64') -> Self:
+        """Builds a matrix of format (n, p) from its compressed sparse row format (see from_csc, with rows and columns swapped)."""
+        return cls.from_csc(p, n, indptr, indices, values, dtype).T()
+
+    def to_csc(self) -> tuple[array, array, array]:
+        """Returns the compressed sparse column format (indptr, indices, values) of the matrix (see from_csc)."""
+        return (array('q', self._native.colptr), array('i', self._native.rowind),
+                array('f' if self.dtype == 'float32' else 'd', self._native.values))
+
+    def to_csr(self) -> tuple[array, array, array]:
+        """Returns the compressed sparse row format (indptr, indices, values) of the matrix (see from_csr)."""
+        return self.T().to_csc()
+
+    @classmethod
+    def from_dense(cls, M: Matrix) -> Self:
+        """Returns the sparse matrix holding the non-zero entries of the Matrix instance M, with its dtype."""
+        return cls._from_native(cls.__native_type(M.dtype).from_dense(M._native))
+
+    def to_dense(self) -> Matrix:
+        """Returns the Matrix instance holding the same entries."""
+        return Matrix._from_native(type(self._native).to_dense(self._native))
+
+    @property
+    def matrix(self) -> list[list[float]]:
+        """The list of lists representing the matrix, zeros included."""
+        return self.to_dense().matrix
+
+    @property
+    def dtype(self) -> str:
+        """The type of the entries: 'float64' or 'float32'."""
+        return self._native.dtype
+
+    @property
+    def nnz(self) -> int:
+        """The number of non-zero entries."""
+        return self._native.nnz
+
+    @property
+    def density(self) -> float:
+        """The fraction of the entries that are non-zero."""
+        return self.nnz / (self.format[0] * self.format[1])
+
+    def astype(self, dtype: Literal['float64', 'float32']) -> Self:
+        """Returns a copy of the matrix whose entries are converted to the given dtype."""
+        return SparseMatrix._from_native(SparseMatrix.__native_type(dtype)(self._native))
+
+    def __check_dtype(self, B: Self|Matrix) -> None: #Private method.
+        """Raises an error if the entries of B are not of the same type as those of the matrix."""
+        if self.dtype != B.dtype:
+            raise TypeError(f"Cannot combine matrices of different dtypes ({self.dtype}≠{B.dtype}).")
+
+    def __validate_indices(self,
+                           i: int|None = None,
+                           j: int|None = None) -> None: #Private method.
+        """If at least one index is passesd, the method will raise an error if that index is within the appropriate range."""
+        if i is not None and not 1 <= i <= self.format[0]:
+            raise IndexError(f"Index {i} is out of the expected range [1,{self.format[0]}].")
+        if j is not None and not 1 <= j <= self.format[1]:
+            raise IndexError(f"Index {j} is out of the expected range [1,{self.format[1]}].")
+
+    def get_entry(self,
+                  i: int,
+                  j: int) -> int|float:
+        """Returns the entry at the i-th row and the j-th column of the matrix (starting at 1).
+
+        Raises an error if either one of the indices is out of range."""
+        self.__validate_indices(i, j)
+        return self._native.get_entry(i, j)
+
+    def get_columns(self,
+                    j: int,
+                    k: int) -> Self:
+        """Returns the matrix made of the columns j to k (both included, starting at 1).
+
+        Raises an error if either one of the indices is out of range or if j > k."""
+        self.__validate_indices(j=j)
+        self.__validate_indices(j=k)
+        if j > k:
+            raise IndexError(f"Invalid range of columns [{j},{k}].")
+        return SparseMatrix._from_native(type(self._native).columns(self._native, j-1, k-j+1))
+
+    def T(self) -> Self:
+        """Returns the transposed matrix."""
+        return SparseMatrix._from_native(type(self._native).transpose(self._native))
+
+    @classmethod
+    def hstack(cls,
+               matrices: list[Self]) -> Self:
+        """Takes a list of sparse matrices with the same number of rows and returns the matrix obtained by placing them
+        side by side, typically to stack sparse samples (column vectors) into a batch.
+
+        Raises an error if the list is empty or if the numbers of rows do not match."""
+        if not matrices:
+            raise TypeError("Cannot stack an empty list of matrices.")
+        if any(M.format[0] != matrices[0].format[0] for M in matrices):
+            raise TypeError("Cannot stack matrices with different numbers of rows.")
+        for M in matrices:
+            matrices[0].__check_dtype(M)
+        return cls._from_native(type(matrices[0]._native).hstack([M._native for M in matrices]))
+
+    def __mul__(self, B: Matrix) -> Matrix:
+        """Overloads the * operator: if S is a SparseMatrix and M a Matrix instance, "S * M" returns their product as
+        a Matrix instance.
+
+        Raises an error if the number of columns of the first does not match the number of rows of the second."""
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        if self.format[1] != B.format[0]:
+            raise TypeError(f"Invalid matrix formats ({self.format[1]}≠{B.format[0]}).")
+        self.__check_dtype(B)
+        return Matrix._from_native(type(self._native).product(self._native, B._native))
+
+    def __rmul__(self, B: Matrix|int|float) -> Matrix|Self:
+        """Overloads the * operator on the left: "M * S" returns the product of a Matrix instance and the sparse matrix
+        as a Matrix instance, in time proportional to the rows of M times the non-zero entries of S, and "c * S" returns
+        the sparse matrix scaled by a scalar."""
+        if isinstance(B, (int, float)):
+            return SparseMatrix._from_native(type(self._native).scale(self._native, B))
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        if B.format[1] != self.format[0]:
+            raise TypeError(f"Invalid matrix formats ({B.format[1]}≠{self.format[0]}).")
+        self.__check_dtype(B)
+        return Matrix._from_native(type(self._native).dense_product(B._native, self._native))
+
+    def __truediv__(self, scalar: int|float) -> Self:
+        if not isinstance(scalar, (int, float)):
+            raise TypeError("Can only divide by scalar")
+        return (1 / scalar) * self
+
+    def __add_to(self,
+                 B: Matrix,
+                 k: float) -> Matrix: #Private method.
+        """Returns the Matrix instance B + k * self."""
+        if not isinstance(B, Matrix):
+            return NotImplemented
+        if self.format != B.format:
+            raise TypeError("Cannot add two matrices of different formats.")
+        self.__check_dtype(B)
+        return Matrix._from_native(type(self._native).add_to_dense(B._native, self._native, k))
+
+    def __add__(self, B: Matrix) -> Matrix:
+        """Overloads the + operator: the sum of a sparse matrix and a Matrix instance is a Matrix instance."""
+        return self.__add_to(B, 1)
+
+    def __radd__(self, B: Matrix) -> Matrix:
+        return self.__add_to(B, 1)
+
+    def __sub__(self, B: Matrix) -> Matrix:
+        """Overloads the - operator: the difference of a sparse matrix and a Matrix instance is a Matrix instance."""
+        return -1 * (B - self) if isinstance(B, Matrix) else NotImplemented
+
+    def __rsub__(self, B: Matrix) -> Matrix:
+        return self.__add_to(B, -1)
+
+    def __eq__(self, B: Self) -> bool:
+        """Overloads the == operator; matrices of different dtypes are never equal."""
+        if not isinstance(B, SparseMatrix) or self.dtype != B.dtype:
+            return False
+        return type(self._native).equals(self._native, B._native)
+
+    def __str__(self) -> str:
+        return f'sparse_matrix(format={self.format}, nnz={self.nnz}, dtype={self.dtype})'
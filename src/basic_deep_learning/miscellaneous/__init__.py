@@ -1,6 +1,6 @@
 """Helper functions and classes."""
 
-from .decorators import extend_to_matrices
+from .decorators import extend_to_matrices, vectorize_with
 from .linear_algebra import LinearAlgebraUtils
 
-__all__ = ['extend_to_matrices', 'LinearAlgebraUtils']
\ No newline at end of file
+__all__ = ['extend_to_matrices', 'vectorize_with', 'LinearAlgebraUtils']
\ No newline at end of file
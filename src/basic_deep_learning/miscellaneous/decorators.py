@@ -1,12 +1,28 @@
-"""Module containing the extend_to_matrices decorator."""
+"""Module containing the extend_to_matrices and vectorize_with decorators."""
 def extend_to_matrices(f):
     """Decorator for real-valued functions to extend them for Matrix instances component-wise."""
     def wrapper(M):
         from ..functionality.matrix import Matrix
         if isinstance(M, Matrix):
-            return Matrix([wrapper(R) for R in M.matrix])
+            return Matrix([wrapper(R) for R in M.matrix], M.dtype)
         elif isinstance(M, list):
             return [wrapper(x) for x in M]
         else:
             return f(M)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def vectorize_with(kernel):
+    """Decorator for real-valued functions to extend them for Matrix instances through a native whole-buffer kernel.
+    
+    The kernel takes and returns a matrix_ops.Matrix; numbers and lists are still handled component-wise as with extend_to_matrices."""
+    def decorator(f):
+        extended = extend_to_matrices(f)
+        def wrapper(M):
+            from ..functionality.matrix import Matrix
+            if isinstance(M, Matrix):
+                return Matrix._from_native(kernel(M._native))
+            return extended(M)
+        wrapper.__name__ = f.__name__
+        wrapper.__doc__ = f.__doc__
+        return wrapper
+    return decorator
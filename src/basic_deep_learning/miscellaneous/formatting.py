@@ -0,0 +1,23 @@
+"""Module containing the time_format function."""
+def time_format(seconds: float):
+    floor_secs = int(seconds)
+    hashing_table = {
+        "h": 0,
+        "m": 0,
+        "s": 0,
+        "ms": 0
+    }
+    hours, s = divmod(floor_secs, 3600)
+    m, sec = divmod(s, 60)
+    ms = int((seconds-floor_secs)*1000)
+    hashing_table["h"], hashing_table["m"], hashing_table["s"], hashing_table["ms"] = hours, m, sec, ms
+    while len(hashing_table) > 1 and list(hashing_table.values())[0] == 0:
+        del hashing_table[list(hashing_table.keys())[0]]
+    string = ''
+    keys = list(hashing_table.keys())
+    for i, key in enumerate(hashing_table.keys()):
+        if i < len(hashing_table) - 1:
+            string += f'{hashing_table[key]:02d} {key} : '
+        else:
+            string += f'{hashing_table[key]:03d} {key}'
+    return string
@@ -1,5 +1,10 @@
-"""Main class for deep learning - the multilayer perceptron."""
+"""Main class for deep learning - the multilayer perceptron - and its layers."""
 
 from .mlp import MultiLayerPerceptron
+from .dense_layer import DenseLayer
+from .data_parallel import DataParallel
+from .checkpoint import Checkpoint
+from .workspace import Workspace
+from .quantized_mlp import QuantizedMultiLayerPerceptron
 
-__all__ = ['MultiLayerPerceptron']
\ No newline at end of file
+__all__ = ['MultiLayerPerceptron', 'DenseLayer', 'DataParallel', 'Checkpoint', 'Workspace', 'QuantizedMultiLayerPerceptron']
\ No newline at end of file
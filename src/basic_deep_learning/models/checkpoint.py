@@ -0,0 +1,155 @@
+"""Module containing the Checkpoint class."""
+from typing import Literal
+from array import array
+import json
+import mmap
+import struct
+import sys
+from ..functionality.matrix import Matrix
+from ..functionality.quantized_matrix import QuantizedMatrix
+
+class Checkpoint:
+    """Compact binary checkpoint format for models.
+
+    Layout of a file:
+
+    - 8 bytes: the magic string b'BDLCKPT\\0';
+    - 4 bytes: the version of the format (little-endian unsigned integer);
+    - 4 bytes: the length of the header (little-endian unsigned integer);
+    - the header: a UTF-8 JSON object holding the metadata of the model (structure, activation labels, ...), the type
+      of the entries ("float64" or "float32") and, for each parameter, its name, its format and the offset of its block;
+    - the blocks: the entries of each parameter, row-major and little-endian, each starting on a 64-byte boundary.
+
+    The blocks are contiguous raw floats, so a checkpoint can be memory-mapped and its matrices (float64 or float32,
+    like the entries of the file) used directly as views over the mapping: loading does not copy nor parse the weights, and only the pages that are actually read
+    are brought into memory. The mapping is copy-on-write, so training a loaded model never modifies the file.
+
+    Version 2 adds quantized parameters (see QuantizedMatrix): their header entry has the "int8" dtype and two blocks,
+    the int8 values at "offset" and the float32 scales of the rows at "scales_offset". They are memory-mapped too.
+    Checkpoints without quantized parameters are written as version 1."""
+    MAGIC = b'BDLCKPT\0'
+    VERSION = 2
+    VERSIONS = (1, 2) #The versions that can be read.
+    ALIGNMENT = 64
+    TYPECODES = {'float64': 'd', 'float32': 'f'}
+
+    @staticmethod
+    def is_checkpoint(filename: str) -> bool:
+        """Returns whether the file starts with the magic string of a binary checkpoint."""
+        with open(filename, 'rb') as f:
+            return f.read(len(Checkpoint.MAGIC)) == Checkpoint.MAGIC
+
+    @staticmethod
+    def __align(offset: int) -> int:
+        return -(-offset // Checkpoint.ALIGNMENT) * Checkpoint.ALIGNMENT
+
+    @staticmethod
+    def __block(M: Matrix, typecode: str) -> memoryview|array: #Private method.
+        """The entries of a matrix as little-endian bytes of the given type, without copying them whenever possible."""
+        entries = memoryview(M._native).cast('B').cast(Checkpoint.TYPECODES[M.dtype])
+        if entries.format == typecode and sys.byteorder == 'little':
+            return entries
+        block = array(typecode, entries)
+        if sys.byteorder != 'little':
+            block.byteswap()
+        return block
+
+    @staticmethod
+    def __quantized_blocks(Q: QuantizedMatrix) -> list[tuple[str, bytes|array]]: #Private method.
+        """The blocks of a quantized matrix, as (key of their offset in the header, little-endian bytes) pairs."""
+        values, scales = Q.to_bytes()
+        scales = array('f', scales)
+        if sys.byteorder != 'little':
+            scales.byteswap()
+        return [('offset', values), ('scales_offset', scales)]
+
+    @staticmethod
+    def save(filename: str,
+             metadata: dict,
+             parameters: dict[str, Matrix|QuantizedMatrix],
+             dtype: Literal['float64', 'float32'] = 'float64') -> None:
+        """Writes the metadata (any JSON-serializable dictionary) and the named parameters of a model to a checkpoint.
+
+        float32 halves the size of the file at the cost of rounding the entries (if the parameters are float64).
+        QuantizedMatrix parameters are written as they are, whatever dtype."""
+        if dtype not in Checkpoint.TYPECODES:
+            raise ValueError(f"Unsupported type of entries {dtype!r}; expected one of {list(Checkpoint.TYPECODES)}.")
+        typecode = Checkpoint.TYPECODES[dtype]
+        blocks = [
+            Checkpoint.__quantized_blocks(M) if isinstance(M, QuantizedMatrix) else [('offset', Checkpoint.__block(M, typecode))]
+            for M in parameters.values()
+        ]
+        quantized = any(isinstance(M, QuantizedMatrix) for M in parameters.values())
+        # The offsets depend on the length of the header, which depends on the offsets: lay out until it is stable.
+        start = 0
+        while True:
+            offset, tensors = start, []
+            for (name, M), parameter_blocks in zip(parameters.items(), blocks):
+                tensor = {'name': name, 'format': list(M.format)}
+                if isinstance(M, QuantizedMatrix):
+                    tensor['dtype'] = 'int8'
+                for key, block in parameter_blocks:
+                    offset = Checkpoint.__align(offset)
+                    tensor[key] = offset
+                    offset += memoryview(block).nbytes
+                tensors.append(tensor)
+            header = json.dumps({'metadata': metadata, 'dtype': dtype, 'tensors': tensors}).encode('utf-8')
+            needed = Checkpoint.__align(len(Checkpoint.MAGIC) + 8 + len(header))
+            if needed <= start:
+                break
+            start = needed
+        with open(filename, 'wb') as f:
+            f.write(Checkpoint.MAGIC)
+            f.write(struct.pack('<II', Checkpoint.VERSION if quantized else 1, len(header)))
+            f.write(header)
+            for tensor, parameter_blocks in zip(tensors, blocks):
+                for key, block in parameter_blocks:
+                    f.write(b'\0' * (tensor[key] - f.tell()))
+                    f.write(block)
+
+    @staticmethod
+    def __read(f,
+               content: mmap.mmap|None,
+               offset: int,
+               count: int,
+               typecode: str) -> memoryview|array: #Private method.
+        """The count little-endian entries of the given type at offset, as a view over the mapping of the file if there
+        is one, and read from the file otherwise."""
+        if content is not None:
+            return memoryview(content)[offset:offset + count * array(typecode).itemsize].cast(typecode)
+        f.seek(offset)
+        block = array(typecode)
+        block.fromfile(f, count)
+        if sys.byteorder != 'little':
+            block.byteswap()
+        return block
+
+    @staticmethod
+    def load(filename: str,
+             memory_map: bool = True) -> tuple[dict, dict[str, Matrix|QuantizedMatrix]]:
+        """Reads a checkpoint and returns its metadata and its named parameters.
+
+        The parameters have the dtype of the entries of the file, except quantized ones, which are QuantizedMatrix instances. With memory_map, they are views over a copy-on-write
+        mapping of the file; otherwise they are read into memory. Raises an error if the file is not a checkpoint."""
+        with open(filename, 'rb') as f:
+            if f.read(len(Checkpoint.MAGIC)) != Checkpoint.MAGIC:
+                raise ValueError(f"{filename} is not a model checkpoint.")
+            version, header_length = struct.unpack('<II', f.read(8))
+            if version not in Checkpoint.VERSIONS:
+                raise ValueError(f"Unsupported checkpoint version {version}.")
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            typecode = Checkpoint.TYPECODES[header['dtype']]
+            native_type = Matrix._NATIVE_TYPES[header['dtype']]
+            direct = memory_map and sys.byteorder == 'little'
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) if direct else None
+            parameters = {}
+            for tensor in header['tensors']:
+                n, p = tensor['format']
+                if tensor.get('dtype') == 'int8':
+                    values = Checkpoint.__read(f, content, tensor['offset'], n * p, 'b')
+                    scales = Checkpoint.__read(f, content, tensor['scales_offset'], n, 'f')
+                    parameters[tensor['name']] = QuantizedMatrix.from_buffers(values, scales, n, p)
+                else:
+                    block = Checkpoint.__read(f, content, tensor['offset'], n * p, typecode)
+                    parameters[tensor['name']] = Matrix._from_native(native_type.view(block, n, p))
+        return header['metadata'], parameters
@@ -0,0 +1,111 @@
+"""Module containing the DataParallel class."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import time
+from ..functionality.matrix import Matrix
+from .workspace import Workspace
+from ..telemetry import Profiler
+
+class DataParallel:
+    def __init__(self, workers: int = 0) -> None:
+        """Data-parallel computation of the gradients of a model over a mini-batch, on a pool of worker threads.
+
+        Each mini-batch is split into one contiguous shard of columns (samples) per worker. Every worker computes the
+        gradients of its shard with the fused native kernels, which release the GIL, so the workers run on separate
+        cores. The workers share the parameters of the model in memory: nothing is copied nor pickled. The gradients
+        of the shards are then summed (all-reduced), one parameter per task, so that the caller can apply a single
+        update.
+
+        Each shard has its own workspace (see Workspace), where its columns are copied and its gradients computed, so
+        that steady-state training allocates no matrix; the gradients returned are therefore only valid until the next
+        call. The workspaces keep the activations of the layers chosen by the checkpoint_interval of the model for the
+        whole mini-batch, so that the shards together stay within its memory budget.
+
+        workers=0 uses one worker per available core. The products of the workers share the persistent threads of
+        the product kernel (see Matrix.set_num_threads) rather than each starting its own, so the number of threads
+        of the product kernel is left as configured."""
+        if workers < 0:
+            raise ValueError("The number of workers must be non-negative.")
+        self.workers = workers or os.cpu_count() or 1
+        self.__pool = None
+        self.__workspaces: list[Workspace] = [] #One workspace per shard, reused from one mini-batch to the next.
+
+    def start(self) -> None:
+        """Starts the pool of worker threads."""
+        if self.__pool is None:
+            self.__pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def close(self) -> None:
+        """Stops the pool of worker threads."""
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def __shard_gradients(model, input_batch: Matrix, expected_batch: Matrix, start: int, stop: int,
+                          profiler: Profiler|None, workspace: Workspace) -> tuple[list[Matrix], float]:
+        inputs = (input_batch.get_columns(start, stop, out=workspace.inputs) if isinstance(input_batch, Matrix)
+                  else input_batch.get_columns(start, stop))
+        expected = expected_batch.get_columns(start, stop, out=workspace.expected)
+        grad_w, grad_b, loss = model.compute_gradients(inputs, expected, return_loss=True, profiler=profiler, workspace=workspace)
+        return grad_w + grad_b, loss
+
+    @staticmethod
+    def __reduce(gradients: list[Matrix]) -> Matrix:
+        """Sums the gradients of one parameter over the shards, in place into the first one."""
+        total = gradients[0]
+        for G in gradients[1:]:
+            type(total._native).add_inplace(total._native, G._native)
+        return total
+
+    def compute_gradients(self,
+                          model,
+                          input_batch: Matrix,
+                          expected_batch: Matrix,
+                          return_loss: bool = False,
+                          profiler: Profiler|None = None) -> tuple[list[Matrix], list[Matrix]]|tuple[list[Matrix], list[Matrix], float]:
+        """Returns the gradients (grad_w, grad_b) of model, summed over the samples (columns) of the input and expected batches.
+
+        If return_loss is True, the sum of the squared errors over the batch is returned as a third element.
+
+        If a profiler is passed, the forward and backward passes of the shards are added to it (summed over the
+        workers), and so is the reduction of the gradients, as part of the backward phase.
+
+        model must provide a compute_gradients method taking a workspace and a checkpoint_interval method, like
+        MultiLayerPerceptron."""
+        if self.__pool is None:
+            raise RuntimeError("The pool of workers is not running; call start() first.")
+        if input_batch.format[1] != expected_batch.format[1]:
+            raise ValueError("The input and expected batches must have the same number of samples.")
+        samples_count = input_batch.format[1]
+        shards_count = min(self.workers, samples_count)
+        size, remainder = divmod(samples_count, shards_count)
+        shards = []
+        start = 1
+        for k in range(shards_count):
+            stop = start + size + (k < remainder)
+            shards.append((start, stop - 1))
+            start = stop
+        interval = model.checkpoint_interval(samples_count, self.__workspaces[0].checkpoint_interval if self.__workspaces else None)
+        if len(self.__workspaces) < shards_count or not all(W.fits(model) and W.checkpoint_interval == interval
+                                                            for W in self.__workspaces[:shards_count]):
+            self.__workspaces = [Workspace(model.structure, model.dtype, interval) for _ in range(shards_count)]
+        shard_results = list(self.__pool.map(
+            lambda shard, workspace: self.__shard_gradients(model, input_batch, expected_batch, *shard, profiler, workspace),
+            shards, self.__workspaces[:shards_count]
+        ))
+        start_reduction = time.perf_counter()
+        reduced = list(self.__pool.map(self.__reduce, zip(*(gradients for gradients, _ in shard_results))))
+        if profiler is not None:
+            profiler.add('backward', time.perf_counter() - start_reduction)
+        layers_count = len(reduced) // 2
+        if return_loss:
+            return reduced[:layers_count], reduced[layers_count:], sum(loss for _, loss in shard_results)
+        return reduced[:layers_count], reduced[layers_count:]
@@ -0,0 +1,105 @@
+"""Module containing the DenseLayer class."""
+from typing import Literal
+import matrix_ops
+from ..functionality.matrix import Matrix
+from ..functionality.sparse_matrix import SparseMatrix
+
+class DenseLayer:
+    def __init__(self,
+                 weights: Matrix,
+                 biases: Matrix,
+                 activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                                    'sigmoid_rational', 'tanh_rational']) -> None:
+        """Fully connected layer computing A = f(W * X + B) for a batch X of input column vectors.
+
+        The layer does not copy its weights and biases: they are the Matrix instances passed to the constructor.
+        Its forward and backward passes are fused native kernels, where the bias, the activation function and its
+        derivative are applied inside the matrix products instead of in separate passes over intermediate matrices.
+
+        The input batch can be a SparseMatrix (e.g. one-hot or bag-of-words features): the products with the weights
+        then only visit its non-zero entries."""
+        if biases.format != (weights.format[0], 1):
+            raise ValueError(f"The biases must be a column vector of format ({weights.format[0]}, 1).")
+        if biases.dtype != weights.dtype:
+            raise TypeError(f"The weights and biases must have the same dtype ({weights.dtype}≠{biases.dtype}).")
+        self.weights = weights
+        self.biases = biases
+        self.activation_name = activation_function_label
+        self.activation_kind = matrix_ops.Activation.__members__[activation_function_label]
+
+    def forward(self,
+                input_batch: Matrix|SparseMatrix,
+                keep_pre_activation: bool = True,
+                out: Matrix|None = None) -> tuple[Matrix, Matrix|None]:
+        """Returns the tuple (activation, pre_activation) of the layer for a batch of inputs (one sample per column).
+
+        pre_activation is W * X + B, and is None if keep_pre_activation is False.
+
+        If out is given, the activation is written into it (see Matrix.add) and the pre-activation is not kept."""
+        if input_batch.format[0] != self.weights.format[1]:
+            raise ValueError(f"Input must have {self.weights.format[1]} rows (one column per sample).")
+        if out is not None:
+            forward_into = matrix_ops.sparse_dense_forward_into if isinstance(input_batch, SparseMatrix) else matrix_ops.dense_forward_into
+            forward_into(out._native, self.weights._native, input_batch._native, self.biases._native, self.activation_kind)
+            out.format = (out._native.rows, out._native.cols)
+            return out, None
+        forward = matrix_ops.sparse_dense_forward if isinstance(input_batch, SparseMatrix) else matrix_ops.dense_forward
+        A, Z = forward(self.weights._native, input_batch._native, self.biases._native, self.activation_kind, keep_pre_activation)
+        return Matrix._from_native(A), (Matrix._from_native(Z) if Z is not None else None)
+
+    def output_error(self,
+                     output: Matrix,
+                     expected_output: Matrix,
+                     out: Matrix|None = None) -> Matrix:
+        """Returns the error (output - expected_output) * f'(Z) of the layer used as an output layer, where f'(Z) is
+        computed from the output of the layer. If out is given, the error is written into it (see Matrix.add)."""
+        if output.format != expected_output.format:
+            raise ValueError("The output and the expected output must have the same format.")
+        if out is not None:
+            matrix_ops.output_error_into(out._native, output._native, expected_output._native, self.activation_kind)
+            out.format = (out._native.rows, out._native.cols)
+            return out
+        return Matrix._from_native(matrix_ops.output_error(output._native, expected_output._native, self.activation_kind))
+
+    def backward(self,
+                 error: Matrix,
+                 input_activation: Matrix|SparseMatrix,
+                 previous_layer: 'DenseLayer|None' = None,
+                 out: tuple[Matrix, Matrix, Matrix]|None = None) -> tuple[Matrix, Matrix, Matrix|None]:
+        """Takes the error of the layer and the input it was fed with, and returns the tuple (grad_w, grad_b, input_error).
+
+        grad_w and grad_b are summed over the columns of the batch. input_error is the error of previous_layer,
+        whose activation function is differentiated from input_activation; it is None if previous_layer is None.
+
+        A sparse input_activation is an input batch of the network, which has no previous layer.
+
+        If out is given, the results are written into its three matrices (see Matrix.add), which are returned; the
+        third one is unused (and can be None) if previous_layer is None."""
+        if isinstance(input_activation, SparseMatrix) and previous_layer is not None:
+            raise ValueError("A sparse input batch cannot be the activation of a previous layer.")
+        if out is not None:
+            grad_w, grad_b, input_error = out
+            if previous_layer is None:
+                input_error = None
+            if isinstance(input_activation, SparseMatrix):
+                matrix_ops.sparse_dense_backward_into(grad_w._native, grad_b._native, error._native, input_activation._native)
+            else:
+                matrix_ops.dense_backward_into(
+                    grad_w._native, grad_b._native, input_error._native if input_error is not None else None,
+                    self.weights._native, error._native, input_activation._native,
+                    previous_layer.activation_kind if previous_layer is not None else matrix_ops.Activation.linear
+                )
+            for M in (grad_w, grad_b, input_error):
+                if M is not None:
+                    M.format = (M._native.rows, M._native.cols)
+            return grad_w, grad_b, input_error
+        if isinstance(input_activation, SparseMatrix):
+            grad_w, grad_b = matrix_ops.sparse_dense_backward(error._native, input_activation._native)
+            return Matrix._from_native(grad_w), Matrix._from_native(grad_b), None
+        grad_w, grad_b, input_error = matrix_ops.dense_backward(
+            self.weights._native, error._native, input_activation._native,
+            previous_layer.activation_kind if previous_layer is not None else matrix_ops.Activation.linear,
+            previous_layer is not None
+        )
+        return (Matrix._from_native(grad_w), Matrix._from_native(grad_b),
+                Matrix._from_native(input_error) if input_error is not None else None)
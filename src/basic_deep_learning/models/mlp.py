@@ -1,49 +1,73 @@
 """Main module containing the MultiLayerPerceptron class."""
-from typing import Literal
-import matplotlib.pyplot as plt
+from typing import Literal, Self
 import json
 from ..functionality.matrix import Matrix
+from ..functionality.sparse_matrix import SparseMatrix
+from ..functionality.quantized_matrix import QuantizedMatrix
 from ..functionality.activations_registry import ActivationFunctionsRegistry
+from ..optimizers import Optimizer, SGD
+from .dense_layer import DenseLayer
+from .workspace import Workspace
+from .data_parallel import DataParallel
+from .checkpoint import Checkpoint
+from .quantized_mlp import QuantizedMultiLayerPerceptron
+from ..data import DataLoader
+from ..telemetry import Profiler, Callback, ConsoleSink, TrainingInfoWriter
+from ..miscellaneous.formatting import time_format
+import matrix_ops
+import threading
+import random
+from concurrent.futures import ThreadPoolExecutor
 import time
 from datetime import datetime
 import os
 
-def time_format(seconds: float):
-    floor_secs = int(seconds)
-    hashing_table = {
-        "h": 0,
-        "m": 0,
-        "s": 0,
-        "ms": 0
-    }
-    hours, s = divmod(floor_secs, 3600)
-    m, sec = divmod(s, 60)
-    ms = int((seconds-floor_secs)*1000)
-    hashing_table["h"], hashing_table["m"], hashing_table["s"], hashing_table["ms"] = hours, m, sec, ms
-    while list(hashing_table.values())[0] == 0:
-        del hashing_table[list(hashing_table.keys())[0]]
-    string = ''
-    keys = list(hashing_table.keys())
-    for i, key in enumerate(hashing_table.keys()):
-        if i < len(hashing_table) - 1:
-            string += f'{hashing_table[key]:02d} {key} : '
-        else:
-            string += f'{hashing_table[key]:03d} {key}'
-    return string
-
 class MultiLayerPerceptron:
     def __init__(self,
                 structure: list[int],
-                hidden_layer_activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh'],
-                output_layer_activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh']):
+                hidden_layer_activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                                                'sigmoid_rational', 'tanh_rational'],
+                output_layer_activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                                                'sigmoid_rational', 'tanh_rational'],
+                weights: list[Matrix]|None = None,
+                biases: list[Matrix]|None = None,
+                dtype: Literal['float64', 'float32']|None = None,
+                memory_budget: int|None = None):
+        """dtype is the type of the entries of the parameters and of every intermediate result: 'float32' halves the
+        memory of the model and roughly doubles the throughput of its kernels, at the cost of precision. By default it
+        is the dtype of the given weights, or 'float64'. Parameters of another dtype are converted, and so are the
+        inputs and expected outputs fed to the model.
+
+        Inputs (single vectors or batches) can also be SparseMatrix instances, for high-dimensional inputs that are
+        mostly zero: the first layer is then computed and differentiated in time proportional to their non-zero entries.
+
+        The activation labels can also name the fast approximations of sigmoid and tanh ('sigmoid_table', 'tanh_table',
+        'sigmoid_rational', 'tanh_rational'), whose largest errors are listed in ActivationFunctionsRegistry.ApproximationErrors.
+
+        memory_budget bounds, in bytes, the memory taken by the activations and errors of a training step (see
+        activation_memory), which grows with the depth, the width and the batch size. With a budget, training keeps
+        only the activations of every k-th layer and recomputes the others during the backward pass, k being chosen
+        for each batch size by checkpoint_interval. Setting it between training steps discards the workspaces."""
         self.structure = structure
         self.number_of_layers = len(structure)
-        self.weights = [
-            Matrix.randomize(y, x, -1, 1) for x, y in zip(structure[:-1], structure[1:])
-        ]
-        self.biases = [
-            Matrix.randomize(y, 1, -1, 1) for y in structure[1:]
-        ]
+        if dtype is None:
+            dtype = weights[0].dtype if weights else 'float64'
+        if dtype not in Matrix._NATIVE_TYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {list(Matrix._NATIVE_TYPES)}.")
+        self.dtype = dtype
+        if weights is None:
+            weights = [
+                Matrix.randomize(y, x, -1, 1, dtype) for x, y in zip(structure[:-1], structure[1:])
+            ]
+        if biases is None:
+            biases = [
+                Matrix.randomize(y, 1, -1, 1, dtype) for y in structure[1:]
+            ]
+        if [W.format for W in weights] != list(zip(structure[1:], structure[:-1])) or \
+           [B.format for B in biases] != [(y, 1) for y in structure[1:]]:
+            raise TypeError("The formats of the weights and biases do not match the structure.")
+        self.weights = [self.__cast(W) for W in weights]
+        self.biases = [self.__cast(B) for B in biases]
         self.hidden_activation_name = hidden_layer_activation_function_label
         self.output_activation_name = output_layer_activation_function_label
         self.hidden_activation_function, self.hidden_activation_function_prime = ActivationFunctionsRegistry.Activations[
@@ -52,119 +76,459 @@ class MultiLayerPerceptron:
         self.output_activation_function, self.output_activation_function_prime = ActivationFunctionsRegistry.Activations[
             output_layer_activation_function_label
             ]
+        self.hidden_activation_function_prime_from_output = ActivationFunctionsRegistry.ActivationsFromOutput[
+            hidden_layer_activation_function_label
+            ][1]
+        self.output_activation_function_prime_from_output = ActivationFunctionsRegistry.ActivationsFromOutput[
+            output_layer_activation_function_label
+            ][1]
+        self.__inference_buffers = threading.local()
+        self.__workspaces = threading.local()
+        self.memory_budget = memory_budget
         
+    def __cast(self, M: Matrix) -> Matrix: #Private method.
+        """Returns the matrix itself if its entries are of the dtype of the MLP, and a converted copy otherwise."""
+        return M if M.dtype == self.dtype else M.astype(self.dtype)
+
+    @property
+    def layers(self) -> list[DenseLayer]:
+        """The layers of the MLP, built on the current weights and biases (which they share rather than copy)."""
+        labels = [self.hidden_activation_name] * (len(self.weights) - 1) + [self.output_activation_name]
+        return [DenseLayer(W, B, label) for W, B, label in zip(self.weights, self.biases, labels)]
+    
     def forward_propagate(self, input_vector: Matrix):
-        """Feeds forward an input vector into the MLP."""
-        if input_vector.format[1] != 1:
-            raise ValueError("Input must be a column vector")
+        """Feeds forward an input vector into the MLP.
+        
+        The input can also be a batch: a matrix whose columns are the input vectors of several samples,
+        in which case each layer is computed as a single matrix-matrix product and the outputs are the columns of the result."""
+        if input_vector.format[0] != self.structure[0]:
+            raise ValueError(f"Input must have {self.structure[0]} rows (one column per sample).")
+        input_vector = self.__cast(input_vector)
         activations = [input_vector]
         pre_activations = []
         current_activation = input_vector
-        for i, (W, B) in enumerate(zip(self.weights, self.biases)):
-            Z = W * current_activation + B
+        for layer in self.layers:
+            current_activation, Z = layer.forward(current_activation)
             pre_activations.append(Z)
-            if i < len(self.weights) - 1:
-                current_activation = self.hidden_activation_function(Z)
-            else:
-                current_activation = self.output_activation_function(Z)
             activations.append(current_activation)
         return activations[-1], (activations, pre_activations)
     
-    def backward_propagate(self, input_vector: Matrix, expected_vector: Matrix, learning_rate: float = 0.1):
-        """Updates the weights and biases based on one input and its expected output."""
-        _, (activations, pre_activations) = self.forward_propagate(input_vector)
-        grad_w = [Matrix.zero(*W.format) for W in self.weights]
-        grad_b = [Matrix.zero(*B.format) for B in self.biases]
-        output_error = (activations[-1] - expected_vector) @ self.output_activation_function_prime(pre_activations[-1])
-        grad_b[-1] = output_error
-        grad_w[-1] = output_error * activations[-2].T()
-        error = output_error
-        for layer_idx in range(len(self.weights)-2, -1, -1):
-            error = (self.weights[layer_idx+1].T() * error) @ self.hidden_activation_function_prime(pre_activations[layer_idx])
-            if error.format[1] != 1:
-                error = error.T()
-            grad_b[layer_idx] = error
-            act_t = activations[layer_idx].T()
-            grad_w[layer_idx] = error * act_t
-        for i in range(len(self.weights)):
-            self.weights[i] = self.weights[i] - (learning_rate * grad_w[i])
-            self.biases[i] = self.biases[i] - (learning_rate * grad_b[i])
+    def __get_inference_buffers(self, batch_size: int):
+        """Returns the two ping-pong buffers of the calling thread, (re)allocated if they are too small for the batch."""
+        widest = max(self.structure[1:])
+        buffers = getattr(self.__inference_buffers, 'buffers', None)
+        if buffers is None or buffers[0].capacity < widest * batch_size:
+            buffers = [Matrix._NATIVE_TYPES[self.dtype](widest, batch_size) for _ in range(2)]
+            self.__inference_buffers.buffers = buffers
+        return buffers
     
-    def get_mse_loss(self, data: list[tuple[Matrix, Matrix]]):
-        """Calculates the mean squared error loss."""
-        total_loss = 0
-        n_outputs = self.structure[-1]
+    def predict_batch(self, input_batch: Matrix) -> Matrix:
+        """Returns the outputs of the MLP for a batch of inputs (one sample per column) as a matrix with one column per sample.
+        
+        Unlike forward_propagate, no activation nor pre-activation is kept: each layer is computed by a fused kernel in one
+        of two buffers sized to the widest layer, which are reused from one layer and one call to the next."""
+        if input_batch.format[0] != self.structure[0]:
+            raise ValueError(f"Input must have {self.structure[0]} rows (one column per sample).")
+        buffers = self.__get_inference_buffers(input_batch.format[1])
+        current = self.__cast(input_batch)._native
+        forward_into = matrix_ops.sparse_dense_forward_into if isinstance(input_batch, SparseMatrix) else matrix_ops.dense_forward_into
+        for i, layer in enumerate(self.layers):
+            output = buffers[i % 2]
+            forward_into(output, layer.weights._native, current, layer.biases._native, layer.activation_kind)
+            forward_into = matrix_ops.dense_forward_into
+            current = output
+        return Matrix._from_native(type(current)(current)) # Copied, since the buffers are reused by the next call.
+    
+    def predict(self, input_vector: Matrix) -> Matrix:
+        """Returns the output vector of the MLP for one input vector, without keeping any intermediate result (see predict_batch)."""
+        if input_vector.format[1] != 1:
+            raise ValueError("Input must be a column vector")
+        return self.predict_batch(input_vector)
+    
+    @property
+    def memory_budget(self) -> int|None:
+        """The bound, in bytes, on the memory of the activations and errors of a training step (None for no bound)."""
+        return self.__memory_budget
+
+    @memory_budget.setter
+    def memory_budget(self, memory_budget: int|None) -> None:
+        if memory_budget is not None and memory_budget <= 0:
+            raise ValueError("The memory budget must be a positive number of bytes.")
+        self.__memory_budget = memory_budget
+        self.__workspaces = threading.local() #Their checkpoint intervals were chosen for the previous budget.
+
+    def activation_memory(self, batch_size: int, checkpoint_interval: int = 1) -> int:
+        """The memory, in bytes, taken by the activations and errors of a training step on a batch of batch_size samples
+        when the activations of every checkpoint_interval-th layer are kept (see Workspace.activation_memory)."""
+        return Workspace.activation_memory(self.structure, self.dtype, batch_size, checkpoint_interval)
+
+    def __recomputed_work(self, checkpoint_interval: int) -> int: #Private method.
+        """The number of multiply-adds per sample spent recomputing activations during the backward pass: those of every
+        layer that is neither a checkpoint nor in the last segment, whose activations are still those of the forward pass."""
+        last_segment = (self.number_of_layers - 2) // checkpoint_interval * checkpoint_interval
+        return sum(self.structure[i] * self.structure[i - 1] for i in range(1, last_segment) if i % checkpoint_interval)
+
+    def checkpoint_interval(self, batch_size: int, current: int|None = None) -> int:
+        """Returns the interval between the layers whose activations a training step on batch_size samples keeps:
+        1 (every layer, nothing recomputed) without a memory budget, and otherwise the interval that recomputes the
+        least among those fitting the budget (see activation_memory), or the one taking the least memory if none fits.
+
+        If current is given and still fits the budget, it is kept, so that a smaller last batch does not replace the
+        workspaces of the previous ones."""
+        if self.memory_budget is None:
+            return 1
+        if current is not None and self.activation_memory(batch_size, current) <= self.memory_budget:
+            return current
+        intervals = range(1, self.number_of_layers)
+        memory = {k: self.activation_memory(batch_size, k) for k in intervals}
+        fitting = [k for k in intervals if memory[k] <= self.memory_budget]
+        if not fitting:
+            return min(intervals, key=lambda k: (memory[k], self.__recomputed_work(k)))
+        return min(fitting, key=lambda k: (self.__recomputed_work(k), memory[k]))
+
+    def workspace(self, batch_size: int|None = None) -> Workspace:
+        """Returns the workspace of the calling thread, whose buffers are reused by every training step of that thread.
+
+        If batch_size is given, the workspace keeps the activations of the layers chosen by checkpoint_interval for
+        batches of that size, and is replaced if its own interval no longer fits."""
+        workspace = getattr(self.__workspaces, 'workspace', None)
+        interval = workspace.checkpoint_interval if workspace is not None else 1
+        if batch_size is not None:
+            interval = self.checkpoint_interval(batch_size, interval)
+        if workspace is None or not workspace.fits(self) or workspace.checkpoint_interval != interval:
+            workspace = self.__workspaces.workspace = Workspace(self.structure, self.dtype, interval)
+        return workspace
+
+    def compute_gradients(self, input_vector: Matrix, expected_vector: Matrix,
+                          return_loss: bool = False,
+                          profiler: Profiler|None = None,
+                          workspace: Workspace|None = None) -> tuple[list[Matrix], list[Matrix]]|tuple[list[Matrix], list[Matrix], float]:
+        """Returns the gradients (grad_w, grad_b) of the squared error with respect to the weights and biases,
+        without updating them.
+        
+        Both arguments can be batches (one sample per column), in which case the gradients are summed over the batch.
+        Only the activations needed by backpropagation are kept during the forward pass.
         
-        for input_vector, expected_output in data:
-            output, _ = self.forward_propagate(input_vector)
-            error = output - expected_output
-            squared_error = error @ error  # Element-wise square
-            total_loss += sum(squared_error.get_column(1))  # Sum all squared errors
+        If return_loss is True, the sum of the squared errors of the batch, read from the output of that same forward
+        pass, is returned as a third element. If a profiler is passed, the durations of the forward and backward
+        passes are added to it.
         
-        return total_loss / (len(data) * n_outputs)
+        The activations, errors and gradients are written into the buffers of workspace if one is passed (see
+        Workspace and workspace()), so that no matrix is allocated: the gradients returned are then those buffers,
+        valid until the next use of the workspace. Otherwise a workspace is created for the step, with the checkpoint
+        interval fitting the memory budget.
+
+        If the workspace keeps the activations of every k-th layer only, the backward pass recomputes the activations
+        of each segment of k layers from its checkpoint when it reaches it, into the buffers of the segment above (see
+        Workspace); the recomputation is part of the backward phase of the profiler."""
+        if input_vector.format[0] != self.structure[0]:
+            raise ValueError(f"Input must have {self.structure[0]} rows (one column per sample).")
+        input_vector, expected_vector = self.__cast(input_vector), self.__cast(expected_vector)
+        layers = self.layers
+        if workspace is None:
+            workspace = Workspace(self.structure, self.dtype, self.checkpoint_interval(input_vector.format[1]))
+        elif not workspace.fits(self):
+            raise ValueError("The workspace does not have the structure and the dtype of the MLP.")
+        start_forward = time.perf_counter()
+        activations = [input_vector]
+        for layer, A in zip(layers, workspace.activations):
+            activations.append(layer.forward(activations[-1], out=A)[0])
+        start_backward = time.perf_counter()
+        errors = workspace.errors
+        error = layers[-1].output_error(activations[-1], expected_vector, out=errors[0])
+        interval = workspace.checkpoint_interval
+        last_segment = (len(layers) - 1) // interval * interval #The activations from this layer on are still those of the forward pass.
+        for layer_idx in range(len(layers)-1, -1, -1):
+            if interval > 1 and layer_idx < last_segment and layer_idx % interval == interval - 1:
+                for l in range(layer_idx - interval + 1, layer_idx):
+                    layers[l].forward(activations[l], out=activations[l + 1])
+            previous_layer = layers[layer_idx-1] if layer_idx > 0 else None
+            out = (workspace.grad_w[layer_idx], workspace.grad_b[layer_idx], errors[1] if error is errors[0] else errors[0])
+            error = layers[layer_idx].backward(error, activations[layer_idx], previous_layer, out=out)[2]
+        grad_w, grad_b = list(workspace.grad_w), list(workspace.grad_b)
+        if profiler is not None:
+            end_backward = time.perf_counter()
+            profiler.add('forward', start_backward - start_forward)
+            profiler.add('backward', end_backward - start_backward)
+        if return_loss:
+            return grad_w, grad_b, matrix_ops.squared_error_sum(activations[-1]._native, expected_vector._native)
+        return grad_w, grad_b
+    
+    def backward_propagate(self, input_vector: Matrix, expected_vector: Matrix, learning_rate: float = 0.1,
+                           optimizer: Optimizer|None = None, profiler: Profiler|None = None):
+        """Updates the weights and biases based on one input and its expected output.
+        
+        Both arguments can also be batches (one sample per column, see Matrix.hstack): the gradients are then
+        accumulated over the whole batch and averaged, and the weights and biases are updated once.
+        
+        The update is done in place by the optimizer if one is passed, and by plain gradient descent
+        with the given learning rate otherwise. The intermediate results and the gradients are written into the
+        workspace of the calling thread (see workspace()), so that training steps allocate no matrix; with a memory
+        budget, it only keeps the activations of the layers chosen by checkpoint_interval.
+        
+        Returns the sum of the squared errors of the batch before the update, as computed by the forward pass.
+        If a profiler is passed, the durations of the forward pass, the backward pass and the update are added to it."""
+        grad_w, grad_b, loss = self.compute_gradients(input_vector, expected_vector, return_loss=True, profiler=profiler,
+                                                      workspace=self.workspace(input_vector.format[1]))
+        if optimizer is None:
+            optimizer = SGD(learning_rate)
+        start_update = time.perf_counter()
+        optimizer.step(self.weights + self.biases, grad_w + grad_b, 1 / input_vector.format[1])
+        if profiler is not None:
+            profiler.add('update', time.perf_counter() - start_update)
+        return loss
+    
+    def get_mse_loss(self, data: list[tuple[Matrix, Matrix]]|DataLoader, batch_size: int = 256):
+        """Calculates the mean squared error loss.
+        
+        The samples are evaluated by batches of batch_size samples through predict_batch. data can also be
+        a DataLoader, whose own batches are then used."""
+        if not isinstance(data, DataLoader):
+            data = DataLoader(data, batch_size, prefetch=0, dtype=self.dtype)
+        return self.__mse_loss(data)
+    
+    def __mse_loss(self, batches) -> float: #Private method.
+        """Mean squared error over an iterable of (input batch, expected batch) pairs, without keeping any intermediate result."""
+        total_loss = 0
+        samples_count = 0
+        for input_batch, expected_batch in batches:
+            total_loss += matrix_ops.squared_error_sum(self.predict_batch(input_batch)._native, self.__cast(expected_batch)._native)
+            samples_count += input_batch.format[1]
+        return total_loss / (samples_count * self.structure[-1])
     
+    def __timed_mse_loss(self, batches) -> tuple[float, float]: #Private method.
+        """The mean squared error over the batches, and the time it took to evaluate it."""
+        start = time.perf_counter()
+        loss = self.__mse_loss(batches)
+        return loss, time.perf_counter() - start
+
     def __make_dir(self):
         os.makedirs('cache', exist_ok = True)
+
+    @staticmethod
+    def __data_size(data: list[tuple[Matrix, Matrix]]|DataLoader) -> int|None:
+        """The number of samples of a dataset, or None for a streamed dataset of unknown length."""
+        if not isinstance(data, DataLoader):
+            return len(data)
+        return len(data.dataset) if hasattr(data.dataset, '__len__') else None
+
+    def __evaluation_set(self, data: list[tuple[Matrix, Matrix]]|DataLoader, samples: int|None) -> tuple[object, str]:
+        """The batches on which the testing loss is evaluated, and a description of how they were chosen."""
+        if samples is None:
+            if not isinstance(data, DataLoader):
+                data = DataLoader(data, 256, prefetch=0, dtype=self.dtype)
+            return data, 'full testing set'
+        if samples < 1:
+            raise ValueError("The number of evaluation samples must be a positive integer.")
+        if not isinstance(data, DataLoader):
+            samples = min(samples, len(data))
+            return DataLoader(random.sample(data, samples), 256, prefetch=0, dtype=self.dtype), f'random sample of {samples} testing samples'
+        batches, count = [], 0
+        for input_batch, expected_batch in data:
+            taken = min(input_batch.format[1], samples - count)
+            if taken < input_batch.format[1]:
+                input_batch, expected_batch = input_batch.get_columns(1, taken), expected_batch.get_columns(1, taken)
+            batches.append((input_batch, expected_batch))
+            count += taken
+            if count == samples:
+                break
+        return batches, f'first {count} testing samples'
+
+    def __snapshot(self) -> Self: #Private method.
+        """A copy of the MLP whose parameters do not change while this one trains."""
+        return MultiLayerPerceptron(self.structure, self.hidden_activation_name, self.output_activation_name,
+                                    weights=[W.copy() for W in self.weights], biases=[B.copy() for B in self.biases],
+                                    dtype=self.dtype)
     
-    def train(self, training_data: list[tuple[Matrix, Matrix]],
-              testing_data: list[tuple[Matrix, Matrix]],
+    def train(self, training_data: list[tuple[Matrix, Matrix]]|DataLoader,
+              testing_data: list[tuple[Matrix, Matrix]]|DataLoader,
               learning_rate: float = 0.1,
               epochs: int = 100,
               plot: bool = False,
               decay_rate: float = 1,
               loss_float_formating: int = 6,
-              plot_epochs_durations: bool = False):
+              plot_epochs_durations: bool = False,
+              batch_size: int = 1,
+              optimizer: Optimizer|None = None,
+              workers: int = 1,
+              evaluation_interval: int = 1,
+              evaluation_samples: int|None = None,
+              background_evaluation: bool = False,
+              callbacks: list[Callback]|None = None,
+              verbose: bool = True):
         """Trains the neural network based on two different categories of data : training and testing.
         Outputs the MSE loss of each. If "True" is passed to the plot parameter,
         a plot of the evolution  of train losses and test losses will be be displayed and saved 
-        in your directory."""
+        in your directory.
+        
+        The training data is processed in mini-batches of batch_size samples: each mini-batch is stacked
+        into a single matrix and the weights are updated once per mini-batch.
+        
+        Both datasets can also be DataLoader instances, which stream their samples (e.g. from files too large
+        to fit in memory) in their own mini-batches; batch_size then only applies to lists.
+        
+        The weights are updated in place by the optimizer (plain gradient descent by default). If an optimizer
+        is passed, its own learning rate is used as the initial learning rate instead of learning_rate.
+        
+        If workers is not 1, each mini-batch is split across that many threads (0 for one per core) whose gradients
+        are reduced before a single update; see DataParallel.
+        
+        The training loss of an epoch is the mean of the squared errors of its mini-batches, gathered from the forward
+        pass of backpropagation itself: it is measured while the weights are updated, rather than by a second pass
+        over the training data. The testing loss is evaluated by batches, without gradients, every evaluation_interval
+        epochs (and after the last one), on the whole testing data or on a fixed sample of evaluation_samples samples
+        (drawn at random from a list, or the first ones of a DataLoader). If background_evaluation is True, it is
+        evaluated in a background thread, on a copy of the parameters, while the next epoch trains.
+        Each reported loss states how it was computed.
+        
+        Training emits structured records (see Callback): its configuration, every batch, every epoch (with the time
+        spent in each phase, see Profiler, the throughput and the number of matrix buffers allocated), every
+        evaluation and a summary, or the error that interrupted training. They are sent to the given callbacks, such as MemoryRecorder or JSONLinesSink, to a
+        ConsoleSink printing the progress unless verbose is False, and to a TrainingInfoWriter writing
+        cache/training_info.txt.
+        
+        Returns the training losses (one per epoch) and the testing losses (one per evaluation)."""
+        if evaluation_interval < 1:
+            raise ValueError("The evaluation interval must be a positive integer.")
+        if not isinstance(training_data, DataLoader):
+            training_data = DataLoader(training_data, batch_size, prefetch=0, dtype=self.dtype)
+        parallel = DataParallel(workers) if workers != 1 else None
+        if optimizer is None:
+            optimizer = SGD(learning_rate)
+        learning_rate = optimizer.learning_rate
         self.__make_dir()
-        format_specifier = f'.{loss_float_formating}f'
-        bar_length = 75
+        sinks = list(callbacks or [])
+        if verbose:
+            sinks.append(ConsoleSink(loss_float_formating=loss_float_formating))
+        sinks.append(TrainingInfoWriter('cache/training_info.txt', loss_float_formating))
+        batches_count = len(training_data) if hasattr(training_data.dataset, '__len__') else None
+        evaluation_data, evaluation_label = self.__evaluation_set(testing_data, evaluation_samples)
+        training_label = 'running mean during the epoch'
+        if background_evaluation:
+            evaluation_label += ', in background'
+        evaluator = ThreadPoolExecutor(max_workers=1) if background_evaluation else None
+        profiler = Profiler()
+        pending_evaluations = []
         train_losses = []
         test_losses = []
+        test_epochs = []
         epochs_duration = []
-        start_date = datetime.now()
         start_time = time.perf_counter()
-        for epoch in range(epochs):
-            current_lr = learning_rate * (decay_rate ** epoch)  # Exponential decay
-            data_progress = 0
-            start_epoch = time.perf_counter()
-            for input_vector, expected_output in training_data:
-                self.backward_propagate(input_vector, expected_output, current_lr)
-                data_progress += 1
-                percentage = data_progress/len(training_data)
-                print(f"\rEpoch {epoch+1}/{epochs} : {int(percentage * bar_length) * "█"}{int((1-percentage)*bar_length) * "-"} {percentage*100:.0f}% completed.", end='')
-            end_epoch = time.perf_counter()
-            time_epoch = end_epoch - start_epoch
-            epochs_duration.append(time_epoch)
-            print("\n")
-            train_loss = self.get_mse_loss(training_data)
-            test_loss = self.get_mse_loss(testing_data)
-            train_losses.append(train_loss)
+        def record_evaluation(evaluated_epoch: int, test_loss: float, duration: float, background: bool):
             test_losses.append(test_loss)
-            print(f"Epoch {epoch+1}/{epochs} | Training Loss: {train_loss:{format_specifier}} | Testing Loss: {test_loss:{format_specifier}} ({time_format(time_epoch)})\n")
-        end_date = datetime.now()
-        end_time = time.perf_counter()
-        elapsed_time = end_time - start_time
-        time_per_epoch = sum(epochs_duration)/epochs
-        with open(f'cache/training_info.txt', 'w') as f:
-            f.write(f'Epochs: {epochs}.\n')
-            f.write(f'Learning rate: {learning_rate}.\n')
-            f.write(f'Exponential decay rate: {decay_rate}.\n')
-            f.write(f'Data size: {len(training_data)+len(testing_data)}. Including:\n \n')
-            f.write(f'   Training data size: {len(training_data)}.\n')
-            f.write(f'   Testing data size: {len(testing_data)}.\n \n')
-            f.write(f'Training start date: {start_date}.\n')
-            f.write(f'Training end date: {end_date}.\n')
-            f.write(f'Trained in: {time_format(elapsed_time)}.\n')
-            f.write(f'Average time per epoch: {time_format(time_per_epoch)}/epoch.\n')
-            f.write(f'Last training loss: {train_losses[-1]:{loss_float_formating}}.\n')
-            f.write(f'Last testing loss: {test_losses[-1]:{loss_float_formating}}.')
+            test_epochs.append(evaluated_epoch)
+            for sink in sinks:
+                sink.on_evaluation_end({'event': 'evaluation_end', 'epoch': evaluated_epoch, 'epochs': epochs,
+                                        'test_loss': test_loss, 'duration': duration, 'background': background})
+        def report_evaluations(wait: bool):
+            while pending_evaluations and (wait or pending_evaluations[0][1].done()):
+                evaluated_epoch, evaluation = pending_evaluations.pop(0)
+                record_evaluation(evaluated_epoch, *evaluation.result(), background=True)
+
+        try:
+            for sink in sinks:
+                sink.on_train_begin({
+                    'event': 'train_begin',
+                    'date': str(datetime.now()),
+                    'epochs': epochs,
+                    'optimizer': type(optimizer).__name__,
+                    'learning_rate': learning_rate,
+                    'decay_rate': decay_rate,
+                    'dtype': self.dtype,
+                    'workers': workers,
+                    'memory_budget': self.memory_budget,
+                    'training_size': self.__data_size(training_data),
+                    'testing_size': self.__data_size(testing_data),
+                    'batches': batches_count,
+                    'training_label': training_label,
+                    'evaluation_label': evaluation_label
+                })
+            if parallel is not None:
+                parallel.start()
+            for epoch in range(epochs):
+                optimizer.learning_rate = learning_rate * (decay_rate ** epoch)  # Exponential decay
+                data_progress = 0
+                training_size = 0
+                epoch_loss = 0
+                profiler.reset()
+                start_epoch = time.perf_counter()
+                batches = iter(training_data)
+                while True:
+                    start_conversion = time.perf_counter()
+                    batch = next(batches, None)
+                    profiler.add('conversion', time.perf_counter() - start_conversion)
+                    if batch is None:
+                        break
+                    input_batch, expected_batch = batch
+                    if parallel is not None:
+                        grad_w, grad_b, loss = parallel.compute_gradients(self, input_batch, expected_batch, return_loss=True,
+                                                                          profiler=profiler)
+                        with profiler.phase('update'):
+                            optimizer.step(self.weights + self.biases, grad_w + grad_b, 1 / input_batch.format[1])
+                    else:
+                        loss = self.backward_propagate(input_batch, expected_batch, optimizer=optimizer, profiler=profiler)
+                    epoch_loss += loss
+                    data_progress += 1
+                    training_size += input_batch.format[1]
+                    for sink in sinks:
+                        sink.on_batch_end({'event': 'batch_end', 'epoch': epoch + 1, 'batch': data_progress,
+                                           'batches': batches_count, 'samples': input_batch.format[1], 'loss': loss})
+                end_epoch = time.perf_counter()
+                time_epoch = end_epoch - start_epoch
+                epochs_duration.append(time_epoch)
+                train_loss = epoch_loss / (training_size * self.structure[-1])
+                train_losses.append(train_loss)
+                epoch_record = {
+                    'event': 'epoch_end',
+                    'epoch': epoch + 1,
+                    'epochs': epochs,
+                    'learning_rate': optimizer.learning_rate,
+                    'train_loss': train_loss,
+                    'samples': training_size,
+                    'duration': time_epoch,
+                    'samples_per_second': training_size / time_epoch if time_epoch > 0 else None
+                }
+                if (epoch + 1) % evaluation_interval == 0 or epoch == epochs - 1:
+                    if evaluator is not None:
+                        pending_evaluations.append((epoch + 1, evaluator.submit(self.__snapshot().__timed_mse_loss, evaluation_data)))
+                    else:
+                        test_loss, duration = self.__timed_mse_loss(evaluation_data)
+                        profiler.add('evaluation', duration)
+                        record_evaluation(epoch + 1, test_loss, duration, background=False)
+                        epoch_record['test_loss'] = test_loss
+                epoch_record.update(profiler.snapshot())
+                for sink in sinks:
+                    sink.on_epoch_end(epoch_record)
+                report_evaluations(wait=False)
+            report_evaluations(wait=True)
+        except BaseException as error: #Including KeyboardInterrupt: the sinks still release their files.
+            for sink in sinks:
+                sink.on_train_abort({'event': 'train_abort', 'date': str(datetime.now()),
+                                     'elapsed': time.perf_counter() - start_time, 'epochs_completed': len(epochs_duration),
+                                     'error': f'{type(error).__name__}: {error}'})
+            raise
+        finally:
+            if parallel is not None:
+                parallel.close()
+            if evaluator is not None:
+                evaluator.shutdown(cancel_futures=True)
+            optimizer.learning_rate = learning_rate
+        for sink in sinks:
+            sink.on_train_end({
+                'event': 'train_end',
+                'date': str(datetime.now()),
+                'elapsed': time.perf_counter() - start_time,
+                'train_losses': train_losses,
+                'test_losses': test_losses,
+                'test_epochs': test_epochs,
+                'epochs_duration': epochs_duration
+            })
+        if plot or plot_epochs_durations:
+            import matplotlib.pyplot as plt #Only loaded when plotting, as it slows down the import of the package.
         if plot:
             plt.figure(figsize=(10, 6))
-            plt.plot(train_losses, label='Train Loss')
-            plt.plot(test_losses, label='Test Loss')
+            plt.plot(range(1, epochs + 1), train_losses, label=f'Train Loss ({training_label})')
+            plt.plot(test_epochs, test_losses, label=f'Test Loss ({evaluation_label})')
             plt.xlabel('Epochs')
             plt.ylabel('Mean Squared Error')
             plt.title('Training History')
@@ -184,29 +548,64 @@ class MultiLayerPerceptron:
             plt.show()
         return train_losses, test_losses
     
-    def save(self, filename:str):
+    def save(self, filename: str, binary: bool = False, dtype: Literal['float64', 'float32']|None = None):
+        """Save model to the cache directory, as a JSON file or as a binary checkpoint (see the Checkpoint class).
+
+        dtype is the type of the entries of a binary checkpoint, the dtype of the MLP by default."""
         self.__make_dir()
-        """Save model to JSON file"""
+        if binary:
+            parameters = {f'weights.{l}': W for l, W in enumerate(self.weights)}
+            parameters.update({f'biases.{l}': B for l, B in enumerate(self.biases)})
+            Checkpoint.save(f'cache/{filename}', {
+                'structure': self.structure,
+                'hidden_activation': self.hidden_activation_name,
+                'output_activation': self.output_activation_name
+            }, parameters, dtype or self.dtype)
+            return
         data = {
             'structure': self.structure,
             'hidden_activation': self.hidden_activation_name,
             'output_activation': self.output_activation_name,
+            'dtype': self.dtype,
             'weights': [W.matrix for W in self.weights],
             'biases': [B.matrix for B in self.biases]
         }
         with open(f'cache/{filename}', 'w') as f:
             json.dump(data, f)
 
+    def quantize(self, dtype: Literal['float64', 'float32']|None = None) -> QuantizedMultiLayerPerceptron:
+        """Returns the inference-only copy of the MLP whose weights are quantized to int8 (see QuantizedMultiLayerPerceptron).
+
+        dtype is that of its biases and activations, the dtype of the MLP by default."""
+        return QuantizedMultiLayerPerceptron.from_model(self, dtype)
+
     @classmethod
-    def load(cls, filename):
-        """Load model from JSON file"""
-        with open(filename, 'r') as f:
-            data = json.load(f)
-        mlp = MultiLayerPerceptron(
+    def load(cls, filename, memory_map: bool = True, dtype: Literal['float64', 'float32']|None = None):
+        """Load model from a JSON file or from a binary checkpoint.
+
+        The weights of a binary checkpoint are memory-mapped rather than read, unless memory_map is False.
+        The model has the dtype it was saved with (the type of the entries of a binary checkpoint), unless another
+        dtype is given, in which case its parameters are converted. The weights of a quantized checkpoint are dequantized
+        (see QuantizedMultiLayerPerceptron.load to keep them quantized)."""
+        if Checkpoint.is_checkpoint(filename):
+            data, parameters = Checkpoint.load(filename, memory_map)
+            layers = range(len(data['structure']) - 1)
+            data['weights'] = [parameters[f'weights.{l}'] for l in layers]
+            data['biases'] = [parameters[f'biases.{l}'] for l in layers]
+            data['weights'] = [
+                W.dequantize(B.dtype) if isinstance(W, QuantizedMatrix) else W for W, B in zip(data['weights'], data['biases'])
+            ]
+        else:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+            saved_dtype = data.get('dtype', 'float64')
+            data['weights'] = [Matrix(W, saved_dtype) for W in data['weights']]
+            data['biases'] = [Matrix(B, saved_dtype) for B in data['biases']]
+        return cls(
             structure=data['structure'],
             hidden_layer_activation_function_label=data['hidden_activation'],
             output_layer_activation_function_label=data['output_activation'],
+            weights=data['weights'],
+            biases=data['biases'],
+            dtype=dtype
         )
-        mlp.weights = [Matrix(W) for W in data['weights']]
-        mlp.biases = [Matrix(B) for B in data['biases']]
-        return mlp
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""Module containing the QuantizedMultiLayerPerceptron class."""
+from typing import Literal, Self
+import os
+import threading
+import matrix_ops
+from ..functionality.matrix import Matrix
+from ..functionality.sparse_matrix import SparseMatrix
+from ..functionality.quantized_matrix import QuantizedMatrix
+from ..data import DataLoader
+from .checkpoint import Checkpoint
+
+class QuantizedMultiLayerPerceptron:
+    def __init__(self,
+                 structure: list[int],
+                 hidden_layer_activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                                                 'sigmoid_rational', 'tanh_rational'],
+                 output_layer_activation_function_label: Literal['sigmoid', 'ReLU', 'linear', 'tanh', 'sigmoid_table', 'tanh_table',
+                                                                 'sigmoid_rational', 'tanh_rational'],
+                 weights: list[QuantizedMatrix],
+                 biases: list[Matrix]) -> None:
+        """Inference-only counterpart of MultiLayerPerceptron whose weights are quantized to int8 (see QuantizedMatrix),
+        for deployments bound by memory bandwidth or RAM: the weights take 8 times less memory than float64 ones (4 times
+        less than float32), and every layer reads them at one byte per entry.
+
+        It is usually built by MultiLayerPerceptron.quantize(), or loaded from a checkpoint written by save. The biases,
+        which are a small fraction of the parameters, are kept as they are, and their dtype is that of the activations.
+
+        compare() reports the loss of accuracy from the float model."""
+        if [W.format for W in weights] != list(zip(structure[1:], structure[:-1])) or \
+           [B.format for B in biases] != [(y, 1) for y in structure[1:]]:
+            raise TypeError("The formats of the weights and biases do not match the structure.")
+        if any(B.dtype != biases[0].dtype for B in biases):
+            raise TypeError("The biases must all have the same dtype.")
+        self.structure = structure
+        self.number_of_layers = len(structure)
+        self.weights = weights
+        self.biases = biases
+        self.hidden_activation_name = hidden_layer_activation_function_label
+        self.output_activation_name = output_layer_activation_function_label
+        labels = [hidden_layer_activation_function_label] * (len(weights) - 1) + [output_layer_activation_function_label]
+        self.__activation_kinds = [matrix_ops.Activation.__members__[label] for label in labels]
+        self.__inference_buffers = threading.local()
+
+    @classmethod
+    def from_model(cls, model, dtype: Literal['float64', 'float32']|None = None) -> Self:
+        """Quantizes the weights of a MultiLayerPerceptron. dtype is that of the biases and activations, the dtype of the
+        model by default."""
+        dtype = dtype or model.dtype
+        return cls(model.structure, model.hidden_activation_name, model.output_activation_name,
+                   [QuantizedMatrix(W) for W in model.weights],
+                   [B if B.dtype == dtype else B.astype(dtype) for B in model.biases])
+
+    @property
+    def dtype(self) -> str:
+        """The type of the entries of the biases and of the activations: 'float64' or 'float32'."""
+        return self.biases[0].dtype
+
+    @property
+    def nbytes(self) -> int:
+        """The memory taken by the parameters, in bytes."""
+        return sum(W.nbytes for W in self.weights) + sum(memoryview(B._native).nbytes for B in self.biases)
+
+    def __get_inference_buffers(self, batch_size: int):
+        """Returns the two ping-pong buffers of the calling thread, (re)allocated if they are too small for the batch."""
+        widest = max(self.structure[1:])
+        buffers = getattr(self.__inference_buffers, 'buffers', None)
+        if buffers is None or buffers[0].capacity < widest * batch_size:
+            buffers = [Matrix._NATIVE_TYPES[self.dtype](widest, batch_size) for _ in range(2)]
+            self.__inference_buffers.buffers = buffers
+        return buffers
+
+    def predict_batch(self, input_batch: Matrix) -> Matrix:
+        """Returns the outputs of the MLP for a batch of inputs (one sample per column) as a matrix with one column per sample.
+
+        Each layer is computed by a fused kernel reading the int8 weights, in one of two buffers reused from one layer
+        and one call to the next, as for MultiLayerPerceptron.predict_batch."""
+        if isinstance(input_batch, SparseMatrix):
+            raise TypeError("A quantized MLP takes dense inputs.")
+        if input_batch.format[0] != self.structure[0]:
+            raise ValueError(f"Input must have {self.structure[0]} rows (one column per sample).")
+        buffers = self.__get_inference_buffers(input_batch.format[1])
+        current = (input_batch if input_batch.dtype == self.dtype else input_batch.astype(self.dtype))._native
+        for i, (W, B, kind) in enumerate(zip(self.weights, self.biases, self.__activation_kinds)):
+            output = buffers[i % 2]
+            matrix_ops.quantized_forward_into(output, W._native, current, B._native, kind)
+            current = output
+        return Matrix._from_native(type(current)(current)) # Copied, since the buffers are reused by the next call.
+
+    def predict(self, input_vector: Matrix) -> Matrix:
+        """Returns the output vector of the MLP for one input vector (see predict_batch)."""
+        if input_vector.format[1] != 1:
+            raise ValueError("Input must be a column vector")
+        return self.predict_batch(input_vector)
+
+    def get_mse_loss(self, data: list[tuple[Matrix, Matrix]]|DataLoader, batch_size: int = 256) -> float:
+        """Calculates the mean squared error loss, by batches of batch_size samples (see MultiLayerPerceptron.get_mse_loss)."""
+        if not isinstance(data, DataLoader):
+            data = DataLoader(data, batch_size, prefetch=0, dtype=self.dtype)
+        total_loss = 0
+        samples_count = 0
+        for input_batch, expected_batch in data:
+            if expected_batch.dtype != self.dtype:
+                expected_batch = expected_batch.astype(self.dtype)
+            total_loss += matrix_ops.squared_error_sum(self.predict_batch(input_batch)._native, expected_batch._native)
+            samples_count += input_batch.format[1]
+        return total_loss / (samples_count * self.structure[-1])
+
+    def compare(self,
+                model,
+                data: list[tuple[Matrix, Matrix]]|DataLoader,
+                batch_size: int = 256) -> dict:
+        """Reports the accuracy lost by the quantization of model (the MultiLayerPerceptron it was built from) on data:
+        the MSE losses of both models (see get_mse_loss), their absolute and relative differences, the largest difference
+        between their outputs, and the memory taken by both sets of parameters."""
+        if not isinstance(data, DataLoader):
+            data = DataLoader(data, batch_size, prefetch=0, dtype=self.dtype)
+        float_loss = model.get_mse_loss(data)
+        quantized_loss = self.get_mse_loss(data)
+        largest_difference = 0.0
+        for input_batch, _ in data:
+            difference = model.predict_batch(input_batch).astype(self.dtype) - self.predict_batch(input_batch)
+            largest_difference = max(largest_difference, max(abs(x) for row in difference.matrix for x in row))
+        float_bytes = sum(memoryview(M._native).nbytes for M in model.weights + model.biases)
+        return {
+            'float_loss': float_loss,
+            'quantized_loss': quantized_loss,
+            'loss_difference': quantized_loss - float_loss,
+            'relative_loss_difference': (quantized_loss - float_loss) / float_loss if float_loss else None,
+            'max_output_difference': largest_difference,
+            'float_bytes': float_bytes,
+            'quantized_bytes': self.nbytes,
+            'compression': float_bytes / self.nbytes
+        }
+
+    def save(self, filename: str) -> None:
+        """Save the quantized model to the cache directory, as a binary checkpoint (see the Checkpoint class)."""
+        os.makedirs('cache', exist_ok = True)
+        parameters = {f'weights.{l}': W for l, W in enumerate(self.weights)}
+        parameters.update({f'biases.{l}': B for l, B in enumerate(self.biases)})
+        Checkpoint.save(f'cache/{filename}', {
+            'structure': self.structure,
+            'hidden_activation': self.hidden_activation_name,
+            'output_activation': self.output_activation_name
+        }, parameters, self.dtype)
+
+    @classmethod
+    def load(cls, filename, memory_map: bool = True) -> Self:
+        """Load a quantized model from a binary checkpoint, its int8 weights being memory-mapped unless memory_map is False.
+
+        The weights of a checkpoint of a float model are quantized on loading."""
+        data, parameters = Checkpoint.load(filename, memory_map)
+        layers = range(len(data['structure']) - 1)
+        weights = [parameters[f'weights.{l}'] for l in layers]
+        return cls(
+            structure=data['structure'],
+            hidden_layer_activation_function_label=data['hidden_activation'],
+            output_layer_activation_function_label=data['output_activation'],
+            weights=[W if isinstance(W, QuantizedMatrix) else QuantizedMatrix(W) for W in weights],
+            biases=[parameters[f'biases.{l}'] for l in layers]
+        )
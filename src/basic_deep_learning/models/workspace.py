@@ -0,0 +1,74 @@
+"""Module containing the Workspace class."""
+from typing import Literal
+from ..functionality.matrix import Matrix
+
+class Workspace:
+    def __init__(self,
+                 structure: list[int],
+                 dtype: Literal['float64', 'float32'] = 'float64',
+                 checkpoint_interval: int = 1) -> None:
+        """Buffers of the training steps of a MultiLayerPerceptron of the given structure: the activation of every layer,
+        the errors (two are enough, since the error of a layer is dropped once the error of the previous one is computed),
+        the gradients of the weights and biases, and the input and expected shards of a DataParallel worker.
+
+        The buffers start empty and the kernels resize them to each step: a buffer is only reallocated when a batch is
+        larger than all the previous ones, so that steady-state training allocates no matrix.
+
+        With a checkpoint_interval k greater than 1, only the activations of every k-th layer (the checkpoints) and of
+        the output layer have buffers of their own: the activations between two checkpoints share k - 1 buffers with
+        those of the other segments, and the backward pass recomputes them from the checkpoint below as it reaches
+        their segment, overwriting the segment it has just left. activations then lists these shared buffers, so an
+        entry only holds the activation of its layer while the segment of that layer is the current one.
+
+        Whatever is written into a workspace is only valid until its next use; a workspace must not be used by two
+        threads at once."""
+        if checkpoint_interval < 1:
+            raise ValueError("The checkpoint interval must be a positive integer.")
+        native_type = Matrix._NATIVE_TYPES[dtype]
+        empty = lambda: Matrix._from_native(native_type(0, 0))
+        self.structure = list(structure)
+        self.dtype = dtype
+        self.checkpoint_interval = checkpoint_interval
+        buffers = {}
+        self.activations = [buffers.setdefault(key, empty()) for key in Workspace.__activation_buffers(structure, checkpoint_interval)]
+        self.errors = [empty(), empty()]
+        self.grad_w = [empty() for _ in structure[1:]]
+        self.grad_b = [empty() for _ in structure[1:]]
+        self.inputs = empty()
+        self.expected = empty()
+
+    @staticmethod
+    def __activation_buffers(structure: list[int], checkpoint_interval: int) -> list[tuple[str, int]]: #Private method.
+        """The key of the buffer holding the activation of each layer: ('layer', i) for the checkpoints and the output
+        layer, which have their own, and ('segment', i % k) for the others, shared by the layers at the same position in
+        their segments."""
+        layers_count = len(structure) - 1
+        return [
+            ('layer', i) if i % checkpoint_interval == 0 or i == layers_count else ('segment', i % checkpoint_interval)
+            for i in range(1, layers_count + 1)
+        ]
+
+    @staticmethod
+    def activation_memory(structure: list[int],
+                          dtype: Literal['float64', 'float32'],
+                          batch_size: int,
+                          checkpoint_interval: int = 1) -> int:
+        """The memory, in bytes, that the activations and the errors of a training step take in a workspace for a batch
+        of batch_size samples. These are the buffers whose size grows with the batch; the gradients take the memory of
+        the parameters whatever the batch size."""
+        widths = {}
+        for key, width in zip(Workspace.__activation_buffers(structure, checkpoint_interval), structure[1:]):
+            widths[key] = max(widths.get(key, 0), width)
+        errors = structure[:0:-1] #The errors of the layers, from the output one, written alternately into the two buffers.
+        entries = sum(widths.values()) + max(errors[0::2]) + max(errors[1::2], default=0)
+        return entries * batch_size * memoryview(Matrix._NATIVE_TYPES[dtype](0, 0)).itemsize
+
+    @property
+    def nbytes(self) -> int:
+        """The memory currently allocated to the buffers of the workspace, in bytes."""
+        buffers = {id(M): M for M in self.activations + self.errors + self.grad_w + self.grad_b + [self.inputs, self.expected]}
+        return sum(M._native.capacity * memoryview(M._native).itemsize for M in buffers.values())
+
+    def fits(self, model) -> bool:
+        """Whether the workspace has the structure and the dtype of model."""
+        return self.structure == list(model.structure) and self.dtype == model.dtype
@@ -0,0 +1,8 @@
+"""Optimizers updating the parameters of a model in place."""
+
+from .optimizer import Optimizer
+from .sgd import SGD
+from .momentum import Momentum
+from .adam import Adam
+
+__all__ = ['Optimizer', 'SGD', 'Momentum', 'Adam']
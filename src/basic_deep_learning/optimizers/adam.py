@@ -0,0 +1,34 @@
+"""Module containing the Adam class."""
+import math
+import matrix_ops
+from .optimizer import Optimizer
+
+class Adam(Optimizer):
+    def __init__(self,
+                 learning_rate: float = 0.001,
+                 beta1: float = 0.9,
+                 beta2: float = 0.999,
+                 eps: float = 1e-8) -> None:
+        """Adam optimizer (Kingma & Ba, 2015).
+
+        Two buffers (first and second moment estimates) are kept per parameter.
+        The bias corrections are folded into the step size, so eps is added to the uncorrected second moment."""
+        super().__init__(learning_rate)
+        if not (0 <= beta1 < 1 and 0 <= beta2 < 1):
+            raise ValueError("beta1 and beta2 must be in [0, 1).")
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.t = 0 #Number of steps taken so far.
+
+    def _step(self, parameters, gradients, gradient_scale):
+        buffers = self._buffers(parameters, 2)
+        self.t += 1
+        lr_t = self.learning_rate * math.sqrt(1 - self.beta2 ** self.t) / (1 - self.beta1 ** self.t)
+        for P, G, (M, V) in zip(parameters, gradients, buffers):
+            matrix_ops.adam_step(P._native, G._native, M._native, V._native,
+                                 lr_t, self.beta1, self.beta2, self.eps, gradient_scale)
+
+    def reset(self) -> None:
+        super().reset()
+        self.t = 0
@@ -0,0 +1,20 @@
+"""Module containing the Momentum class."""
+import matrix_ops
+from .optimizer import Optimizer
+
+class Momentum(Optimizer):
+    def __init__(self,
+                 learning_rate: float = 0.1,
+                 momentum: float = 0.9) -> None:
+        """Gradient descent with momentum: V <- momentum * V + G, then W <- W - learning_rate * V.
+
+        One velocity buffer V is kept per parameter."""
+        super().__init__(learning_rate)
+        if not 0 <= momentum < 1:
+            raise ValueError("The momentum must be in [0, 1).")
+        self.momentum = momentum
+
+    def _step(self, parameters, gradients, gradient_scale):
+        buffers = self._buffers(parameters, 1)
+        for P, G, (V,) in zip(parameters, gradients, buffers):
+            matrix_ops.momentum_step(P._native, G._native, V._native, self.learning_rate, self.momentum, gradient_scale)
@@ -0,0 +1,50 @@
+"""Module containing the Optimizer base class."""
+from abc import ABC, abstractmethod
+from ..functionality.matrix import Matrix
+
+class Optimizer(ABC):
+    def __init__(self, learning_rate: float = 0.1) -> None:
+        """Base class of the optimizers.
+
+        An optimizer updates a list of parameters (Matrix instances) in place from a list of gradients with the same formats,
+        through fused native kernels: no temporary matrix is created per step.
+
+        The state buffers of stateful optimizers are allocated once, on the first step, and reused afterwards.
+
+        Subclasses must implement _step."""
+        if learning_rate <= 0:
+            raise ValueError("The learning rate must be positive.")
+        self.learning_rate = learning_rate
+        self._state: list[list[Matrix]] = []
+
+    def _buffers(self,
+                 parameters: list[Matrix],
+                 count: int) -> list[list[Matrix]]: #Protected method.
+        """Returns count zero-initialized state buffers per parameter, of the same dtype, allocating them only if the parameters changed."""
+        if len(self._state) != len(parameters) or any(
+            state[0].format != P.format or state[0].dtype != P.dtype for state, P in zip(self._state, parameters)
+        ):
+            self._state = [[Matrix.zero(*P.format, dtype=P.dtype) for _ in range(count)] for P in parameters]
+        return self._state
+
+    def step(self,
+             parameters: list[Matrix],
+             gradients: list[Matrix],
+             gradient_scale: float = 1.0) -> None:
+        """Updates each parameter in place from the gradient at the same position, multiplied by gradient_scale.
+
+        Raises an error if the lists do not have the same length."""
+        if len(parameters) != len(gradients):
+            raise ValueError("There must be exactly one gradient per parameter.")
+        self._step(parameters, gradients, gradient_scale)
+
+    @abstractmethod
+    def _step(self,
+              parameters: list[Matrix],
+              gradients: list[Matrix],
+              gradient_scale: float) -> None:
+        """Updates the parameters, once step has checked the arguments."""
+
+    def reset(self) -> None:
+        """Forgets the state accumulated over the previous steps."""
+        self._state = []
@@ -0,0 +1,9 @@
+"""Module containing the SGD class."""
+import matrix_ops
+from .optimizer import Optimizer
+
+class SGD(Optimizer):
+    """Plain stochastic gradient descent: W <- W - learning_rate * G."""
+    def _step(self, parameters, gradients, gradient_scale):
+        for P, G in zip(parameters, gradients):
+            matrix_ops.sgd_step(P._native, G._native, self.learning_rate, gradient_scale)
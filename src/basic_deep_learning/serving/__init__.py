@@ -0,0 +1,6 @@
+"""Asyncio inference service batching the concurrent requests of registered models."""
+
+from .inference_server import InferenceServer
+from .model_statistics import ModelStatistics
+
+__all__ = ['InferenceServer', 'ModelStatistics']
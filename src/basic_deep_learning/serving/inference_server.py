@@ -0,0 +1,278 @@
+"""Module containing the InferenceServer class."""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
+import time
+from ..functionality.matrix import Matrix
+from ..functionality.sparse_matrix import SparseMatrix
+from ..models.mlp import MultiLayerPerceptron
+from .model_statistics import ModelStatistics
+
+class InferenceServer:
+    def __init__(self,
+                 max_batch_size: int = 64,
+                 max_wait: float = 0.002,
+                 workers: int = 1,
+                 statistics_window: int = 10000) -> None:
+        """Asyncio inference service for a registry of MultiLayerPerceptron models, which coalesces concurrent
+        single-sample requests into micro-batches.
+
+        Each request (await server.predict(name, x), x being one input column vector) joins the pending requests of its
+        model. A batch is closed as soon as it holds max_batch_size requests, or max_wait seconds after the arrival of
+        its first request, and its samples go through predict_batch together, on a pool of worker threads (the native
+        kernels release the GIL, so the event loop keeps accepting requests meanwhile). A batch only starts once a
+        worker is free: under load, requests accumulate while the workers are busy, so batches grow with the load
+        and the products work on wide matrices, while a lone request waits at most max_wait.
+
+        The latencies and batch sizes of each model are recorded in statistics[name] (see ModelStatistics), and
+        summarized by summary().
+
+        The server runs between start() and close() (or in an "async with" block), and must only be used from the
+        event loop it was started in. serve() additionally exposes it over TCP, as JSON lines. The batches of several
+        workers share the persistent threads of the product kernel, as for DataParallel."""
+        if max_batch_size < 1:
+            raise ValueError("The maximum batch size must be a positive integer.")
+        if max_wait < 0:
+            raise ValueError("The maximum wait must be non-negative.")
+        if workers < 1:
+            raise ValueError("The number of workers must be a positive integer.")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.workers = workers
+        self.statistics_window = statistics_window
+        self.models: dict[str, MultiLayerPerceptron] = {}
+        self.statistics: dict[str, ModelStatistics] = {}
+        self.__pending: dict[str, deque] = {} #(input, future, arrival time) of the requests of each model, oldest first.
+        self.__arrivals: dict[str, asyncio.Event] = {} #Set whenever a request of the model arrives.
+        self.__batchers: dict[str, asyncio.Task] = {}
+        self.__running_batches: set[asyncio.Task] = set()
+        self.__listeners: list[asyncio.Server] = []
+        self.__pool = None
+        self.__slots = None #One slot per worker, taken by each batch from its closing until its outputs are set.
+        self.__closing = False
+
+    def add_model(self,
+                  name: str,
+                  model: MultiLayerPerceptron|str|os.PathLike,
+                  **load_options) -> MultiLayerPerceptron:
+        """Registers a model under the given name and returns it. model can also be the file of a saved model, which is
+        loaded by MultiLayerPerceptron.load with the given options (memory_map, dtype).
+
+        Replacing a registered model takes effect from its next batch, and resets its statistics."""
+        if isinstance(model, (str, os.PathLike)):
+            model = MultiLayerPerceptron.load(model, **load_options)
+        self.models[name] = model
+        self.statistics[name] = ModelStatistics(self.statistics_window)
+        return model
+
+    def remove_model(self, name: str) -> None:
+        """Unregisters a model; its requests that are still waiting for a batch fail with a KeyError, while those of
+        batches already closed are served by the removed model."""
+        self.__model(name)
+        del self.models[name]
+        del self.statistics[name]
+        batcher = self.__batchers.pop(name, None)
+        if batcher is not None:
+            batcher.cancel()
+        self.__arrivals.pop(name, None)
+        self.__fail_pending(name, KeyError(f"The model {name!r} was removed."))
+
+    def __fail_pending(self,
+                       name: str,
+                       error: Exception) -> None: #Private method.
+        """Sets error as the result of the requests of a model that are still waiting for a batch, and drops them."""
+        for _, future, _ in self.__pending.pop(name, ()):
+            if not future.done():
+                future.set_exception(error)
+
+    def __model(self, name: str) -> MultiLayerPerceptron: #Private method.
+        if name not in self.models:
+            raise KeyError(f"No model named {name!r} is registered.")
+        return self.models[name]
+
+    async def start(self) -> None:
+        """Starts the pool of worker threads."""
+        if self.__pool is None:
+            self.__pool = ThreadPoolExecutor(max_workers=self.workers)
+            self.__slots = asyncio.Semaphore(self.workers)
+            self.__closing = False
+
+    async def close(self) -> None:
+        """Stops accepting requests, waits for those already submitted, then stops the listeners and the workers.
+
+        Requests that can no longer be batched, because the batcher of their model has stopped, fail with a
+        RuntimeError instead of being waited for."""
+        if self.__pool is None:
+            return
+        self.__closing = True
+        for listener in self.__listeners:
+            listener.close()
+        while self.__running_batches or any(
+            pending and name in self.__batchers and not self.__batchers[name].done()
+            for name, pending in self.__pending.items()
+        ):
+            await asyncio.sleep(self.max_wait or 0.001)
+        for batcher in self.__batchers.values():
+            batcher.cancel()
+        await asyncio.gather(*self.__batchers.values(), return_exceptions=True)
+        for name in list(self.__pending):
+            self.__fail_pending(name, RuntimeError("The server was closed before the request could be batched."))
+        self.__arrivals.clear()
+        for listener in self.__listeners:
+            await listener.wait_closed()
+        self.__batchers.clear()
+        self.__listeners.clear()
+        self.__pool.shutdown()
+        self.__pool = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def predict(self,
+                      name: str,
+                      input_vector: Matrix|SparseMatrix) -> Matrix:
+        """Returns the output vector of the named model for one input vector, computed within a batch of concurrent requests.
+
+        Raises a KeyError if no model has that name, and a ValueError if the input is not a column vector of the size of
+        the input layer of the model."""
+        if self.__pool is None or self.__closing:
+            raise RuntimeError("The server is not running; call start() first.")
+        model = self.__model(name)
+        if input_vector.format != (model.structure[0], 1):
+            raise ValueError(f"Input must be a column vector of {model.structure[0]} rows.")
+        if input_vector.dtype != model.dtype:
+            input_vector = input_vector.astype(model.dtype)
+        loop = asyncio.get_running_loop()
+        if name not in self.__batchers or self.__batchers[name].done():
+            self.__pending.setdefault(name, deque())
+            self.__arrivals.setdefault(name, asyncio.Event())
+            self.__batchers[name] = loop.create_task(self.__batch_requests(name))
+        statistics = self.statistics[name]
+        future = loop.create_future()
+        start = time.perf_counter()
+        self.__pending[name].append((input_vector, future, loop.time()))
+        self.__arrivals[name].set()
+        failed = True
+        try:
+            output = await future
+            failed = False
+            return output
+        finally:
+            statistics.record_request(time.perf_counter() - start, failed)
+
+    async def __batch_requests(self, name: str) -> None: #Private method.
+        """Closes the batches of a model, one at a time, and hands each to the workers. The slot taken for a batch is
+        released by __run_batch, or here if the batcher is cancelled before the batch is closed."""
+        loop = asyncio.get_running_loop()
+        pending, arrivals = self.__pending[name], self.__arrivals[name]
+        while True:
+            while not pending:
+                arrivals.clear()
+                await arrivals.wait()
+            await self.__slots.acquire()
+            try:
+                deadline = pending[0][2] + self.max_wait
+                while len(pending) < self.max_batch_size and loop.time() < deadline:
+                    arrivals.clear()
+                    try:
+                        await asyncio.wait_for(arrivals.wait(), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                self.__slots.release() #The batch is never closed: no __run_batch will release the slot.
+                raise
+            batch = [pending.popleft() for _ in range(min(len(pending), self.max_batch_size))]
+            #The model and its statistics are those of the closing time: the batch is served even if the model is
+            #replaced or removed before it runs.
+            task = loop.create_task(self.__run_batch(self.models[name], self.statistics[name], batch))
+            self.__running_batches.add(task)
+            task.add_done_callback(self.__running_batches.discard)
+
+    async def __run_batch(self,
+                          model: MultiLayerPerceptron,
+                          statistics: ModelStatistics,
+                          batch: list[tuple]) -> None: #Private method.
+        """Computes the outputs of a batch on a worker and sets them as the results of its requests."""
+        try:
+            statistics.record_batch(len(batch))
+            inputs = [input_vector for input_vector, _, _ in batch]
+            try:
+                outputs = await asyncio.get_running_loop().run_in_executor(
+                    self.__pool, self.__predict_columns, model, inputs
+                )
+            except Exception as error:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                for (_, future, _), output in zip(batch, outputs):
+                    if not future.done():
+                        future.set_result(output)
+        finally:
+            self.__slots.release()
+
+    @staticmethod
+    def __predict_columns(model: MultiLayerPerceptron,
+                          inputs: list[Matrix|SparseMatrix]) -> list[Matrix]: #Private method.
+        """Stacks the inputs into a batch, runs it through the model, and splits the outputs into one vector per input."""
+        if all(isinstance(x, SparseMatrix) for x in inputs):
+            batch = SparseMatrix.hstack(inputs)
+        else:
+            batch = Matrix.hstack([x.to_dense() if isinstance(x, SparseMatrix) else x for x in inputs])
+        outputs = model.predict_batch(batch)
+        return [outputs.get_columns(j, j) for j in range(1, len(inputs) + 1)]
+
+    def summary(self) -> dict:
+        """Returns the summary of the statistics of every model (see ModelStatistics.summary)."""
+        return {name: statistics.summary() for name, statistics in self.statistics.items()}
+
+    async def serve(self,
+                    host: str = '127.0.0.1',
+                    port: int = 0) -> asyncio.Server:
+        """Listens for requests over TCP, and returns the listening asyncio.Server (port=0 picks a free port, see
+        its sockets). The server stops listening on close().
+
+        Each line received is a JSON request {"id": ..., "model": name, "input": [x1, ..., xn]}, answered by a line
+        {"id": ..., "output": [y1, ..., ym]}, or {"id": ..., "error": message}. The requests of a connection are served
+        concurrently, and batched with all the others, so the answers can come in any order: the id, which can be any
+        JSON value, matches them."""
+        if self.__pool is None or self.__closing:
+            raise RuntimeError("The server is not running; call start() first.")
+        listener = await asyncio.start_server(self.__handle_connection, host, port)
+        self.__listeners.append(listener)
+        return listener
+
+    async def __handle_connection(self,
+                                  reader: asyncio.StreamReader,
+                                  writer: asyncio.StreamWriter) -> None: #Private method.
+        answers = set()
+        try:
+            while line := await reader.readline():
+                answer = asyncio.get_running_loop().create_task(self.__answer(line, writer))
+                answers.add(answer)
+                answer.add_done_callback(answers.discard)
+            await asyncio.gather(*answers)
+        finally:
+            writer.close()
+
+    async def __answer(self,
+                       line: bytes,
+                       writer: asyncio.StreamWriter) -> None: #Private method.
+        """Serves one JSON request and writes its answer."""
+        identifier = None
+        try:
+            request = json.loads(line)
+            identifier = request.get('id')
+            input_vector = Matrix([[x] for x in request['input']], self.__model(request['model']).dtype)
+            output = await self.predict(request['model'], input_vector)
+            answer = {'id': identifier, 'output': [row[0] for row in output.matrix]}
+        except Exception as error:
+            answer = {'id': identifier, 'error': f'{type(error).__name__}: {error}'}
+        writer.write(json.dumps(answer).encode() + b'\n')
+        await writer.drain()
@@ -0,0 +1,57 @@
+"""Module containing the ModelStatistics class."""
+from collections import deque
+import math
+
+class ModelStatistics:
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, window: int = 10000) -> None:
+        """Latencies and batch sizes of the requests served by one model of an InferenceServer.
+
+        The latency of a request runs from its submission to its result, waiting for its batch included. Percentiles
+        are computed over the last window requests, while the counts and the histogram of the batch sizes cover every
+        request since the last reset."""
+        if window < 1:
+            raise ValueError("The window must be a positive integer.")
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets every recorded request and batch."""
+        self.latencies = deque(maxlen=self.window) #Latencies of the last requests, in seconds.
+        self.batch_sizes: dict[int, int] = {} #Number of batches of each size.
+        self.requests = 0
+        self.errors = 0
+
+    def record_batch(self, size: int) -> None:
+        """Counts a batch of size requests."""
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+    def record_request(self,
+                       latency: float,
+                       failed: bool = False) -> None:
+        """Records the latency of a request, in seconds."""
+        self.latencies.append(latency)
+        self.requests += 1
+        self.errors += failed
+
+    @staticmethod
+    def __percentile(ordered: list[float], q: float) -> float: #Private method.
+        """Nearest-rank q-th percentile of a sorted, non-empty list."""
+        return ordered[max(math.ceil(q / 100 * len(ordered)), 1) - 1]
+
+    def summary(self) -> dict:
+        """Returns the counts, the latency percentiles (p50, p90, p99 and max, in seconds; None before the first request),
+        the mean batch size and the histogram of the batch sizes ({size: number of batches})."""
+        ordered = sorted(self.latencies)
+        latency = {f'p{q}': self.__percentile(ordered, q) if ordered else None for q in ModelStatistics.PERCENTILES}
+        latency['max'] = ordered[-1] if ordered else None
+        batches = sum(self.batch_sizes.values())
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': batches,
+            'mean_batch_size': sum(size * count for size, count in self.batch_sizes.items()) / batches if batches else None,
+            'latency': latency,
+            'batch_sizes': dict(sorted(self.batch_sizes.items()))
+        }
@@ -0,0 +1,10 @@
+"""Callbacks receiving the structured records of training, the profiler timing its phases, and the usual sinks."""
+
+from .profiler import Profiler
+from .callback import Callback
+from .memory_recorder import MemoryRecorder
+from .json_lines_sink import JSONLinesSink
+from .console_sink import ConsoleSink
+from .training_info_writer import TrainingInfoWriter
+
+__all__ = ['Profiler', 'Callback', 'MemoryRecorder', 'JSONLinesSink', 'ConsoleSink', 'TrainingInfoWriter']
@@ -0,0 +1,45 @@
+"""Module containing the Callback class."""
+class Callback:
+    def __init__(self) -> None:
+        """Base class of the callbacks passed to MultiLayerPerceptron.train, which receive its structured records.
+
+        Each record is a JSON-serializable dictionary whose 'event' key is one of:
+
+        - 'train_begin': the configuration of training (epochs, optimizer, learning_rate, decay_rate, dtype, workers,
+          memory_budget, training_size, testing_size and batches, the latter three being None when unknown, date, and
+          the labels describing how the training and testing losses are computed);
+        - 'batch_end': epoch, batch, batches (None for streamed data), samples and loss (sum of the squared errors);
+        - 'epoch_end': epoch, epochs, learning_rate, train_loss, test_loss (only if the testing loss was evaluated in
+          the training thread at this epoch), samples, duration, samples_per_second, phases (seconds per phase, see
+          Profiler) and allocations (matrix buffers allocated during the epoch);
+        - 'evaluation_end': epoch, epochs, test_loss, duration and background;
+        - 'train_end': date, elapsed, and the lists train_losses, test_losses, test_epochs and epochs_duration;
+        - 'train_abort', instead of 'train_end' when an exception (including KeyboardInterrupt) interrupts training:
+          date, elapsed, epochs_completed and error (the type and message of the exception, which train re-raises).
+          It is sent to every callback, even those whose on_train_begin was not reached, so that sinks holding
+          resources (files, ...) release them.
+
+        Every on_* method calls on_record by default, so a sink that treats all the records alike only overrides
+        on_record."""
+        pass
+
+    def on_record(self, record: dict) -> None:
+        pass
+
+    def on_train_begin(self, record: dict) -> None:
+        self.on_record(record)
+
+    def on_batch_end(self, record: dict) -> None:
+        self.on_record(record)
+
+    def on_epoch_end(self, record: dict) -> None:
+        self.on_record(record)
+
+    def on_evaluation_end(self, record: dict) -> None:
+        self.on_record(record)
+
+    def on_train_end(self, record: dict) -> None:
+        self.on_record(record)
+
+    def on_train_abort(self, record: dict) -> None:
+        self.on_record(record)
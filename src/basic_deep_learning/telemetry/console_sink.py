@@ -0,0 +1,61 @@
+"""Module containing the ConsoleSink class."""
+import time
+from ..miscellaneous.formatting import time_format
+from .callback import Callback
+
+class ConsoleSink(Callback):
+    def __init__(self,
+                 interval: float = 0.1,
+                 loss_float_formating: int = 6,
+                 bar_length: int = 75) -> None:
+        """Sink printing the progress of training to the console: a progress bar during each epoch, then its losses.
+
+        The progress bar is redrawn at most once every interval seconds (and at the end of the epoch), so that
+        formatting and terminal output stay negligible even when batches take microseconds."""
+        super().__init__()
+        self.interval = interval
+        self.format_specifier = f'.{loss_float_formating}f'
+        self.bar_length = bar_length
+        self.__last_print = 0.0
+        self.__last_batch = None
+
+    def __progress(self, record: dict) -> None: #Private method.
+        if record['batches'] is None:
+            print(f"\rEpoch {record['epoch']}/{self.__epochs} : {record['batch']} batches completed.", end='')
+            return
+        percentage = record['batch'] / record['batches']
+        print(f"\rEpoch {record['epoch']}/{self.__epochs} : {int(percentage * self.bar_length) * "█"}"
+              f"{int((1-percentage)*self.bar_length) * "-"} {percentage*100:.0f}% completed.", end='')
+
+    def on_train_begin(self, record: dict) -> None:
+        self.__epochs = record['epochs']
+        self.__training_label = record['training_label']
+        self.__evaluation_label = record['evaluation_label']
+
+    def on_batch_end(self, record: dict) -> None:
+        self.__last_batch = record
+        now = time.perf_counter()
+        if now - self.__last_print >= self.interval or record['batch'] == record['batches']:
+            self.__last_print = now
+            self.__progress(record)
+
+    def on_epoch_end(self, record: dict) -> None:
+        if self.__last_batch is not None and self.__last_batch['batches'] is None:
+            self.__progress(self.__last_batch)
+        self.__last_batch = None
+        print("\n")
+        report = f"Epoch {record['epoch']}/{record['epochs']} | Training Loss [{self.__training_label}]: {record['train_loss']:{self.format_specifier}}"
+        if 'test_loss' in record:
+            report += f" | Testing Loss [{self.__evaluation_label}]: {record['test_loss']:{self.format_specifier}}"
+        print(f"{report} ({time_format(record['duration'])})\n")
+
+    def on_evaluation_end(self, record: dict) -> None:
+        if record['background']:
+            print(f"Epoch {record['epoch']}/{record['epochs']} | Testing Loss [{self.__evaluation_label}]: {record['test_loss']:{self.format_specifier}}\n")
+
+    def on_train_end(self, record: dict) -> None:
+        pass
+
+    def on_train_abort(self, record: dict) -> None:
+        if self.__last_batch is not None: #Ends the line of the progress bar before the traceback.
+            print()
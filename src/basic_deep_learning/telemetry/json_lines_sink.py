@@ -0,0 +1,46 @@
+"""Module containing the JSONLinesSink class."""
+import json
+import os
+from .callback import Callback
+
+class JSONLinesSink(Callback):
+    def __init__(self,
+                 filename: str,
+                 events: set[str]|None = None,
+                 append: bool = False) -> None:
+        """Sink writing each record of training as one line of JSON to a file, flushed at the end of every epoch. The
+        file is closed when training ends, or is interrupted (after the train_abort record).
+
+        Only the records of the given events are written (all of them by default; per-batch records can make large
+        files). The file is overwritten when training begins, unless append is True."""
+        super().__init__()
+        self.filename = filename
+        self.events = events
+        self.append = append
+        self.__file = None
+
+    def on_record(self, record: dict) -> None:
+        if self.events is not None and record['event'] not in self.events:
+            return
+        self.__file.write(json.dumps(record) + '\n')
+
+    def on_train_begin(self, record: dict) -> None:
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__file = open(self.filename, 'a' if self.append else 'w')
+        self.on_record(record)
+
+    def on_epoch_end(self, record: dict) -> None:
+        self.on_record(record)
+        self.__file.flush()
+
+    def on_train_end(self, record: dict) -> None:
+        self.on_record(record)
+        self.__file.close()
+        self.__file = None
+
+    def on_train_abort(self, record: dict) -> None:
+        if self.__file is None: #Training was interrupted before it began.
+            return
+        self.on_train_end(record)
@@ -0,0 +1,20 @@
+"""Module containing the MemoryRecorder class."""
+from .callback import Callback
+
+class MemoryRecorder(Callback):
+    def __init__(self, events: set[str]|None = None) -> None:
+        """Sink keeping the records of training in memory, in the records list.
+
+        Only the records of the given events are kept (all of them by default); e.g. {'epoch_end'} for one record
+        per epoch."""
+        super().__init__()
+        self.events = events
+        self.records: list[dict] = []
+
+    def on_record(self, record: dict) -> None:
+        if self.events is None or record['event'] in self.events:
+            self.records.append(record)
+
+    def of(self, event: str) -> list[dict]:
+        """Returns the records of one event."""
+        return [record for record in self.records if record['event'] == event]
@@ -0,0 +1,62 @@
+"""Module containing the Profiler class."""
+import threading
+import time
+import matrix_ops
+
+class Profiler:
+    PHASES = ('conversion', 'forward', 'backward', 'update', 'evaluation')
+
+    def __init__(self) -> None:
+        """Accumulates the time spent in each phase of training, and counts the matrix buffers allocated meanwhile.
+
+        The phases are:
+
+        - conversion: assembling the samples into native batch matrices (time spent waiting for the next batch);
+        - forward: the forward pass of backpropagation;
+        - backward: the backward pass, down to the gradients, activations recomputed by checkpointing included;
+        - update: the optimizer step;
+        - evaluation: the testing loss, when it is evaluated in the training thread.
+
+        Times are added from any thread: with data-parallel training, forward and backward are summed over the workers,
+        so they measure the total work rather than the wall time."""
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Sets every phase time back to zero and restarts the count of allocations."""
+        with self.__lock:
+            self.times = dict.fromkeys(Profiler.PHASES, 0.0)
+            self.__allocations_start = matrix_ops.allocation_count()
+
+    def add(self,
+            phase: str,
+            seconds: float) -> None:
+        """Adds seconds to the time of a phase."""
+        with self.__lock:
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+
+    def phase(self, name: str) -> '_PhaseTimer':
+        """Returns a context manager adding the duration of its block to the given phase."""
+        return _PhaseTimer(self, name)
+
+    @property
+    def allocations(self) -> int:
+        """The number of matrix buffers allocated by the native extension since the last reset."""
+        return matrix_ops.allocation_count() - self.__allocations_start
+
+    def snapshot(self) -> dict:
+        """Returns the phase times and the number of allocations since the last reset."""
+        with self.__lock:
+            return {'phases': dict(self.times), 'allocations': self.allocations}
+
+class _PhaseTimer:
+    """Context manager behind Profiler.phase."""
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.add(self.name, time.perf_counter() - self.start)
@@ -0,0 +1,61 @@
+"""Module containing the TrainingInfoWriter class."""
+import os
+from ..miscellaneous.formatting import time_format
+from .callback import Callback
+from .profiler import Profiler
+
+class TrainingInfoWriter(Callback):
+    def __init__(self,
+                 filename: str = 'cache/training_info.txt',
+                 loss_float_formating: int = 6) -> None:
+        """Sink writing a human-readable summary of training to a text file when it ends, built from its records."""
+        super().__init__()
+        self.filename = filename
+        self.loss_float_formating = loss_float_formating
+        self.__begin = None
+        self.__epochs = []
+
+    def on_train_begin(self, record: dict) -> None:
+        self.__begin = record
+        self.__epochs = []
+
+    def on_batch_end(self, record: dict) -> None:
+        pass
+
+    def on_epoch_end(self, record: dict) -> None:
+        self.__epochs.append(record)
+
+    def on_evaluation_end(self, record: dict) -> None:
+        pass
+
+    def on_train_end(self, record: dict) -> None:
+        begin, last_epoch = self.__begin, self.__epochs[-1]
+        training_size, testing_size = last_epoch['samples'], begin['testing_size']
+        phases = {phase: sum(epoch['phases'].get(phase, 0.0) for epoch in self.__epochs) for phase in Profiler.PHASES}
+        total_duration = sum(record['epochs_duration'])
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.filename, 'w') as f:
+            f.write(f'Epochs: {begin["epochs"]}.\n')
+            f.write(f'Optimizer: {begin["optimizer"]}.\n')
+            f.write(f'Learning rate: {begin["learning_rate"]}.\n')
+            f.write(f'Exponential decay rate: {begin["decay_rate"]}.\n')
+            if testing_size is not None:
+                f.write(f'Data size: {training_size+testing_size}. Including:\n \n')
+            else:
+                f.write(f'Data size: unknown (streamed testing data). Including:\n \n')
+            f.write(f'   Training data size: {training_size}.\n')
+            f.write(f'   Testing data size: {testing_size if testing_size is not None else "unknown"}.\n \n')
+            f.write(f'Training start date: {begin["date"]}.\n')
+            f.write(f'Training end date: {record["date"]}.\n')
+            f.write(f'Trained in: {time_format(record["elapsed"])}.\n')
+            f.write(f'Average time per epoch: {time_format(total_duration/len(self.__epochs))}/epoch.\n')
+            f.write(f'Average throughput: {sum(epoch["samples"] for epoch in self.__epochs)/total_duration:.0f} samples/s.\n')
+            f.write(f'Time per phase:\n \n')
+            for phase, seconds in phases.items():
+                f.write(f'   {phase.capitalize()}: {time_format(seconds)} ({seconds/record["elapsed"]:.1%} of the training time).\n')
+            f.write(f' \nMatrix buffers allocated: {sum(epoch["allocations"] for epoch in self.__epochs)}.\n')
+            f.write(f'Last training loss ({begin["training_label"]}): {record["train_losses"][-1]:{self.loss_float_formating}}.\n')
+            f.write(f'Last testing loss ({begin["evaluation_label"]}, epoch {record["test_epochs"][-1]}): '
+                    f'{record["test_losses"][-1]:{self.loss_float_formating}}.')